@@ -0,0 +1,166 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+# ----------------- Cached token authentication -----------------
+# Drop-in replacement for DRF's TokenAuthentication. backend/settings.py is
+# not tracked here, so it's enabled there rather than by this app:
+#
+#     REST_FRAMEWORK = {
+#         'DEFAULT_AUTHENTICATION_CLASSES': ['core.authentication.CachedTokenAuthentication'],
+#         ...
+#     }
+#
+# Valid tokens are cached in the shared cache (so every worker benefits from
+# one worker's query) as plain field values; each hit builds fresh User and
+# Token instances from them, so nothing is shared between requests. Token
+# deletion (logout) and user changes, queryset updates included, delete the
+# shared entries on commit (see core.signals and core.models). That only
+# reaches every worker with a cross-process backend (Redis, Memcached);
+# LocMemCache keeps one cache per process.
+#
+# AUTH_TOKEN_LOCAL_TTL > 0 adds a per-process LRU in front. Invalidation
+# can't reach other processes' LRUs, so a revoked token keeps working there
+# for up to that many seconds; it's off by default.
+
+DEFAULT_LOCAL_SIZE = 1024
+DEFAULT_LOCAL_TTL = 0
+DEFAULT_SHARED_TTL = 300
+
+# Left out of cached entries (and loaded on access instead): the password
+# hash doesn't belong in Redis/Memcached, and last_login changes at every login
+UNCACHED_USER_FIELDS = frozenset({'password', 'last_login'})
+
+
+def token_cache_key(key):
+    # Raw tokens never reach the cache backend
+    return f"auth:token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded mapping whose entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = LRUCache(
+    getattr(settings, 'AUTH_TOKEN_LOCAL_SIZE', DEFAULT_LOCAL_SIZE),
+    getattr(settings, 'AUTH_TOKEN_LOCAL_TTL', DEFAULT_LOCAL_TTL),
+)
+
+
+def invalidate_token(key):
+    cache_key = token_cache_key(key)
+    local_tokens.delete(cache_key)
+    cache.delete(cache_key)
+
+
+def invalidate_user_tokens(user_ids):
+    from rest_framework.authtoken.models import Token  # Not at import time: settings load this module
+
+    for key in Token.objects.filter(user_id__in=user_ids).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+def invalidate_after_commit(invalidate, *args):
+    """
+    Invalidates once the change is visible to other connections. Before that
+    a concurrent request still reads the old row and would cache it again.
+    """
+    transaction.on_commit(lambda: invalidate(*args))
+
+
+def _field_values(instance, exclude=()):
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields if field.attname not in exclude
+    }
+
+
+def _from_values(model, values):
+    # Fields added since the entry was cached are simply deferred
+    attnames = {field.attname for field in model._meta.concrete_fields}
+    values = {name: value for name, value in values.items() if name in attnames}
+    return model.from_db(DEFAULT_DB_ALIAS, list(values), list(values.values()))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication without the Token + user query on cache hits. Only
+    valid tokens of active users are cached; failures always hit the database.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+
+        cached = local_tokens.get(cache_key)
+        if cached is None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                local_tokens.set(cache_key, cached)
+        if cached is not None:
+            user_values, token_values = cached
+            user = _from_values(get_user_model(), user_values)
+            if user.is_active:
+                token = _from_values(self.get_model(), token_values)
+                token.user = user
+                return (user, token)
+            invalidate_token(key)
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        cached = (_field_values(token.user, exclude=UNCACHED_USER_FIELDS), _field_values(token))
+        cache.set(cache_key, cached, getattr(settings, 'AUTH_TOKEN_SHARED_TTL', DEFAULT_SHARED_TTL))
+        local_tokens.set(cache_key, cached)
+        return (token.user, token)
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:25
+
+import core.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', core.models.CustomUserManager()),
+            ],
+        ),
+    ]
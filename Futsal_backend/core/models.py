@@ -1,9 +1,27 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
 
+
+class CustomUserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # No post_save for bulk updates, so drop cached credentials here too
+        from .authentication import invalidate_after_commit, invalidate_user_tokens
+
+        user_ids = list(self.values_list('pk', flat=True))
+        updated = super().update(**kwargs)
+        invalidate_after_commit(invalidate_user_tokens, user_ids)
+        return updated
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    pass
+
+
 class CustomUser(AbstractUser):
     USER_TYPES = (
         ('player', 'Player'),
         ('owner', 'Futsal Owner'),
     )
     user_type = models.CharField(max_length=10, choices=USER_TYPES)
+
+    objects = CustomUserManager()
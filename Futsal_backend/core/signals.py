@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import UNCACHED_USER_FIELDS, invalidate_after_commit, invalidate_token, invalidate_user_tokens
+
+
+# ---------- Token cache invalidation ----------
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    # LogoutView deletes the token; it must stop authenticating at once
+    invalidate_after_commit(invalidate_token, instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    # Cached credentials carry the user's fields, so a change to any of them
+    # (deactivation, user_type, ...) drops them and the next request reloads
+    # the user. The login-time last_login save can't affect them.
+    if created or (update_fields is not None and update_fields <= UNCACHED_USER_FIELDS):
+        return
+    invalidate_after_commit(invalidate_user_tokens, [instance.pk])
@@ -1,3 +1,153 @@
-from django.test import TestCase
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from .authentication import CachedTokenAuthentication, LRUCache, local_tokens, token_cache_key
+from .models import CustomUser
+
+
+@override_settings(
+    ROOT_URLCONF='core.urls',
+    REST_FRAMEWORK={
+        'DEFAULT_AUTHENTICATION_CLASSES': ['core.authentication.CachedTokenAuthentication'],
+        'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    },
+)
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.user = CustomUser.objects.create_user(username='sam', password='pw', user_type='player')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_repeat_lookups_skip_the_database(self):
+        self.auth.authenticate_credentials(self.token.key)
+
+        with CaptureQueriesContext(connection) as queries:
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(user.pk, self.user.pk)
+
+        # Another worker starts with an empty LRU but shares the cache
+        local_tokens.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(len(queries), 0)
+
+    def test_logout_revokes_cached_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/logout/')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post('/logout/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivation_revokes_cached_token(self):
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_hits_return_fresh_instances(self):
+        first, _ = self.auth.authenticate_credentials(self.token.key)
+        first.user_type = 'owner'  # A request scribbling on its user
+
+        user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertIsNot(user, first)
+        self.assertEqual(user.user_type, 'player')
+        self.assertEqual((token.key, token.user), (self.token.key, user))
+        self.assertIsNone(local_tokens.get(token_cache_key(self.token.key)))  # Local layer is opt-in
+
+    def test_logout_clears_the_shared_entry(self):
+        cache_key = token_cache_key(self.token.key)
+        self.auth.authenticate_credentials(self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertIsNone(cache.get(cache_key))
+
+    def test_bulk_deactivation_revokes_cached_token(self):
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivation_outlives_a_lookup_racing_the_commit(self):
+        cache_key = token_cache_key(self.token.key)
+        self.auth.authenticate_credentials(self.token.key)
+        before = cache.get(cache_key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.user.is_active = False
+                self.user.save()
+                # A request on another connection still reads the committed,
+                # active user and caches it again
+                cache.set(cache_key, before)
+
+        self.assertIsNone(cache.get(cache_key))
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_password_hash_is_not_cached(self):
+        self.auth.authenticate_credentials(self.token.key)
+        user_values, _ = cache.get(token_cache_key(self.token.key))
+        self.assertNotIn('password', user_values)
+        self.assertNotIn('last_login', user_values)
+
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertTrue(user.check_password('pw'))  # Loaded on access
+
+    def test_last_login_save_keeps_cached_credentials(self):
+        self.auth.authenticate_credentials(self.token.key)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            update_last_login(None, self.user)
+        self.assertEqual(len(queries), 1)  # Just the UPDATE, no token lookup
+        self.assertIsNotNone(cache.get(token_cache_key(self.token.key)))
+
+    def test_inactive_cached_user_is_not_trusted(self):
+        self.auth.authenticate_credentials(self.token.key)
+        user_values, token_values = cache.get(token_cache_key(self.token.key))
+        cache.set(token_cache_key(self.token.key), ({**user_values, 'is_active': False}, token_values))
+
+        # Falls through to the database, which still has the user active
+        with CaptureQueriesContext(connection) as queries:
+            user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(user.is_active)
+
+    def test_invalid_token_is_rejected(self):
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials('not-a-token')
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_entries_expire(self):
+        lru = LRUCache(maxsize=2, ttl=-1)
+        lru.set('a', 1)
+        self.assertIsNone(lru.get('a'))
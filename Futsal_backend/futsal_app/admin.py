@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Team, Player, Futsal,Match, MatchRequest, TimeSlot, Payment
+from .models import Team, Player, Futsal,Match, MatchRequest, TimeSlot, Payment, FutsalDailyStats, PriceRule, Notification, MatchmakingTicket, Tournament, Fixture
 
 admin.site.register(Team)
 admin.site.register(Player)
@@ -8,3 +8,9 @@ admin.site.register(Match)
 admin.site.register(MatchRequest)
 admin.site.register(TimeSlot)
 admin.site.register(Payment)
+admin.site.register(FutsalDailyStats)
+admin.site.register(PriceRule)
+admin.site.register(Notification)
+admin.site.register(MatchmakingTicket)
+admin.site.register(Tournament)
+admin.site.register(Fixture)
@@ -0,0 +1,137 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum, Q, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import TimeSlot, Payment, Match, FutsalDailyStats
+
+
+ROLLUP_FIELDS = [
+    'slots_offered', 'slots_booked',
+    'paid_amount', 'cash_amount', 'esewa_amount',
+    'competitive_matches',
+]
+
+
+def rollup_daily_stats(date_from, date_to, futsal_ids=None):
+    """
+    Rebuilds FutsalDailyStats for every (futsal, day) in the range from grouped
+    aggregates: slots by start day, paid payments by payment day and
+    competitive matches by scheduled date. Used by the nightly command over a
+    wide range and by the signals for a single futsal-day.
+    """
+    tz = timezone.get_current_timezone()
+
+    slots = TimeSlot.objects.filter(start_time__date__range=(date_from, date_to))
+    payments = Payment.objects.filter(
+        status='paid',
+        match__time_slot__isnull=False,
+        created_at__date__range=(date_from, date_to)
+    )
+    matches = Match.objects.filter(
+        match_type='competitive',
+        futsal__isnull=False,
+        scheduled_date__range=(date_from, date_to)
+    )
+    existing = FutsalDailyStats.objects.filter(day__range=(date_from, date_to))
+
+    if futsal_ids is not None:
+        slots = slots.filter(futsal_id__in=futsal_ids)
+        payments = payments.filter(match__time_slot__futsal_id__in=futsal_ids)
+        matches = matches.filter(futsal_id__in=futsal_ids)
+        existing = existing.filter(futsal_id__in=futsal_ids)
+
+    stats = defaultdict(dict)
+
+    slot_rows = (
+        slots.annotate(slot_day=TruncDate('start_time', tzinfo=tz))
+        .values('futsal_id', 'slot_day')
+        .annotate(offered=Count('id'), booked=Count('id', filter=Q(is_booked=True)))
+    )
+    for row in slot_rows:
+        stats[(row['futsal_id'], row['slot_day'])].update(
+            slots_offered=row['offered'],
+            slots_booked=row['booked'],
+        )
+
+    payment_rows = (
+        payments.annotate(
+            venue_id=F('match__time_slot__futsal_id'),
+            paid_day=TruncDate('created_at', tzinfo=tz),
+        )
+        .values('venue_id', 'paid_day')
+        .annotate(
+            paid=Sum('amount'),
+            cash=Sum('amount', filter=Q(method='Cash')),
+            esewa=Sum('amount', filter=Q(method='eSewa')),
+        )
+    )
+    for row in payment_rows:
+        stats[(row['venue_id'], row['paid_day'])].update(
+            paid_amount=row['paid'] or Decimal('0'),
+            cash_amount=row['cash'] or Decimal('0'),
+            esewa_amount=row['esewa'] or Decimal('0'),
+        )
+
+    match_rows = matches.values('futsal_id', 'scheduled_date').annotate(hosted=Count('id'))
+    for row in match_rows:
+        stats[(row['futsal_id'], row['scheduled_date'])]['competitive_matches'] = row['hosted']
+
+    with transaction.atomic():
+        # Days that lost all activity must not keep their old numbers
+        stale = [pk for pk, futsal_id, day in existing.values_list('pk', 'futsal_id', 'day') if (futsal_id, day) not in stats]
+        FutsalDailyStats.objects.filter(pk__in=stale).delete()
+        # Upsert: a concurrent rollup of the same futsal-day may have inserted
+        # its row after this one read them
+        FutsalDailyStats.objects.bulk_create(
+            [FutsalDailyStats(futsal_id=futsal_id, day=day, **values) for (futsal_id, day), values in stats.items()],
+            update_conflicts=True,
+            unique_fields=['futsal', 'day'],
+            update_fields=[*ROLLUP_FIELDS, 'updated_at'],
+        )
+
+    return len(stats)
+
+
+def refresh_daily_stats(keys):
+    """
+    Incremental update of the given (futsal_id, day) pairs after booking,
+    payment or match changes: one rollup per day over the futsals touched.
+    """
+    futsals_by_day = defaultdict(set)
+    for futsal_id, day in keys:
+        futsals_by_day[day].add(futsal_id)
+    for day, futsal_ids in sorted(futsals_by_day.items()):
+        rollup_daily_stats(day, day, futsal_ids=sorted(futsal_ids))
+
+
+def owner_analytics(owner, date_from, date_to, futsal_id=None):
+    """
+    Reads only the rollup table: per-day rows plus totals for the range.
+    """
+    rows = FutsalDailyStats.objects.filter(futsal__owner=owner, day__range=(date_from, date_to))
+    if futsal_id:
+        rows = rows.filter(futsal_id=futsal_id)
+
+    totals = rows.aggregate(
+        slots_offered=Sum('slots_offered'),
+        slots_booked=Sum('slots_booked'),
+        paid_amount=Sum('paid_amount'),
+        cash_amount=Sum('cash_amount'),
+        esewa_amount=Sum('esewa_amount'),
+        competitive_matches=Sum('competitive_matches'),
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+    totals['utilization'] = (
+        round(totals['slots_booked'] / totals['slots_offered'], 3) if totals['slots_offered'] else 0
+    )
+
+    days = []
+    for row in rows.order_by('day', 'futsal_id').values('futsal_id', 'day', *ROLLUP_FIELDS):
+        row['utilization'] = round(row['slots_booked'] / row['slots_offered'], 3) if row['slots_offered'] else 0
+        days.append(row)
+
+    return {"totals": totals, "days": days}
@@ -0,0 +1,73 @@
+import hashlib
+
+from django.db.models import Count, F, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    Answers GET with 304 Not Modified while the client's ETag / Last-Modified
+    still match, before the resource is loaded or serialized. Views implement
+    get_version(), returning (version key, last modified datetime) from one
+    small query, or None to fall through to the normal response (e.g. 404).
+    """
+
+    def get_version(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        version = self.get_version()
+        if version is None:
+            return super().get(request, *args, **kwargs)
+
+        key, last_modified = version
+        # The query string is part of the representation (filters, pages)
+        digest = hashlib.md5(f"{key}|{request.get_full_path()}".encode()).hexdigest()
+        etag = quote_etag(digest)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # Clients may keep a copy but must revalidate it on every use
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+# ----------------- Version queries -----------------
+
+def futsal_list_version(queryset):
+    # Count catches deletions; the newest stamp catches additions and edits
+    stats = queryset.order_by().aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    return f"futsals-{stats['count']}-{stats['last_modified']}", stats['last_modified']
+
+
+def futsal_version(queryset, pk):
+    last_modified = queryset.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if last_modified is None:
+        return None
+    return f"futsal-{pk}-{last_modified}", last_modified
+
+
+def team_version(queryset, pk):
+    """
+    A team's representation nests its home and preferred futsals, so their
+    stamps count too. Player and preferred-futsal changes bump the team
+    itself (see signals).
+    """
+    row = (
+        queryset.filter(pk=pk)
+        .annotate(home_updated=F('futsal__updated_at'), preferred_updated=Max('preferred_futsals__updated_at'))
+        .values('updated_at', 'home_updated', 'preferred_updated')
+        .first()
+    )
+    if row is None:
+        return None
+
+    last_modified = max(stamp for stamp in row.values() if stamp is not None)
+    return f"team-{pk}-{row['updated_at']}-{row['home_updated']}-{row['preferred_updated']}", last_modified
@@ -0,0 +1,88 @@
+from datetime import date
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import CachedTokenAuthentication
+from .models import TimeSlot
+from .realtime import slot_group_name, slot_payload
+
+
+# ----------------- WebSocket Auth -----------------
+
+@database_sync_to_async
+def _user_for_token(key):
+    try:
+        user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+    except AuthenticationFailed:
+        return AnonymousUser()
+    return user
+
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """
+    Browsers can't set an Authorization header on a WebSocket, so the DRF
+    token comes in as ?token=<key> instead.
+    """
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get("query_string", b"").decode())
+        key = query.get("token", [None])[0]
+        scope["user"] = await _user_for_token(key) if key else AnonymousUser()
+        return await super().__call__(scope, receive, send)
+
+
+# ----------------- Slot Availability -----------------
+
+class SlotAvailabilityConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws/futsals/<futsal_id>/slots/<YYYY-MM-DD>/
+
+    Sends a snapshot of the day's slots on connect, then one message per
+    slot created, booked, released or removed at that futsal on that day.
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        futsal_id = self.scope["url_route"]["kwargs"]["futsal_id"]
+        try:
+            day = date.fromisoformat(self.scope["url_route"]["kwargs"]["day"])
+        except ValueError:
+            await self.close(code=4400)
+            return
+
+        self.group_name = slot_group_name(futsal_id, day)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        # Joined before reading, so a booking between the two is still delivered
+        await self.send_json({
+            "type": "snapshot",
+            "slots": await self.day_slots(futsal_id, day),
+        })
+
+    async def disconnect(self, code):
+        if getattr(self, "group_name", None):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Push only; nothing to do with client messages
+        pass
+
+    async def slot_event(self, event):
+        await self.send_json({
+            "type": event["event"],
+            "slot": event["slot"],
+        })
+
+    @database_sync_to_async
+    def day_slots(self, futsal_id, day):
+        slots = TimeSlot.objects.filter(futsal_id=futsal_id, start_time__date=day).order_by('start_time')
+        return [slot_payload(slot) for slot in slots]
@@ -0,0 +1,66 @@
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.utils.functional import SimpleLazyObject
+
+from .models import Team
+
+
+# ----------------- Current team -----------------
+# Each owner has at most one team (Team.Meta constraint), so "the user's
+# team" is a per-request value. Views opt in with CurrentTeamMixin or
+# @with_team and read `request.team`: loaded on first use, at most once per
+# request, with its home and preferred futsals already fetched. It is falsy
+# when the user has no team.
+
+def load_team(user):
+    if not user or not user.is_authenticated:
+        return None
+    return (
+        Team.objects.select_related('futsal')
+        .prefetch_related('preferred_futsals')
+        .filter(owner=user)
+        .first()
+    )
+
+
+def get_request_team(request):
+    # Memoized on the Django request, which DRF's Request wraps
+    http_request = getattr(request, '_request', request)
+    if not hasattr(http_request, '_cached_team'):
+        http_request._cached_team = load_team(request.user)
+    return http_request._cached_team
+
+
+def attach_team(request):
+    request.team = SimpleLazyObject(lambda: get_request_team(request))
+
+
+def with_team(view_func):
+    """
+    Sets `request.team` for a function view; goes inside @api_view so the
+    user is already authenticated. Async views can't run a lazy query, so
+    theirs is loaded up front.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            request.team = await sync_to_async(get_request_team)(request)
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        attach_team(request)
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class CurrentTeamMixin:
+    """
+    Sets `request.team` on class-based views, after authentication.
+    """
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        attach_team(request)
@@ -0,0 +1,131 @@
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import TeamMatch, Match, Payment
+
+
+EXPORT_CHUNK_SIZE = 2000  # Rows fetched per database round trip
+LINES_PER_WRITE = 500     # Rows joined into one chunk of the HTTP response
+
+
+# ----------------- Export Definitions -----------------
+# kind -> (queryset for a futsal owner, [(column header, values_list lookup), ...])
+
+EXPORTS = {
+    'team-matches': (
+        lambda owner: TeamMatch.objects.filter(time_slot__futsal__owner=owner),
+        [
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('scheduled_time', 'scheduled_time'),
+            ('futsal', 'time_slot__futsal__name'),
+            ('team_1', 'team_1__name'),
+            ('team_2', 'team_2__name'),
+            ('match_type', 'match_type'),
+            ('accepted', 'accepted'),
+            ('result', 'result'),
+            ('team_1_score', 'team_1_score'),
+            ('team_2_score', 'team_2_score'),
+        ],
+    ),
+    'matches': (
+        lambda owner: Match.objects.filter(futsal__owner=owner),
+        [
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('scheduled_date', 'scheduled_date'),
+            ('futsal', 'futsal__name'),
+            ('team_1', 'team_1__name'),
+            ('team_2', 'team_2__name'),
+            ('status', 'status'),
+            ('goals_team_1', 'goals_team_1'),
+            ('goals_team_2', 'goals_team_2'),
+            ('winner', 'winner__name'),
+        ],
+    ),
+    'payments': (
+        lambda owner: Payment.objects.filter(match__time_slot__futsal__owner=owner),
+        [
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('match_id', 'match_id'),
+            ('futsal', 'match__time_slot__futsal__name'),
+            ('amount', 'amount'),
+            ('method', 'method'),
+            ('status', 'status'),
+            ('transaction_id', 'transaction_id'),
+        ],
+    ),
+}
+
+
+def export_rows(kind, owner, date_from=None, date_to=None):
+    """
+    Returns (headers, row iterator) for an owner's export. Rows are tuples
+    streamed from the database in EXPORT_CHUNK_SIZE batches.
+    """
+    get_queryset, columns = EXPORTS[kind]
+    queryset = get_queryset(owner)
+
+    if date_from:
+        queryset = queryset.filter(created_at__date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(created_at__date__lte=date_to)
+
+    headers = [header for header, _ in columns]
+    rows = (
+        queryset.order_by('created_at', 'id')
+        .values_list(*[lookup for _, lookup in columns])
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return headers, rows
+
+
+# ----------------- Encoders -----------------
+
+class _Echo:
+    """
+    File-like object whose write() hands the line back, so csv.writer
+    can format one row at a time without a buffer.
+    """
+    def write(self, value):
+        return value
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= LINES_PER_WRITE:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def csv_stream(headers, rows):
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(row)
+
+    return _batched(lines())
+
+
+def ndjson_stream(headers, rows):
+    lines = (json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + "\n" for row in rows)
+    return _batched(lines)
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,104 @@
+import math
+
+import numpy as np
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Futsal
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+# ----------------- Grid cells -----------------
+# Futsal.geo_cell buckets coordinates into GEO_CELL_DEGREES squares (~11 km
+# of latitude), so a bounding box becomes an indexed IN over a few cells.
+
+GEO_CELL_DEGREES = 0.1
+_LAT_CELLS = int(round(180 / GEO_CELL_DEGREES))
+_LNG_CELLS = int(round(360 / GEO_CELL_DEGREES))
+
+INITIAL_RADIUS_KM = 5
+MAX_RADIUS_KM = 100
+
+
+def _lat_index(lat):
+    return min(int(math.floor((lat + 90) / GEO_CELL_DEGREES)), _LAT_CELLS - 1)
+
+
+def _lng_index(lng):
+    return int(math.floor((lng + 180) / GEO_CELL_DEGREES)) % _LNG_CELLS
+
+
+def geo_cell(lat, lng):
+    if lat is None or lng is None:
+        return None
+    return _lat_index(lat) * _LNG_CELLS + _lng_index(lng)
+
+
+def cells_within(lat, lng, radius_km):
+    """
+    Cells covering the bounding box of a circle; wraps across the antimeridian.
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = max(lat - lat_delta, -90.0), min(lat + lat_delta, 90.0)
+
+    # Widest point of the circle is at the latitude nearest a pole
+    widest = max(abs(min_lat), abs(max_lat))
+    if widest >= 89.9:
+        lng_delta = 180.0
+    else:
+        lng_delta = min(math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(widest)))), 180.0)
+
+    lat_range = range(_lat_index(min_lat), _lat_index(max_lat) + 1)
+    lng_steps = min(int(math.ceil(2 * lng_delta / GEO_CELL_DEGREES)) + 1, _LNG_CELLS)
+    first_lng = _lng_index(lng - lng_delta)
+    lng_indexes = {(first_lng + step) % _LNG_CELLS for step in range(lng_steps)}
+
+    return [lat_index * _LNG_CELLS + lng_index for lat_index in lat_range for lng_index in lng_indexes]
+
+
+# ----------------- Nearest futsals -----------------
+
+def haversine_km(lat, lng, lats, lngs):
+    """
+    Great-circle distance from one point to arrays of points, vectorized.
+    """
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def nearest_futsals(lat, lng, k=10, max_radius_km=MAX_RADIUS_KM, day=None):
+    """
+    Up to k futsals with open future slots (on `day`, if given), nearest first,
+    as [(futsal id, distance km, open slot count)]. The search box starts at
+    INITIAL_RADIUS_KM and doubles until k venues are inside the radius, so
+    each round only touches the venues in a few grid cells.
+    """
+    open_slots = Q(time_slots__is_booked=False, time_slots__start_time__gt=timezone.now())
+    if day is not None:
+        open_slots &= Q(time_slots__start_time__date=day)
+
+    radius = min(INITIAL_RADIUS_KM, max_radius_km)
+    while True:
+        rows = list(
+            Futsal.objects.filter(geo_cell__in=cells_within(lat, lng, radius))
+            .annotate(open_slots=Count('time_slots', filter=open_slots))
+            .filter(open_slots__gt=0)
+            .values_list('id', 'latitude', 'longitude', 'open_slots')
+        )
+
+        if rows:
+            ids, lats, lngs, slot_counts = zip(*rows)
+            distances = haversine_km(lat, lng, np.array(lats, dtype=float), np.array(lngs, dtype=float))
+            inside = np.flatnonzero(distances <= radius)
+        else:
+            inside = np.zeros(0, dtype=int)
+
+        if len(inside) >= k or radius >= max_radius_km:
+            break
+        radius = min(radius * 2, max_radius_km)
+
+    nearest = inside[np.argsort(distances[inside], kind='stable')[:k]] if len(inside) else inside
+    return [(ids[i], round(float(distances[i]), 2), slot_counts[i]) for i in nearest]
@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import F, DurationField, ExpressionWrapper
+from django.db.models.functions import ExtractIsoWeekDay, ExtractHour
+
+from .models import TimeSlot
+
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+HEATMAP_CACHE_TIMEOUT = 60 * 60  # Recomputed at most hourly, or when a slot changes
+HEATMAP_REFRESH_DELAY = 5 * 60   # After a slot change, the cached copy is kept this long since it was computed
+
+
+def heatmap_cache_key(futsal_id):
+    return f"futsal_app:heatmap:{futsal_id}"
+
+
+def heatmap_changed_key(futsal_id):
+    return f"futsal_app:heatmap:{futsal_id}:changed"
+
+
+def compute_demand_heatmap(futsal_id):
+    """
+    7x24 (weekday x hour, local time) matrices for one futsal:
+    slots offered, occupancy ratio and average booking lead time in hours.
+    Weekday, hour and lead time are computed in SQL; all aggregation is done
+    with NumPy bincounts over flat cell indexes.
+    """
+    rows = list(
+        TimeSlot.objects.filter(futsal_id=futsal_id)
+        .annotate(
+            weekday=ExtractIsoWeekDay('start_time'),
+            hour=ExtractHour('start_time'),
+            lead=ExpressionWrapper(F('start_time') - F('booked_by_match__created_at'), output_field=DurationField()),
+        )
+        .values_list('weekday', 'hour', 'is_booked', 'lead')
+    )
+
+    cells = 7 * 24
+    if rows:
+        weekday, hour, is_booked, lead = zip(*rows)
+        cell = (np.array(weekday, dtype=np.int64) - 1) * 24 + np.array(hour, dtype=np.int64)
+        booked = np.array(is_booked, dtype=bool)
+
+        # Lead time only exists for slots booked through a match (None -> NaT)
+        lead = np.array(lead, dtype='timedelta64[s]')
+        has_lead = ~np.isnat(lead) & booked
+        lead_hours = np.where(has_lead, lead.astype(np.int64), 0) / 3600.0
+    else:
+        cell = np.zeros(0, dtype=np.int64)
+        booked = has_lead = np.zeros(0, dtype=bool)
+        lead_hours = np.zeros(0)
+
+    offered = np.bincount(cell, minlength=cells)
+    booked_count = np.bincount(cell, weights=booked, minlength=cells)
+    lead_count = np.bincount(cell, weights=has_lead, minlength=cells)
+    lead_total = np.bincount(cell, weights=lead_hours, minlength=cells)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        occupancy = np.where(offered > 0, booked_count / offered, 0.0)
+        avg_lead = np.where(lead_count > 0, lead_total / lead_count, 0.0)
+
+    return {
+        "futsal": futsal_id,
+        "weekdays": WEEKDAYS,
+        "hours": list(range(24)),
+        "sample_size": len(rows),
+        "slots_offered": offered.reshape(7, 24).tolist(),
+        "occupancy": np.round(occupancy, 3).reshape(7, 24).tolist(),
+        "avg_lead_hours": np.round(avg_lead, 1).reshape(7, 24).tolist(),
+    }
+
+
+def get_demand_heatmap(futsal_id):
+    """
+    The cached heatmap, recomputed when missing, or when its slots changed
+    and it is older than HEATMAP_REFRESH_DELAY, so a burst of slot edits
+    costs one recompute rather than one per read in between.
+    """
+    key = heatmap_cache_key(futsal_id)
+    cached = cache.get(key)
+    if cached is not None:
+        changed_at = cache.get(heatmap_changed_key(futsal_id))
+        if changed_at is None or changed_at < cached["computed_at"] or time.time() - cached["computed_at"] < HEATMAP_REFRESH_DELAY:
+            return cached["heatmap"]
+
+    # Stamped before the query, so a change made while computing stays pending
+    computed_at = time.time()
+    heatmap = compute_demand_heatmap(futsal_id)
+    cache.set(key, {"heatmap": heatmap, "computed_at": computed_at}, HEATMAP_CACHE_TIMEOUT)
+    return heatmap
+
+
+def invalidate_demand_heatmap(futsal_ids):
+    # Marks the futsals' heatmaps changed; see get_demand_heatmap
+    now = time.time()
+    cache.set_many({heatmap_changed_key(futsal_id): now for futsal_id in futsal_ids}, HEATMAP_CACHE_TIMEOUT)
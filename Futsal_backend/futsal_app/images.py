@@ -0,0 +1,191 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Futsal, Team, Player, ImageAsset
+
+
+logger = logging.getLogger(__name__)
+
+# ----------------- Variants -----------------
+# Longest side in pixels; images are only ever scaled down.
+
+VARIANT_SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'full': 1280,
+}
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# model -> (file field, hash field, variants field)
+IMAGE_FIELDS = {
+    Futsal: ('image', 'image_hash', 'image_variants'),
+    Player: ('photo', 'photo_hash', 'photo_variants'),
+}
+
+# Small in-process pool so uploads return before resizing. Assets left
+# pending by a restart are picked up by `manage.py process_images`.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='images')
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def variant_name(content_hash, variant, ext):
+    return f"image_variants/{content_hash[:2]}/{content_hash}/{variant}.{ext}"
+
+
+def render_variants(asset):
+    with default_storage.open(asset.original, 'rb') as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image = image.convert('RGB')
+
+    variants = {}
+    for variant, size in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        variants[variant] = {}
+        for ext, (image_format, options) in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, image_format, **options)
+            name = variant_name(asset.content_hash, variant, ext)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variants[variant][ext] = default_storage.save(name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def process_asset(content_hash):
+    """
+    Renders an asset's variants and copies them onto every futsal and
+    player showing that image.
+    """
+    asset = ImageAsset.objects.filter(content_hash=content_hash, status='pending').first()
+    if asset is None:
+        return
+
+    try:
+        variants = render_variants(asset)
+    except Exception:
+        logger.exception("Could not render variants for image %s", content_hash)
+        ImageAsset.objects.filter(pk=asset.pk).update(status='failed')
+        return
+
+    now = timezone.now()
+    with transaction.atomic():
+        ImageAsset.objects.filter(pk=asset.pk).update(variants=variants, status='ready')
+        # Bump the version stamps too, so conditional GETs see the new URLs
+        Futsal.objects.filter(image_hash=content_hash).update(image_variants=variants, updated_at=now)
+        Player.objects.filter(photo_hash=content_hash).update(photo_variants=variants)
+        Team.objects.filter(players__photo_hash=content_hash).update(updated_at=now)
+
+
+def _process_in_background(content_hash):
+    try:
+        process_asset(content_hash)
+    finally:
+        connection.close()  # Worker threads would otherwise hold their connection forever
+
+
+def enqueue(content_hash):
+    transaction.on_commit(lambda: _executor.submit(_process_in_background, content_hash))
+
+
+# ----------------- Upload hooks -----------------
+
+def prepare_upload(instance):
+    """
+    pre_save: hash a newly uploaded file. Content seen before reuses the
+    stored original and its ready variants instead of saving a second copy.
+    """
+    file_field, hash_field, variants_field = IMAGE_FIELDS[type(instance)]
+    file = getattr(instance, file_field)
+
+    if not file:
+        setattr(instance, hash_field, '')
+        setattr(instance, variants_field, {})
+        return
+    if file._committed:
+        return  # Unchanged
+
+    digest = content_hash(file)
+    setattr(instance, hash_field, digest)
+    asset = ImageAsset.objects.filter(content_hash=digest).first()
+    if asset:
+        setattr(instance, file_field, asset.original)
+        setattr(instance, variants_field, asset.variants)
+    else:
+        setattr(instance, variants_field, {})
+        instance._new_image = True  # For register_upload
+
+
+def register_upload(instance):
+    """
+    post_save: record a first-seen original and queue its variants. Saves
+    that kept the stored file, or matched a known one, skip the lookup.
+    """
+    if not instance.__dict__.pop('_new_image', False):
+        return
+    file_field, hash_field, _ = IMAGE_FIELDS[type(instance)]
+    digest = getattr(instance, hash_field)
+
+    asset, created = ImageAsset.objects.get_or_create(
+        content_hash=digest,
+        defaults={'original': getattr(instance, file_field).name}
+    )
+    if created:
+        enqueue(digest)
+
+
+def backfill_hashes():
+    """
+    Hashes images stored before the variant pipeline existed and links each
+    row to its asset, creating pending ones for content not seen before.
+    Returns the number of rows backfilled.
+    """
+    backfilled = 0
+    for model, (file_field, hash_field, variants_field) in IMAGE_FIELDS.items():
+        rows = (model.objects.filter(**{hash_field: ''})
+                .exclude(**{file_field: ''}).exclude(**{f'{file_field}__isnull': True})
+                .only('pk', file_field))
+        for row in rows.iterator():
+            file = getattr(row, file_field)
+            try:
+                with file.open('rb'):
+                    digest = content_hash(file)
+            except FileNotFoundError:
+                logger.warning("Image %s of %s %s is missing from storage", file.name, model.__name__, row.pk)
+                continue
+            asset, _ = ImageAsset.objects.get_or_create(content_hash=digest, defaults={'original': file.name})
+            # Queryset update: no save() hooks, and an unchanged updated_at
+            model.objects.filter(pk=row.pk).update(**{hash_field: digest, variants_field: asset.variants})
+            backfilled += 1
+    return backfilled
+
+
+def variant_urls(variants, request=None):
+    def url(name):
+        location = default_storage.url(name)
+        return request.build_absolute_uri(location) if request else location
+
+    return {
+        variant: {ext: url(name) for ext, name in formats.items()}
+        for variant, formats in (variants or {}).items()
+    }
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from futsal_app.rejections import rejection_index
+
+
+class Command(BaseCommand):
+    help = "Mark rejections past their cooldown as cleared (run periodically, e.g. hourly)."
+
+    def handle(self, *args, **options):
+        count = rejection_index.clear_expired()
+        self.stdout.write(self.style.SUCCESS(f"Cleared {count} expired rejections."))
@@ -0,0 +1,58 @@
+import asyncio
+import statistics
+import time
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent requests at a running server and report throughput. "
+        "Run it against one worker under WSGI and then under ASGI to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000/api/', help="API root of the running server")
+        parser.add_argument('--path', default='competitive/recommend/', help="Endpoint under the API root")
+        parser.add_argument('--method', default='GET', choices=['GET', 'POST'])
+        parser.add_argument('--token', required=True, help="DRF token of the user to send requests as")
+        parser.add_argument('--requests', type=int, default=500, help="Total number of requests")
+        parser.add_argument('--concurrency', type=int, default=50, help="Requests in flight at once")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+
+        elapsed, latencies, statuses = asyncio.run(self.run(options))
+
+        latencies.sort()
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+        self.stdout.write(f"{options['method']} {options['path']}: {len(latencies)} requests, "
+                          f"concurrency {options['concurrency']}")
+        self.stdout.write(f"  throughput  {len(latencies) / elapsed:.1f} req/s")
+        self.stdout.write(f"  latency     p50 {statistics.median(latencies) * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms")
+        self.stdout.write(f"  statuses    {dict(sorted(statuses.items()))}")
+
+    async def run(self, options):
+        url = options['base_url'].rstrip('/') + '/' + options['path'].lstrip('/')
+        headers = {"Authorization": f"Token {options['token']}"}
+        remaining = iter(range(options['requests']))
+        latencies, statuses = [], {}
+
+        async def worker(client):
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(options['method'], url, headers=headers)
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = 'error'
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        limits = httpx.Limits(max_connections=options['concurrency'])
+        async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(options['concurrency'])))
+            return time.perf_counter() - started, latencies, statuses
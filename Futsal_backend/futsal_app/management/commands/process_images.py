@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from futsal_app.images import backfill_hashes, process_asset
+from futsal_app.models import ImageAsset
+
+
+class Command(BaseCommand):
+    help = "Render variants for uploaded images still pending (e.g. after a restart)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help="Also retry images that failed before")
+        parser.add_argument('--backfill', action='store_true',
+                            help="First hash images uploaded before variants existed and queue them")
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.stdout.write(f"Backfilled {backfill_hashes()} images.")
+        if options['retry_failed']:
+            ImageAsset.objects.filter(status='failed').update(status='pending')
+
+        hashes = list(ImageAsset.objects.filter(status='pending').values_list('content_hash', flat=True))
+        for content_hash in hashes:
+            process_asset(content_hash)
+
+        ready = ImageAsset.objects.filter(content_hash__in=hashes, status='ready').count()
+        self.stdout.write(self.style.SUCCESS(f"Processed {ready} of {len(hashes)} pending images."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from futsal_app.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the team / futsal trigram search index from scratch."
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} teams and futsals."))
@@ -0,0 +1,28 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from futsal_app.analytics import rollup_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-futsal daily analytics rollups (run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help="First day, YYYY-MM-DD (default: yesterday)")
+        parser.add_argument('--to', dest='date_to', help="Last day, YYYY-MM-DD (default: today)")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        try:
+            date_from = date.fromisoformat(options['date_from']) if options['date_from'] else today - timedelta(days=1)
+            date_to = date.fromisoformat(options['date_to']) if options['date_to'] else today
+        except ValueError:
+            raise CommandError("Dates must be YYYY-MM-DD.")
+
+        if date_from > date_to:
+            raise CommandError("--from must not be after --to.")
+
+        count = rollup_daily_stats(date_from, date_to)
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {count} futsal-days from {date_from} to {date_to}."))
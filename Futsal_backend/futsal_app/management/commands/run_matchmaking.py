@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from futsal_app.matchmaking import run_matchmaking_cycle
+
+
+class Command(BaseCommand):
+    help = "Pair the teams waiting in the matchmaking queue (run every few minutes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, help="Keep running, one cycle every N seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            result = run_matchmaking_cycle()
+            self.stdout.write(
+                f"{result['waiting']} waiting, {result['paired']} paired into {len(result['matches'])} matches, "
+                f"{result['expired']} expired ({(time.perf_counter() - started) * 1000:.0f} ms)"
+            )
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,117 @@
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.database import sqlite_pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare SQLite as shipped with DB_SQLITE_PERFORMANCE=1 under concurrent "
+        "slot reads and booking writes, on throwaway database files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration of each run")
+        parser.add_argument('--readers', type=int, default=8, help="Threads listing open slots")
+        parser.add_argument('--writers', type=int, default=4, help="Threads booking slots")
+        parser.add_argument('--slots', type=int, default=20000, help="Seeded slot rows")
+
+    def handle(self, *args, **options):
+        if options['seconds'] <= 0 or options['readers'] < 0 or options['writers'] < 1:
+            raise CommandError("Need a positive duration and at least one writer.")
+
+        modes = {
+            # What Django does without OPTIONS: rollback journal, deferred transactions
+            'default': ([], 'DEFERRED'),
+            'performance': (sqlite_pragmas({}), 'IMMEDIATE'),
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, (pragmas, begin) in modes.items():
+                path = Path(tmp) / f"{name}.sqlite3"
+                self.seed(path, options['slots'])
+                reads, writes, locked = self.run(path, pragmas, begin, options)
+
+                seconds = options['seconds']
+                self.stdout.write(
+                    f"{name:<12} reads {reads / seconds:>9.0f}/s   writes {writes / seconds:>7.0f}/s   "
+                    f"'database is locked' {locked}"
+                )
+
+    def connect(self, path, pragmas):
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        for pragma in pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def seed(self, path, count):
+        conn = self.connect(path, [])
+        conn.execute(
+            "CREATE TABLE slot (id INTEGER PRIMARY KEY, futsal_id INTEGER, start_time INTEGER, is_booked INTEGER)"
+        )
+        conn.execute("CREATE INDEX slot_futsal_start ON slot (futsal_id, start_time)")
+        conn.executemany(
+            "INSERT INTO slot (futsal_id, start_time, is_booked) VALUES (?, ?, 0)",
+            ((i % 50, i) for i in range(count))
+        )
+        conn.close()
+
+    def run(self, path, pragmas, begin, options):
+        deadline = time.perf_counter() + options['seconds']
+        counts = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+
+        def bump(key):
+            with lock:
+                counts[key] += 1
+
+        def reader():
+            conn = self.connect(path, pragmas)
+            while time.perf_counter() < deadline:
+                try:
+                    conn.execute(
+                        "SELECT id, start_time FROM slot WHERE futsal_id = ? AND is_booked = 0 "
+                        "ORDER BY start_time LIMIT 50",
+                        (random.randrange(50),)
+                    ).fetchall()
+                    bump('reads')
+                except sqlite3.OperationalError:
+                    bump('locked')
+            conn.close()
+
+        def writer():
+            # Same shape as a booking: read a free slot, then mark it booked
+            conn = self.connect(path, pragmas)
+            while time.perf_counter() < deadline:
+                try:
+                    conn.execute(f"BEGIN {begin}")
+                    row = conn.execute(
+                        "SELECT id FROM slot WHERE futsal_id = ? AND is_booked = 0 LIMIT 1",
+                        (random.randrange(50),)
+                    ).fetchone()
+                    if row:
+                        conn.execute("UPDATE slot SET is_booked = 1 WHERE id = ?", row)
+                    conn.execute("COMMIT")
+                    bump('writes')
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    bump('locked')
+            conn.close()
+
+        threads = (
+            [threading.Thread(target=reader) for _ in range(options['readers'])] +
+            [threading.Thread(target=writer) for _ in range(options['writers'])]
+        )
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return counts['reads'], counts['writes'], counts['locked']
@@ -0,0 +1,287 @@
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from scipy.optimize import linear_sum_assignment
+
+from .models import Match, MatchmakingTicket, MatchmakingWindow, Team, TimeSlot
+from .notifications import notify_matches_found
+from .rejections import rejection_index
+from .signals import slots_booked
+
+
+# ----------------- Queue -----------------
+# Teams enqueue with a few availability windows. Every cycle pairs the
+# waiting teams in one batch and books each pair a free slot that lies inside
+# a window of both teams, at a futsal both of them play at (preferred or
+# home). Teams left over simply wait for the next cycle.
+
+MAX_WINDOWS = 5     # Windows per ticket
+HORIZON_DAYS = 14   # How far ahead a window may start
+
+MAX_ELO_GAP = 400           # Pairs further apart are never matched
+ELO_GAP_SCALE = 100         # Elo gap costing 1.0
+SHARED_FUTSAL_BONUS = 0.2   # Per shared futsal, counted up to 3
+WAIT_BONUS_PER_HOUR = 0.05  # Per team, so long waits get paired first
+MAX_WAIT_BONUS = 1.0
+
+INFEASIBLE = 1e6
+
+
+def enqueue_team(team, windows):
+    """
+    windows: [(start, end)]. Raises IntegrityError if the team is already waiting.
+    """
+    with transaction.atomic():
+        ticket = MatchmakingTicket.objects.create(team=team)
+        MatchmakingWindow.objects.bulk_create([
+            MatchmakingWindow(ticket=ticket, start=start, end=end) for start, end in windows
+        ])
+    return ticket
+
+
+def expire_tickets(now):
+    # Waiting tickets with no window left to play in
+    return MatchmakingTicket.objects.filter(status='waiting').exclude(windows__end__gt=now).update(status='expired')
+
+
+# ----------------- Solver -----------------
+# Pure numpy / scipy over index arrays, so a cycle costs a handful of queries
+# plus a few milliseconds of solving.
+
+def usable_slots(venues, windows, slot_futsal, slot_start, slot_end):
+    """
+    (teams x slots) bool matrix: slot at one of the team's venues and inside
+    one of its windows. venues is a (teams x futsals) bool matrix, windows a
+    list of [(start ts, end ts)] per team, slot_* parallel arrays.
+    """
+    usable = venues[:, slot_futsal]
+    for i, team_windows in enumerate(windows):
+        in_window = np.zeros(len(slot_start), dtype=bool)
+        for start, end in team_windows:
+            in_window |= (slot_start >= start) & (slot_end <= end)
+        usable[i] &= in_window
+    return usable
+
+
+def pair_costs(ratings, waited_hours, venues, usable, blocked):
+    """
+    Symmetric (teams x teams) cost; INFEASIBLE where two teams can't meet.
+    """
+    usable = usable.astype(np.float32)
+    venues = venues.astype(np.float32)
+    common_slots = usable @ usable.T
+    shared_venues = venues @ venues.T
+
+    gap = np.abs(ratings[:, None] - ratings[None, :])
+    wait_bonus = np.minimum(waited_hours * WAIT_BONUS_PER_HOUR, MAX_WAIT_BONUS)
+
+    cost = (
+        gap / ELO_GAP_SCALE
+        - SHARED_FUTSAL_BONUS * np.minimum(shared_venues, 3)
+        - wait_bonus[:, None] - wait_bonus[None, :]
+    )
+    feasible = (common_slots > 0) & (gap <= MAX_ELO_GAP) & ~blocked
+    np.fill_diagonal(feasible, False)
+    return np.where(feasible, cost, INFEASIBLE)
+
+
+def _cycles(permutation):
+    seen = np.zeros(len(permutation), dtype=bool)
+    for start in range(len(permutation)):
+        cycle = []
+        node = start
+        while not seen[node]:
+            seen[node] = True
+            cycle.append(node)
+            node = permutation[node]
+        if cycle:
+            yield cycle
+
+
+def pair_indices(cost):
+    """
+    Min-cost pairing of the teams. The assignment problem over the symmetric
+    cost matrix is solved exactly; its permutation is mostly 2-cycles (pairs).
+    Longer cycles are split into the cheapest set of consecutive pairs, leaving
+    one team out of an odd cycle.
+    """
+    n = len(cost)
+    if n < 2:
+        return []
+
+    _, permutation = linear_sum_assignment(cost)
+    pairs = []
+    for cycle in _cycles(permutation):
+        k = len(cycle)
+        if k < 2:
+            continue
+
+        best = None
+        for offset in range(k if k % 2 else 2):
+            candidate = [
+                (cycle[(offset + 2 * step) % k], cycle[(offset + 2 * step + 1) % k])
+                for step in range(k // 2)
+            ]
+            candidate = [(i, j) for i, j in candidate if cost[i, j] < INFEASIBLE]
+            key = (-len(candidate), sum(cost[i, j] for i, j in candidate))
+            if best is None or key < best[0]:
+                best = (key, candidate)
+        pairs.extend(best[1])
+    return pairs
+
+
+def assign_slots(pairs, usable, slot_cost):
+    """
+    One distinct slot per pair, minimizing slot_cost (earliest first); pairs
+    that lose every slot they could use get None.
+    """
+    if not pairs:
+        return []
+
+    left, right = zip(*pairs)
+    candidates = usable[list(left)] & usable[list(right)]
+    columns = np.flatnonzero(candidates.any(axis=0))
+    cost = np.where(candidates[:, columns], slot_cost[columns][None, :], INFEASIBLE)
+
+    slots = [None] * len(pairs)
+    rows, cols = linear_sum_assignment(cost)
+    for row, col in zip(rows, cols):
+        if cost[row, col] < INFEASIBLE:
+            slots[row] = int(columns[col])
+    return slots
+
+
+# ----------------- Cycle -----------------
+
+def load_queue(now):
+    tickets = list(
+        MatchmakingTicket.objects.filter(status='waiting')
+        .select_related('team__owner')
+        .prefetch_related(Prefetch('windows', queryset=MatchmakingWindow.objects.filter(end__gt=now)))
+        .order_by('created_at', 'id')
+    )
+
+    venues = defaultdict(set)
+    preferred = Team.preferred_futsals.through.objects.filter(team_id__in=[t.team_id for t in tickets])
+    for team_id, futsal_id in preferred.values_list('team_id', 'futsal_id'):
+        venues[team_id].add(futsal_id)
+    for ticket in tickets:
+        if ticket.team.futsal_id:
+            venues[ticket.team_id].add(ticket.team.futsal_id)
+
+    ends = [window.end for ticket in tickets for window in ticket.windows.all()]
+    futsal_ids = set().union(*venues.values())
+    if not ends or not futsal_ids:
+        return tickets, venues, []
+
+    slots = list(
+        TimeSlot.objects.filter(is_booked=False, start_time__gt=now, start_time__lt=max(ends), futsal_id__in=futsal_ids)
+        .values_list('id', 'futsal_id', 'start_time', 'end_time')
+    )
+    return tickets, venues, slots
+
+
+def plan_cycle(tickets, venues, slots, now):
+    """
+    [(ticket, ticket, slot id)] for this cycle's pairs.
+    """
+    if len(tickets) < 2 or not slots:
+        return []
+
+    futsal_index = {futsal_id: k for k, futsal_id in enumerate(sorted({slot[1] for slot in slots}))}
+    venue_matrix = np.zeros((len(tickets), len(futsal_index)), dtype=bool)
+    for i, ticket in enumerate(tickets):
+        for futsal_id in venues[ticket.team_id]:
+            if futsal_id in futsal_index:
+                venue_matrix[i, futsal_index[futsal_id]] = True
+
+    slot_ids = np.array([slot[0] for slot in slots])
+    slot_futsal = np.array([futsal_index[slot[1]] for slot in slots])
+    slot_start = np.array([slot[2].timestamp() for slot in slots])
+    slot_end = np.array([slot[3].timestamp() for slot in slots])
+    windows = [[(w.start.timestamp(), w.end.timestamp()) for w in ticket.windows.all()] for ticket in tickets]
+    usable = usable_slots(venue_matrix, windows, slot_futsal, slot_start, slot_end)
+
+    position = {ticket.team_id: i for i, ticket in enumerate(tickets)}
+    blocked = np.zeros((len(tickets), len(tickets)), dtype=bool)
+    for i, ticket in enumerate(tickets):
+        for rejecting_id in rejection_index.rejectors_of(ticket.team_id):
+            j = position.get(rejecting_id)
+            if j is not None:
+                blocked[i, j] = blocked[j, i] = True
+
+    ratings = np.array([ticket.team.ranking for ticket in tickets], dtype=float)
+    waited_hours = np.array([(now - ticket.created_at).total_seconds() / 3600 for ticket in tickets])
+    cost = pair_costs(ratings, waited_hours, venue_matrix, usable, blocked)
+
+    pairs = pair_indices(cost)
+    slot_cost = (slot_start - now.timestamp()) / 86400  # Days until kick-off
+    return [
+        (tickets[i], tickets[j], int(slot_ids[slot]))
+        for (i, j), slot in zip(pairs, assign_slots(pairs, usable, slot_cost))
+        if slot is not None
+    ]
+
+
+def book_pairs(plan, now):
+    """
+    Books the planned slots and creates the matches in bulk. Slots taken and
+    tickets cancelled since the plan was made are skipped; those teams stay
+    queued. Bulk writes skip the model signals, so slots_booked runs the
+    slot hooks.
+    """
+    if not plan:
+        return []
+
+    with transaction.atomic():
+        slot_ids = [slot_id for _, _, slot_id in plan]
+        ticket_ids = [ticket.id for a, b, _ in plan for ticket in (a, b)]
+        slots = TimeSlot.objects.select_for_update().select_related('futsal').filter(id__in=slot_ids, is_booked=False).in_bulk()
+        waiting = set(
+            MatchmakingTicket.objects.select_for_update()
+            .filter(id__in=ticket_ids, status='waiting')
+            .values_list('id', flat=True)
+        )
+        plan = [
+            (ticket_a, ticket_b, slots[slot_id]) for ticket_a, ticket_b, slot_id in plan
+            if slot_id in slots and ticket_a.id in waiting and ticket_b.id in waiting
+        ]
+        if not plan:
+            return []
+
+        TimeSlot.objects.filter(id__in=[slot.id for _, _, slot in plan]).update(is_booked=True)
+        matches = Match.objects.bulk_create([
+            Match(
+                team_1=ticket_a.team,
+                team_2=ticket_b.team,
+                match_type='competitive',
+                status='scheduled',
+                accepted=True,
+                scheduled_date=timezone.localdate(slot.start_time),
+                futsal=slot.futsal,
+                time_slot=slot,
+            )
+            for ticket_a, ticket_b, slot in plan
+        ])
+
+        # One small UPDATE per pair; bulk_update's CASE per row builds far slower
+        for (ticket_a, ticket_b, slot), match in zip(plan, matches):
+            slot.is_booked = True
+            MatchmakingTicket.objects.filter(id__in=[ticket_a.id, ticket_b.id]).update(
+                status='matched', match=match, time_slot=slot, matched_at=now
+            )
+
+        notify_matches_found([(match, slot) for (_, _, slot), match in zip(plan, matches)])
+        slots_booked([slot for _, _, slot in plan])
+    return matches
+
+
+def run_matchmaking_cycle(now=None):
+    now = now or timezone.now()
+    expired = expire_tickets(now)
+    tickets, venues, slots = load_queue(now)
+    matches = book_pairs(plan_cycle(tickets, venues, slots, now), now)
+    return {"waiting": len(tickets), "paired": 2 * len(matches), "matches": matches, "expired": expired}
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('futsal_app', '0005_teamrejection'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['team_1', 'status'], name='match_team1_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['team_2', 'status'], name='match_team2_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['team_1', 'team_2'], name='match_pending_pair_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['transaction_id'], name='payment_transaction_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teammatch',
+            index=models.Index(condition=models.Q(('result_updated', False)), fields=['team_1', 'created_at'], name='teammatch_team1_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teammatch',
+            index=models.Index(condition=models.Q(('result_updated', False)), fields=['team_2', 'created_at'], name='teammatch_team2_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teammatch',
+            index=models.Index(condition=models.Q(('result_updated', False)), fields=['time_slot'], name='teammatch_slot_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamrejection',
+            index=models.Index(condition=models.Q(('cleared', False)), fields=['rejected_team', 'rejecting_team'], name='rejection_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamrejection',
+            index=models.Index(condition=models.Q(('cleared', False)), fields=['timestamp'], name='rejection_active_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeslot',
+            index=models.Index(fields=['futsal', 'start_time'], name='timeslot_futsal_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeslot',
+            index=models.Index(condition=models.Q(('is_booked', False)), fields=['start_time'], name='timeslot_open_start_idx'),
+        ),
+    ]
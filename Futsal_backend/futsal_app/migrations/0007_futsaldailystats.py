@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('futsal_app', '0006_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FutsalDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('slots_offered', models.PositiveIntegerField(default=0)),
+                ('slots_booked', models.PositiveIntegerField(default=0)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cash_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('esewa_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('competitive_matches', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('futsal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='futsal_app.futsal')),
+            ],
+            options={
+                'unique_together': {('futsal', 'day')},
+            },
+        ),
+    ]
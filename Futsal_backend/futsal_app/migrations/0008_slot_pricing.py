@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('futsal_app', '0007_futsaldailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeslot',
+            name='last_minute_from',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='last_minute_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.CreateModel(
+            name='PriceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=50)),
+                ('weekdays', models.CharField(default='0123456', max_length=7)),
+                ('start_hour', models.PositiveSmallIntegerField(default=0)),
+                ('end_hour', models.PositiveSmallIntegerField(default=24)),
+                ('multiplier', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('last_minute_hours', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('futsal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_rules', to='futsal_app.futsal')),
+            ],
+        ),
+    ]
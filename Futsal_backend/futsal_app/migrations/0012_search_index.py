@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('futsal_app', '0011_futsal_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('team', 'Team'), ('futsal', 'Futsal')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('gram', models.CharField(max_length=3)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['gram', 'kind', 'object_id'], name='searchgram_gram_idx'), models.Index(fields=['object_id', 'kind'], name='searchgram_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('futsal_app', '0014_one_team_per_owner'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(choices=[('match_invite', 'Match Invite'), ('match_request', 'Competitive Match Request'), ('match_result', 'Match Result'), ('match_found', 'Matchmaking Match Found')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='MatchmakingTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('matched', 'Matched'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], default='waiting', max_length=10)),
+                ('matched_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='matchmaking_tickets', to='futsal_app.match')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matchmaking_tickets', to='futsal_app.team')),
+                ('time_slot', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='futsal_app.timeslot')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MatchmakingWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='windows', to='futsal_app.matchmakingticket')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='matchmakingticket',
+            index=models.Index(condition=models.Q(('status', 'waiting')), fields=['created_at'], name='ticket_waiting_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='matchmakingticket',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'waiting')), fields=('team',), name='one_waiting_ticket_per_team'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('futsal_app', '0015_matchmaking_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='time_slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='competitive_matches', to='futsal_app.timeslot'),
+        ),
+    ]
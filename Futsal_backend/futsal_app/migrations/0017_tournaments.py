@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('futsal_app', '0016_match_time_slot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tournament',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('format', models.CharField(choices=[('round_robin', 'Round-robin League'), ('knockout', 'Knockout')], max_length=20)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('rest_days', models.PositiveSmallIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('futsals', models.ManyToManyField(related_name='tournaments', to='futsal_app.futsal')),
+                ('organizer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='organized_tournaments', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TournamentEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seed', models.PositiveSmallIntegerField(default=0)),
+                ('weekdays', models.CharField(default='0123456', max_length=7)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tournament_entries', to='futsal_app.team')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='futsal_app.tournament')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='teams',
+            field=models.ManyToManyField(related_name='tournaments', through='futsal_app.TournamentEntry', to='futsal_app.team'),
+        ),
+        migrations.CreateModel(
+            name='Fixture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round', models.PositiveSmallIntegerField()),
+                ('position', models.PositiveSmallIntegerField()),
+                ('match', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fixture', to='futsal_app.match')),
+                ('team_1', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='futsal_app.team')),
+                ('team_2', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='futsal_app.team')),
+                ('time_slot', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='futsal_app.timeslot')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fixtures', to='futsal_app.tournament')),
+            ],
+            options={
+                'ordering': ['round', 'position'],
+                'constraints': [models.UniqueConstraint(fields=('tournament', 'round', 'position'), name='one_fixture_per_position')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tournamententry',
+            constraint=models.UniqueConstraint(fields=('tournament', 'team'), name='one_entry_per_team'),
+        ),
+    ]
@@ -1,9 +1,11 @@
 from django.db import models
+from django.db.models import Q
 from core.models import CustomUser
 from django.conf import settings
 from django.utils import timezone
 import math
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator, MaxValueValidator
 
 class Futsal(models.Model):
     owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, limit_choices_to={'user_type': 'owner'})
@@ -14,6 +16,18 @@ class Futsal(models.Model):
     image = models.ImageField(upload_to='futsal_images/', null=True, blank=True)
     description = models.TextField(blank=True)
 
+    # Filled by futsal_app.images: content hash of `image` and its resized variants
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    # Map position; geo_cell is the grid bucket used by the nearby search (set on save)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
+
+    # Version stamp for conditional GETs (ETag / Last-Modified)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return self.name
 
@@ -59,8 +73,13 @@ class Team(models.Model):
 
     created_at = models.DateTimeField(default=timezone.now)
 
+    # Version stamp for conditional GETs; also bumped when players or preferred futsals change
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
-        unique_together = ('name', 'owner')
+        constraints = [
+            models.UniqueConstraint(fields=['owner'], name='one_team_per_owner'),
+        ]
 
     def __str__(self):
         return self.name
@@ -90,6 +109,8 @@ class Player(models.Model):
     age = models.PositiveIntegerField()
     position = models.CharField(max_length=20, choices=POSITION_CHOICES, blank=True)
     photo = models.ImageField(upload_to='player_photos/', blank=True, null=True)
+    photo_hash = models.CharField(max_length=64, blank=True, editable=False)
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_captain = models.BooleanField(default=False)
     is_goalkeeper = models.BooleanField(default=False)
 
@@ -126,6 +147,14 @@ class TeamMatch(models.Model):
     result_updated = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Open (result not yet recorded) matches per participant / venue slot
+            models.Index(fields=['team_1', 'created_at'], condition=Q(result_updated=False), name='teammatch_team1_open_idx'),
+            models.Index(fields=['team_2', 'created_at'], condition=Q(result_updated=False), name='teammatch_team2_open_idx'),
+            models.Index(fields=['time_slot'], condition=Q(result_updated=False), name='teammatch_slot_open_idx'),
+        ]
+
     def clean(self):
         if self.match_type == 'friendly' and not self.time_slot:
             raise ValidationError("Friendly matches require a time slot.")
@@ -172,6 +201,7 @@ class Match(models.Model):
         blank=True,
         related_name='matches'
     )
+    time_slot = models.ForeignKey('TimeSlot', on_delete=models.SET_NULL, null=True, blank=True, related_name='competitive_matches')
  
     winner = models.ForeignKey(Team, on_delete=models.SET_NULL, null=True, blank=True, related_name='matches_won')
     is_completed = models.BooleanField(default=False)
@@ -182,6 +212,14 @@ class Match(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['team_1', 'status'], name='match_team1_status_idx'),
+            models.Index(fields=['team_2', 'status'], name='match_team2_status_idx'),
+            # Duplicate pending request check in send_match_request
+            models.Index(fields=['team_1', 'team_2'], condition=Q(status='pending'), name='match_pending_pair_idx'),
+        ]
+
     def __str__(self):
         return f"{self.team_1.name} vs {self.team_2.name} ({self.status})"
 
@@ -193,12 +231,60 @@ class TimeSlot(models.Model):
     is_booked = models.BooleanField(default=False)
     booked_by_match = models.ForeignKey('TeamMatch', null=True, blank=True, on_delete=models.SET_NULL, related_name='booked_slot')
 
+    # Precomputed by futsal_app.pricing when the slot is generated; None = futsal's base price
+    price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    last_minute_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    last_minute_from = models.DateTimeField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Booleans compare as NOT is_booked, so is_booked is a partial-index condition rather than a key column
+            models.Index(fields=['futsal', 'start_time'], name='timeslot_futsal_start_idx'),
+            models.Index(fields=['start_time'], condition=Q(is_booked=False), name='timeslot_open_start_idx'),
+        ]
+
     def __str__(self):
         return f"{self.futsal.name} | {self.start_time.strftime('%Y-%m-%d %H:%M')} - {self.end_time.strftime('%H:%M')} ({'Booked' if self.is_booked else 'Available'})"
     
 
+# Slot Pricing Rules
+class PriceRule(models.Model):
+    futsal = models.ForeignKey(Futsal, on_delete=models.CASCADE, related_name='price_rules')
+    label = models.CharField(max_length=50)  # e.g. "Evening peak", "Weekday mornings"
+
+    # Days the rule covers, 0 = Monday ... 6 = Sunday
+    weekdays = models.CharField(max_length=7, default='0123456')
+    start_hour = models.PositiveSmallIntegerField(default=0)
+    end_hour = models.PositiveSmallIntegerField(default=24)
+
+    multiplier = models.DecimalField(max_digits=4, decimal_places=2)
+
+    # Set for last-minute rules: only applies when booking within this many hours of kick-off
+    last_minute_hours = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def clean(self):
+        if not self.weekdays or any(day not in '0123456' for day in self.weekdays):
+            raise ValidationError("Weekdays must be digits 0 (Monday) to 6 (Sunday).")
+        if not 0 <= self.start_hour < self.end_hour <= 24:
+            raise ValidationError("Hours must satisfy 0 <= start_hour < end_hour <= 24.")
+        if self.multiplier is not None and self.multiplier <= 0:
+            raise ValidationError("Multiplier must be positive.")
+
+    def covers(self, start_time):
+        return str(start_time.weekday()) in self.weekdays and self.start_hour <= start_time.hour < self.end_hour
+
+    def band_size(self):
+        # Weekday-hours covered; the narrowest matching band rule is the one that applies
+        return len(set(self.weekdays)) * (self.end_hour - self.start_hour)
+
+    def __str__(self):
+        return f"{self.futsal.name} | {self.label} x{self.multiplier}"
+
+
 # Competitive Match Making Model
 
 class MatchRequest(models.Model):
@@ -240,6 +326,11 @@ class TeamRejection(models.Model):
 
     class Meta:
         unique_together = ('rejecting_team', 'rejected_team')
+        indexes = [
+            # Active rejections only; (rejecting_team, rejected_team) is covered by the unique index
+            models.Index(fields=['rejected_team', 'rejecting_team'], condition=Q(cleared=False), name='rejection_active_idx'),
+            models.Index(fields=['timestamp'], condition=Q(cleared=False), name='rejection_active_ts_idx'),
+        ]
 
 
 # Payment Model
@@ -261,8 +352,200 @@ class Payment(models.Model):
     transaction_id = models.CharField(max_length=50, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['transaction_id'], name='payment_transaction_idx'),
+        ]
+
+
+# Owner Analytics Rollup
+class FutsalDailyStats(models.Model):
+    futsal = models.ForeignKey(Futsal, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+
+    slots_offered = models.PositiveIntegerField(default=0)
+    slots_booked = models.PositiveIntegerField(default=0)
+
+    paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cash_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    esewa_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    competitive_matches = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('futsal', 'day')
+
+    def __str__(self):
+        return f"{self.futsal.name} | {self.day} ({self.slots_booked}/{self.slots_offered} booked)"
+
+
+# In-app Notifications
+class Notification(models.Model):
+    KIND_CHOICES = [
+        ('match_invite', 'Match Invite'),
+        ('match_request', 'Competitive Match Request'),
+        ('match_result', 'Match Result'),
+        ('match_found', 'Matchmaking Match Found'),
+    ]
+
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The id doubles as the stream cursor (SSE Last-Event-ID)
+            models.Index(fields=['recipient', 'id'], name='notification_cursor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient.username} | {self.kind} #{self.id}"
+
+
+# Search Index (maintained by futsal_app.search)
+class SearchGram(models.Model):
+    KIND_CHOICES = [
+        ('team', 'Team'),
+        ('futsal', 'Futsal'),
+    ]
 
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    gram = models.CharField(max_length=3)
 
+    class Meta:
+        indexes = [
+            # Covering index for the candidate GROUP BY; object_id leads the other so
+            # the planner can't pick it to scan a whole kind in object_id order
+            models.Index(fields=['gram', 'kind', 'object_id'], name='searchgram_gram_idx'),
+            models.Index(fields=['object_id', 'kind'], name='searchgram_object_idx'),
+        ]
 
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}: {self.gram!r}"
 
 
+# Uploaded Images (one row per distinct file content)
+class ImageAsset(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
+    content_hash = models.CharField(max_length=64, unique=True)  # sha256 of the original
+    original = models.CharField(max_length=255)  # Storage name of the first upload
+    variants = models.JSONField(default=dict, blank=True)  # {"thumb": {"webp": name, "jpeg": name}, ...}
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.status})"
+
+
+# Matchmaking Queue (paired in batches by futsal_app.matchmaking)
+class MatchmakingTicket(models.Model):
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('matched', 'Matched'),
+        ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),
+    ]
+
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='matchmaking_tickets')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='waiting')
+
+    # Set when paired
+    match = models.ForeignKey(Match, on_delete=models.SET_NULL, null=True, blank=True, related_name='matchmaking_tickets')
+    time_slot = models.ForeignKey(TimeSlot, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    matched_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['team'], condition=Q(status='waiting'), name='one_waiting_ticket_per_team'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], condition=Q(status='waiting'), name='ticket_waiting_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.team.name} ({self.status})"
+
+
+class MatchmakingWindow(models.Model):
+    ticket = models.ForeignKey(MatchmakingTicket, on_delete=models.CASCADE, related_name='windows')
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.start:%Y-%m-%d %H:%M} - {self.end:%H:%M}"
+
+
+# Tournaments (fixtures generated by futsal_app.tournaments)
+class Tournament(models.Model):
+    FORMAT_CHOICES = [
+        ('round_robin', 'Round-robin League'),
+        ('knockout', 'Knockout'),
+    ]
+
+    name = models.CharField(max_length=100)
+    format = models.CharField(max_length=20, choices=FORMAT_CHOICES)
+    organizer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='organized_tournaments')
+    teams = models.ManyToManyField(Team, through='TournamentEntry', related_name='tournaments')
+    futsals = models.ManyToManyField(Futsal, related_name='tournaments')
+
+    start_date = models.DateField()
+    end_date = models.DateField()
+    rest_days = models.PositiveSmallIntegerField(default=1)  # Full days off between a team's matches
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.get_format_display()})"
+
+
+class TournamentEntry(models.Model):
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='entries')
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='tournament_entries')
+    seed = models.PositiveSmallIntegerField(default=0)  # 1 = strongest; knockout brackets keep top seeds apart
+    weekdays = models.CharField(max_length=7, default='0123456')  # Days the team can play, Monday=0
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tournament', 'team'], name='one_entry_per_team'),
+        ]
+
+    def __str__(self):
+        return f"{self.team.name} in {self.tournament.name}"
+
+
+class Fixture(models.Model):
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='fixtures')
+    round = models.PositiveSmallIntegerField()
+    position = models.PositiveSmallIntegerField()  # Knockout: winners of 2p and 2p+1 meet at p next round
+
+    # Empty until a knockout feeder is decided; one empty side on a bye
+    team_1 = models.ForeignKey(Team, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    team_2 = models.ForeignKey(Team, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+
+    time_slot = models.ForeignKey(TimeSlot, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    match = models.OneToOneField(Match, on_delete=models.SET_NULL, null=True, blank=True, related_name='fixture')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tournament', 'round', 'position'], name='one_fixture_per_position'),
+        ]
+        ordering = ['round', 'position']
+
+    @property
+    def is_bye(self):
+        # Only a first-round side can be empty for good; later ones await a winner
+        return self.round == 1 and (self.team_1_id is None) != (self.team_2_id is None)
+
+    def __str__(self):
+        return f"{self.tournament.name} R{self.round} #{self.position}"
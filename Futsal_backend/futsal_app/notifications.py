@@ -0,0 +1,181 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import Notification
+
+
+STREAM_BATCH_SIZE = 50     # Notifications read per query while catching up
+HEARTBEAT_SECONDS = 15     # Keep-alive comment so proxies don't drop idle streams
+FALLBACK_POLL_SECONDS = 5  # Re-check interval when no channel layer is configured
+STREAM_MAX_SECONDS = 30 * 60  # A stream then ends and EventSource reconnects from Last-Event-ID
+
+
+def notification_group_name(user_id):
+    return f"notifications.{user_id}"
+
+
+# ----------------- Publishing -----------------
+# Every notification is a row first; the channel layer only carries a
+# "something new" wake-up. Streams always read from the table after their
+# cursor, so a dropped wake-up or a reconnect never loses anything.
+
+def notify(recipients, kind, payload):
+    users = {user.id: user for user in recipients if user is not None}
+    if not users:
+        return []
+
+    notifications = Notification.objects.bulk_create([
+        Notification(recipient_id=user_id, kind=kind, payload=payload) for user_id in users
+    ])
+    transaction.on_commit(lambda: _wake(list(users)))
+    return notifications
+
+
+def _wake(user_ids):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for user_id in user_ids:
+        async_to_sync(channel_layer.group_send)(notification_group_name(user_id), {"type": "notification.wake"})
+
+
+def notify_match_invite(match):
+    notify([match.team_2.owner], 'match_invite', {
+        "team_match_id": match.id,
+        "from_team": match.team_1.name,
+        "match_type": match.match_type,
+        "scheduled_time": match.scheduled_time.isoformat(),
+        "futsal": match.time_slot.futsal.name if match.time_slot else None,
+    })
+
+
+def notify_match_request(match):
+    notify([match.team_2.owner], 'match_request', {
+        "match_id": match.id,
+        "from_team": match.team_1.name,
+        "from_team_id": match.team_1_id,
+    })
+
+
+def notify_friendly_result(match):
+    notify([match.team_1.owner, match.team_2.owner], 'match_result', {
+        "team_match_id": match.id,
+        "match_type": match.match_type,
+        "team_1": match.team_1.name,
+        "team_2": match.team_2.name,
+        "team_1_score": match.team_1_score,
+        "team_2_score": match.team_2_score,
+        "result": match.result,
+    })
+
+
+def notify_competitive_result(match):
+    notify([match.team_1.owner, match.team_2.owner], 'match_result', {
+        "match_id": match.id,
+        "match_type": 'competitive',
+        "team_1": match.team_1.name,
+        "team_2": match.team_2.name,
+        "team_1_score": match.goals_team_1,
+        "team_2_score": match.goals_team_2,
+        "winner": match.winner.name if match.winner else None,
+    })
+
+
+def notify_matches_found(bookings):
+    """
+    One 'match_found' notification per team owner for [(match, slot)], in a
+    single insert; the matchmaker books pairs in batches.
+    """
+    notifications = [
+        Notification(recipient_id=team.owner_id, kind='match_found', payload={
+            "match_id": match.id,
+            "team_1": match.team_1.name,
+            "team_2": match.team_2.name,
+            "futsal": slot.futsal.name,
+            "start_time": slot.start_time.isoformat(),
+            "end_time": slot.end_time.isoformat(),
+        })
+        for match, slot in bookings
+        for team in (match.team_1, match.team_2)
+    ]
+    Notification.objects.bulk_create(notifications)
+    user_ids = list({notification.recipient_id for notification in notifications})
+    transaction.on_commit(lambda: _wake(user_ids))
+    return notifications
+
+
+# ----------------- Reading -----------------
+
+def notifications_after(user_id, cursor, limit=STREAM_BATCH_SIZE):
+    return list(
+        Notification.objects.filter(recipient_id=user_id, id__gt=cursor)
+        .order_by('id')
+        .values('id', 'kind', 'payload', 'created_at')[:limit]
+    )
+
+
+def sse_event(notification):
+    data = json.dumps(notification, cls=DjangoJSONEncoder)
+    return f"id: {notification['id']}\nevent: {notification['kind']}\ndata: {data}\n\n"
+
+
+async def notification_stream(user_id, cursor, max_seconds=STREAM_MAX_SECONDS):
+    """
+    Server-sent events for one user, starting after `cursor` (the last id the
+    client saw, sent back by EventSource as Last-Event-ID on reconnect).
+    Needs an ASGI server: under WSGI an async iterator is drained to the end.
+    Ends after max_seconds so no connection is held forever.
+
+    The generator only reads the next batch once the server has taken the
+    previous one, so a slow client throttles its own stream instead of
+    buffering. Wake-ups sit in the channel layer's bounded per-channel queue;
+    any that overflow are dropped, which is harmless because one wake-up
+    already drains everything after the cursor.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    channel_layer = get_channel_layer()
+    channel = None
+    if channel_layer is not None:
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(notification_group_name(user_id), channel)
+
+    try:
+        yield f"retry: {FALLBACK_POLL_SECONDS * 1000}\n\n"
+        while True:
+            batch = await sync_to_async(notifications_after)(user_id, cursor)
+            for notification in batch:
+                cursor = notification['id']
+                yield sse_event(notification)
+            if len(batch) == STREAM_BATCH_SIZE:
+                continue  # Still catching up
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                if channel is not None:
+                    await asyncio.wait_for(channel_layer.receive(channel), min(HEARTBEAT_SECONDS, remaining))
+                else:
+                    await asyncio.sleep(min(FALLBACK_POLL_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+    finally:
+        if channel is not None:
+            await channel_layer.group_discard(notification_group_name(user_id), channel)
+
+
+def notification_poll(user_id, cursor):
+    """
+    The WSGI fallback: what is after `cursor`, then the response ends.
+    EventSource reconnects after the retry delay with Last-Event-ID, so the
+    client polls every FALLBACK_POLL_SECONDS without holding a worker.
+    """
+    yield f"retry: {FALLBACK_POLL_SECONDS * 1000}\n\n"
+    for notification in notifications_after(user_id, cursor):
+        yield sse_event(notification)
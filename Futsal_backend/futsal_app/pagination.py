@@ -0,0 +1,22 @@
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+
+
+class OptionalPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination that only kicks in when the client sends
+    ?page_size=N, so callers expecting a plain list keep working.
+    """
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination, newest first, on created_at (id breaks ties).
+    Opt-in via ?page_size=N like OptionalPageNumberPagination.
+    """
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,108 @@
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.utils import timezone
+
+from .heatmap import get_demand_heatmap
+from .models import TimeSlot
+
+
+# ----------------- Demand-based multiplier -----------------
+# Cells (weekday x hour) that historically fill above TARGET_OCCUPANCY get
+# dearer, emptier ones cheaper, within [DEMAND_MIN, DEMAND_MAX].
+
+TARGET_OCCUPANCY = 0.5
+DEMAND_SENSITIVITY = 0.5
+DEMAND_MIN = Decimal('0.80')
+DEMAND_MAX = Decimal('1.30')
+MIN_DEMAND_SAMPLES = 4  # Slots needed in a cell before its fill rate counts
+
+
+def demand_multiplier(heatmap, start_time):
+    weekday, hour = start_time.weekday(), start_time.hour
+    if heatmap["slots_offered"][weekday][hour] < MIN_DEMAND_SAMPLES:
+        return Decimal('1')
+
+    occupancy = heatmap["occupancy"][weekday][hour]
+    multiplier = Decimal(str(1 + DEMAND_SENSITIVITY * (occupancy - TARGET_OCCUPANCY)))
+    return min(max(multiplier, DEMAND_MIN), DEMAND_MAX)
+
+
+def _money(value):
+    return value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+# ----------------- Price table -----------------
+
+def band_rule_for(band_rules, local_start):
+    """
+    The one band rule that prices a slot: of those covering it, the
+    narrowest (fewest weekday-hours), then the newest. Overlapping rules
+    don't compound, so "Friday evening x1.5" inside "evenings x1.2" means
+    x1.5 on Friday evenings.
+    """
+    return min(
+        (rule for rule in band_rules if rule.covers(local_start)),
+        key=lambda rule: (rule.band_size(), -rule.created_at.timestamp(), -rule.id),
+        default=None
+    )
+
+
+def price_slots(futsal, slots):
+    """
+    Fills price / last_minute_price / last_minute_from on unsaved or existing
+    slots of one futsal: base price x demand multiplier x the applicable band
+    rule (band_rule_for). Loads the rules and demand history once, so pricing
+    a whole generated batch costs a constant number of queries.
+    """
+    rules = list(futsal.price_rules.all())
+    band_rules = [rule for rule in rules if rule.last_minute_hours is None]
+    last_minute_rules = [rule for rule in rules if rule.last_minute_hours is not None]
+    heatmap = get_demand_heatmap(futsal.id)
+
+    for slot in slots:
+        local_start = timezone.localtime(slot.start_time)
+
+        multiplier = demand_multiplier(heatmap, local_start)
+        band_rule = band_rule_for(band_rules, local_start)
+        if band_rule:
+            multiplier *= band_rule.multiplier
+        slot.price = _money(futsal.price_per_hour * multiplier)
+
+        # The widest matching last-minute window wins
+        last_minute = max(
+            (rule for rule in last_minute_rules if rule.covers(local_start)),
+            key=lambda rule: rule.last_minute_hours,
+            default=None
+        )
+        if last_minute:
+            slot.last_minute_price = _money(slot.price * last_minute.multiplier)
+            slot.last_minute_from = slot.start_time - timedelta(hours=last_minute.last_minute_hours)
+        else:
+            slot.last_minute_price = None
+            slot.last_minute_from = None
+
+    return slots
+
+
+def reprice_future_slots(futsal):
+    """
+    Rebuilds the price table for the futsal's open future slots after its
+    rules change.
+    """
+    slots = list(TimeSlot.objects.filter(futsal=futsal, is_booked=False, start_time__gt=timezone.now()))
+    price_slots(futsal, slots)
+    TimeSlot.objects.bulk_update(slots, ['price', 'last_minute_price', 'last_minute_from'], batch_size=500)
+    return len(slots)
+
+
+def slot_price(slot, now=None):
+    """
+    Price of a slot at booking time: an O(1) read of the precomputed columns.
+    """
+    now = now or timezone.now()
+    if slot.last_minute_price is not None and slot.last_minute_from and now >= slot.last_minute_from:
+        return slot.last_minute_price
+    if slot.price is not None:
+        return slot.price
+    return slot.futsal.price_per_hour
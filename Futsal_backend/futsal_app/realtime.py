@@ -0,0 +1,42 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+# ----------------- Slot availability push -----------------
+# Slot changes are fanned out to one channel-layer group per futsal and local
+# day, which is what SlotAvailabilityConsumer subscribes a socket to. Needs a
+# CHANNEL_LAYERS entry in settings, e.g. for tests and single-process dev:
+#
+#     CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+#
+# and channels_redis (or another shared layer) when running several workers.
+# Without a configured layer publishing is a no-op.
+
+def slot_group_name(futsal_id, day):
+    return f"slots.{futsal_id}.{day.isoformat()}"
+
+
+def slot_payload(slot):
+    return {
+        "id": slot.id,
+        "futsal": slot.futsal_id,
+        "start_time": slot.start_time.isoformat(),
+        "end_time": slot.end_time.isoformat(),
+        "is_booked": slot.is_booked,
+    }
+
+
+def publish_slot_event(event, futsal_id, day, payload):
+    """
+    Sends one slot event ("created", "booked", "released" or "removed") to
+    everyone watching that futsal and day.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    async_to_sync(channel_layer.group_send)(slot_group_name(futsal_id, day), {
+        "type": "slot.event",
+        "event": event,
+        "slot": payload,
+    })
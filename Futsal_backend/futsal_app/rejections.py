@@ -0,0 +1,153 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+
+COOLDOWN_DAYS = 1  # Number of days a rejection blocks invites
+
+VERSION_CACHE_KEY = "futsal_app:rejection_index:version"
+VERSION_CHECK_SECONDS = 1  # How stale another worker's writes may look here
+
+
+class RejectionIndex:
+    """
+    Process-local, TTL-aware view of the active TeamRejection rows.
+
+    Rejections are kept as {rejecting_team_id: {rejected_team_id: expires_at}}
+    plus the reverse mapping, so cooldown checks are dict lookups instead of a
+    query per candidate. Every write bumps a version number in the shared cache;
+    a worker checks it at most once per VERSION_CHECK_SECONDS and reloads from
+    the database when its copy is behind.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_rejecting = {}
+        self._by_rejected = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    # ----------------- Loading -----------------
+
+    def _shared_version(self):
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(VERSION_CACHE_KEY, 0, timeout=None)
+            version = cache.get(VERSION_CACHE_KEY, 0)
+        return version
+
+    def _load(self, version):
+        from .models import TeamRejection
+
+        cooldown = timedelta(days=COOLDOWN_DAYS)
+        rows = TeamRejection.objects.filter(
+            cleared=False,
+            timestamp__gt=timezone.now() - cooldown
+        ).values_list('rejecting_team_id', 'rejected_team_id', 'timestamp')
+
+        by_rejecting, by_rejected = {}, {}
+        for rejecting_id, rejected_id, timestamp in rows:
+            expires_at = (timestamp + cooldown).timestamp()
+            by_rejecting.setdefault(rejecting_id, {})[rejected_id] = expires_at
+            by_rejected.setdefault(rejected_id, {})[rejecting_id] = expires_at
+
+        self._by_rejecting = by_rejecting
+        self._by_rejected = by_rejected
+        self._version = version
+
+    def _ensure_fresh(self):
+        # Own writes apply locally; only other workers' wait for the next check
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < VERSION_CHECK_SECONDS:
+            return
+        version = self._shared_version()
+        self._checked_at = now
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._load(version)
+
+    def _bump(self):
+        """
+        Publish a change to the other workers. Keeps the local copy only if
+        no other worker has written since it was loaded.
+        """
+        try:
+            version = cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            # Key was evicted; recreate it so every worker reloads.
+            cache.add(VERSION_CACHE_KEY, 1, timeout=None)
+            version = cache.get(VERSION_CACHE_KEY)
+
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+        else:
+            self._version = None
+
+    # ----------------- Expiry -----------------
+
+    def clear_expired(self):
+        """
+        Marks rejections past their cooldown as cleared. Lookups already ignore
+        them by expiry, so this is housekeeping for `manage.py
+        clear_expired_rejections`, and needs no version bump (a queryset
+        update sends no signals).
+        """
+        from .models import TeamRejection
+
+        return TeamRejection.objects.filter(
+            cleared=False,
+            timestamp__lte=timezone.now() - timedelta(days=COOLDOWN_DAYS)
+        ).update(cleared=True)
+
+    # ----------------- Writes -----------------
+
+    def record(self, rejecting_id, rejected_id, timestamp):
+        expires_at = (timestamp + timedelta(days=COOLDOWN_DAYS)).timestamp()
+        with self._lock:
+            self._by_rejecting.setdefault(rejecting_id, {})[rejected_id] = expires_at
+            self._by_rejected.setdefault(rejected_id, {})[rejecting_id] = expires_at
+            self._bump()
+
+    def discard(self, rejecting_id, rejected_id):
+        with self._lock:
+            self._by_rejecting.get(rejecting_id, {}).pop(rejected_id, None)
+            self._by_rejected.get(rejected_id, {}).pop(rejecting_id, None)
+            self._bump()
+
+    def invalidate(self):
+        """
+        Force every worker to reload, e.g. after a bulk queryset update that
+        bypasses the model signals.
+        """
+        with self._lock:
+            self._bump()
+            self._version = None
+
+    # ----------------- Lookups -----------------
+
+    def is_blocked(self, rejecting_id, rejected_id):
+        """
+        True if rejecting_id rejected rejected_id within the cooldown window.
+        """
+        self._ensure_fresh()
+        expires_at = self._by_rejecting.get(rejecting_id, {}).get(rejected_id)
+        return expires_at is not None and expires_at > time.time()
+
+    def rejectors_of(self, team_id):
+        """
+        Ids of the teams whose rejection of team_id is still in cooldown.
+        """
+        self._ensure_fresh()
+        now = time.time()
+        return {
+            rejecting_id
+            for rejecting_id, expires_at in list(self._by_rejected.get(team_id, {}).items())
+            if expires_at > now
+        }
+
+
+rejection_index = RejectionIndex()
@@ -0,0 +1,15 @@
+from django.urls import path
+
+from .consumers import SlotAvailabilityConsumer
+
+
+# Mounted by the project's ASGI entry point next to the HTTP app:
+#
+#     application = ProtocolTypeRouter({
+#         "http": get_asgi_application(),
+#         "websocket": TokenAuthMiddleware(URLRouter(websocket_urlpatterns)),
+#     })
+
+websocket_urlpatterns = [
+    path('ws/futsals/<int:futsal_id>/slots/<str:day>/', SlotAvailabilityConsumer.as_asgi()),
+]
@@ -0,0 +1,132 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Match, TimeSlot
+from .pricing import slot_price
+from .signals import slots_booked
+
+
+# ----------------- Candidate slots -----------------
+# A competitive match is played at a futsal both teams prefer; if they share
+# none, at either team's home futsal. Every free slot there on the requested
+# day is a candidate, scored on price (relative to the cheapest candidate),
+# how busy the venue already is that day, and whether both teams prefer it.
+
+PRICE_WEIGHT = 0.5
+LOAD_WEIGHT = 0.3
+SHARED_WEIGHT = 0.2
+
+
+def candidate_futsals(team, opponent):
+    """
+    ({futsal id}, shared) for the two teams. team's preferred futsals may be
+    prefetched (request.team); the opponent's ids cost one query.
+    """
+    ours = {futsal.id for futsal in team.preferred_futsals.all()}
+    theirs = set(opponent.preferred_futsals.values_list('id', flat=True))
+    shared = ours & theirs
+    if shared:
+        return shared, True
+    return {futsal_id for futsal_id in (team.futsal_id, opponent.futsal_id) if futsal_id}, False
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def ranked_slots(futsal_ids, day, shared, now=None):
+    """
+    Free slots on `day` at the given futsals, best first, as dicts with their
+    score. One query: the venue's booked / offered counts for the day come
+    from correlated subqueries on the (futsal, start_time) index.
+    """
+    now = now or timezone.now()
+    day_start, day_end = _day_bounds(day)
+
+    def day_count(**filters):
+        return Coalesce(Subquery(
+            TimeSlot.objects.filter(
+                futsal=OuterRef('futsal'), start_time__gte=day_start, start_time__lt=day_end, **filters
+            ).order_by().values('futsal').annotate(count=Count('id')).values('count')
+        ), 0)
+
+    slots = list(
+        TimeSlot.objects.filter(
+            futsal_id__in=futsal_ids, is_booked=False,
+            start_time__gte=max(day_start, now), start_time__lt=day_end,
+        )
+        .select_related('futsal')
+        .annotate(day_booked=day_count(is_booked=True), day_offered=day_count())
+        .order_by('start_time', 'id')
+    )
+    if not slots:
+        return []
+
+    prices = {slot.id: slot_price(slot, now) for slot in slots}
+    cheapest = min(prices.values())
+    ranked = []
+    for slot in slots:
+        price = prices[slot.id]
+        load = slot.day_booked / slot.day_offered if slot.day_offered else 0.0
+        score = (
+            PRICE_WEIGHT * (float(cheapest / price) if price else 1.0)
+            + LOAD_WEIGHT * (1 - load)
+            + SHARED_WEIGHT * shared
+        )
+        ranked.append({"slot": slot, "price": price, "load": round(load, 2), "score": round(score, 3)})
+
+    # Stable sort keeps the earlier slot first among equal scores
+    ranked.sort(key=lambda candidate: -candidate["score"])
+    return ranked
+
+
+def slot_summary(candidate):
+    slot = candidate["slot"]
+    return {
+        "slot_id": slot.id,
+        "futsal_id": slot.futsal_id,
+        "futsal": slot.futsal.name,
+        "start_time": slot.start_time,
+        "end_time": slot.end_time,
+        "price": candidate["price"],
+        "venue_load": candidate["load"],
+        "score": candidate["score"],
+    }
+
+
+# ----------------- Reservation -----------------
+
+def schedule_competitive_match(match, team, opponent, day, slot_id=None):
+    """
+    Books the best free candidate slot (or `slot_id`, which must be one of
+    them) for a confirmed match. Returns (booked candidate or None, ranked
+    alternatives). Booking is a compare-and-set on is_booked, so a slot taken
+    concurrently is skipped for the next best one instead of double-booked.
+    """
+    futsal_ids, shared = candidate_futsals(team, opponent)
+    ranked = ranked_slots(futsal_ids, day, shared) if futsal_ids else []
+    attempts = ranked if slot_id is None else [c for c in ranked if c["slot"].id == slot_id]
+
+    with transaction.atomic():
+        # Lock the match so two owners can't schedule it at once
+        if attempts and Match.objects.select_for_update().filter(id=match.id, status='confirmed').exists():
+            for candidate in attempts:
+                slot = candidate["slot"]
+                slot.is_booked = True
+                if not TimeSlot.objects.filter(id=slot.id, is_booked=False).update(is_booked=True):
+                    continue  # Taken since it was ranked
+                slots_booked([slot])
+
+                match.scheduled_date = day
+                match.futsal = slot.futsal
+                match.time_slot = slot
+                match.status = 'scheduled'
+                match.save()
+                return candidate, [c for c in ranked if not c["slot"].is_booked]
+
+    return None, [c for c in ranked if not c["slot"].is_booked]
@@ -0,0 +1,140 @@
+import math
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Team, Futsal, SearchGram
+
+
+# ----------------- Trigram index -----------------
+# Each team / futsal is stored as the set of trigrams of its searchable
+# fields. Words are padded like pg_trgm ("  ar", " ars", ..., "al "), so
+# word starts get their own grams and a query matching most of a word's
+# grams still finds it with a typo in it.
+
+SEARCH_FIELDS = {
+    # kind -> model, {field: weight}
+    'team': (Team, {'name': 1.0, 'location': 0.6}),
+    'futsal': (Futsal, {'name': 1.0, 'location': 0.6, 'description': 0.3}),
+}
+
+MIN_GRAM_SHARE = 0.3  # Fraction of the query's trigrams a candidate must contain
+CANDIDATE_LIMIT = 50  # Candidates re-ranked per kind
+
+_WORD = re.compile(r"[0-9a-z]+")
+
+
+def _words(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode().lower()
+    return _WORD.findall(text)
+
+
+def text_grams(text):
+    grams = set()
+    for word in _words(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def query_grams(query):
+    """
+    Like text_grams, but the last word may still be being typed, so it gets
+    no end-of-word gram and matches as a prefix.
+    """
+    words = _words(query)
+    grams = set()
+    for position, word in enumerate(words):
+        padded = f"  {word} " if position < len(words) - 1 else f"  {word}"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def document_grams(kind, obj):
+    _, fields = SEARCH_FIELDS[kind]
+    grams = set()
+    for field in fields:
+        grams |= text_grams(getattr(obj, field))
+    return grams
+
+
+def index_object(kind, obj):
+    """
+    Brings one object's grams up to date. Saves that don't touch the
+    searchable fields (e.g. ranking updates) cost a single read.
+    """
+    grams = document_grams(kind, obj)
+    existing = set(SearchGram.objects.filter(kind=kind, object_id=obj.pk).values_list('gram', flat=True))
+    if grams == existing:
+        return
+
+    with transaction.atomic():
+        SearchGram.objects.filter(kind=kind, object_id=obj.pk, gram__in=existing - grams).delete()
+        SearchGram.objects.bulk_create([
+            SearchGram(kind=kind, object_id=obj.pk, gram=gram) for gram in grams - existing
+        ])
+
+
+def unindex_object(kind, object_id):
+    SearchGram.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild_search_index(batch_size=500):
+    count = 0
+    with transaction.atomic():
+        SearchGram.objects.all().delete()
+        for kind, (model, fields) in SEARCH_FIELDS.items():
+            rows = []
+            for obj in model.objects.only('id', *fields).iterator(chunk_size=batch_size):
+                rows.extend(SearchGram(kind=kind, object_id=obj.pk, gram=gram) for gram in document_grams(kind, obj))
+                count += 1
+                if len(rows) >= 5000:
+                    SearchGram.objects.bulk_create(rows, batch_size=batch_size)
+                    rows = []
+            SearchGram.objects.bulk_create(rows, batch_size=batch_size)
+    return count
+
+
+# ----------------- Querying -----------------
+
+def _field_score(grams, text):
+    if not text:
+        return 0.0
+    field_grams = text_grams(text)
+    coverage = len(grams & field_grams) / len(grams)
+    # Among equal matches, prefer the shorter (more specific) text
+    return coverage - len(field_grams) * 1e-4
+
+
+def search(query, kinds=None, limit=10):
+    """
+    Ranked [(kind, object, score)] for a search-as-you-type query. The index
+    narrows each kind to CANDIDATE_LIMIT rows sharing enough trigrams with the
+    query; only those are loaded and scored per field.
+    """
+    grams = query_grams(query)
+    if not grams:
+        return []
+
+    min_hits = max(1, math.ceil(len(grams) * MIN_GRAM_SHARE))
+    results = []
+
+    for kind in kinds or SEARCH_FIELDS:
+        model, fields = SEARCH_FIELDS[kind]
+        candidates = (
+            SearchGram.objects.filter(kind=kind, gram__in=grams)
+            .values('object_id')
+            .annotate(hits=Count('id'))
+            .filter(hits__gte=min_hits)
+            .order_by('-hits', 'object_id')[:CANDIDATE_LIMIT]
+        )
+        objects = model.objects.in_bulk([row['object_id'] for row in candidates])
+
+        for obj in objects.values():
+            score = max(weight * _field_score(grams, getattr(obj, field)) for field, weight in fields.items())
+            results.append((kind, obj, score))
+
+    results.sort(key=lambda result: (-result[2], result[1].pk))
+    return [(kind, obj, round(score, 3)) for kind, obj, score in results[:limit]]
@@ -1,18 +1,33 @@
 from rest_framework import serializers
-from .models import Futsal,Player,TeamMatch,Team,TimeSlot,MatchRequest,Match
+from django.db.models import Count, Prefetch
+from django.core.exceptions import ValidationError as DjangoValidationError
+from datetime import timedelta
+from django.utils import timezone
+from .models import Futsal,Player,TeamMatch,Team,TimeSlot,MatchRequest,Match,PriceRule,MatchmakingTicket,MatchmakingWindow,Tournament,TournamentEntry,Fixture
+from .matchmaking import MAX_WINDOWS, HORIZON_DAYS
+from .tournaments import MAX_TEAMS
+from .pricing import slot_price
+from .images import variant_urls
 
 # ---- Futsal Serializer ----
 class FutsalSerializer(serializers.ModelSerializer):
+    # {"thumb": {"webp": url, "jpeg": url}, "card": ..., "full": ...}; empty until processed
+    image_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Futsal
         fields = '__all__'
         read_only_fields = ['owner']
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image_variants, self.context.get('request'))
+
 class TimeSlotSerializer(serializers.ModelSerializer):
     futsal_name = serializers.CharField(source='futsal.name', read_only=True)
     team_name = serializers.SerializerMethodField()
     user_email = serializers.SerializerMethodField()
     match_result = serializers.SerializerMethodField()
+    current_price = serializers.SerializerMethodField()
 
     class Meta:
         model = TimeSlot
@@ -28,8 +43,14 @@ class TimeSlotSerializer(serializers.ModelSerializer):
             'team_name',
             'user_email',
             'match_result',
+            'current_price',
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # get_team_name / get_user_email / get_match_result walk this chain per row
+        return queryset.select_related('futsal', 'booked_by_match__team_1__created_by')
+
     def get_team_name(self, obj):
         if obj.booked_by_match and obj.booked_by_match.team_1:
             return obj.booked_by_match.team_1.name
@@ -45,13 +66,44 @@ class TimeSlotSerializer(serializers.ModelSerializer):
             return obj.booked_by_match.result
         return None
 
+    def get_current_price(self, obj):
+        return "{:.2f}".format(slot_price(obj))
+
+# ---- Price Rule Serializer ----
+class PriceRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PriceRule
+        fields = [
+            'id', 'futsal', 'label', 'weekdays', 'start_hour', 'end_hour',
+            'multiplier', 'last_minute_hours', 'created_at'
+        ]
+        read_only_fields = ['id', 'futsal', 'created_at']
+
+    def validate(self, data):
+        rule = PriceRule(**{**self._current_values(), **data})
+        try:
+            rule.clean()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return data
+
+    def _current_values(self):
+        if not self.instance:
+            return {}
+        return {field: getattr(self.instance, field) for field in ['weekdays', 'start_hour', 'end_hour', 'multiplier', 'last_minute_hours']}
+
 # ---- Player Serializer ----
 class PlayerSerializer(serializers.ModelSerializer):
+    photo_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Player
-        fields = ['id', 'name', 'age', 'is_captain', 'is_goalkeeper', 'photo']
+        fields = ['id', 'name', 'age', 'is_captain', 'is_goalkeeper', 'photo', 'photo_variants']
         read_only_fields = ['id']
 
+    def get_photo_variants(self, obj):
+        return variant_urls(obj.photo_variants, self.context.get('request'))
+
 # ---- Team Serializer ----
 class TeamSerializer(serializers.ModelSerializer):
     players = PlayerSerializer(many=True, required=False)
@@ -81,6 +133,11 @@ class TeamSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'owner', 'ranking', 'wins', 'matches_played', 'created_at']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # Nested futsal, preferred futsals and players in 3 queries total
+        return queryset.select_related('futsal').prefetch_related('preferred_futsals', 'players')
+
     def create(self, validated_data):
         players_data = validated_data.pop('players', [])
         preferred_futsals = validated_data.pop('preferred_futsal_ids', [])
@@ -120,6 +177,29 @@ class TeamSerializer(serializers.ModelSerializer):
        
         return instance
 
+# ---- Team Summary Serializer (opponent browsing) ----
+class TeamSummarySerializer(serializers.ModelSerializer):
+    futsal_name = serializers.CharField(source='futsal.name', read_only=True, default=None)
+    preferred_futsal_ids = serializers.PrimaryKeyRelatedField(source='preferred_futsals', many=True, read_only=True)
+    player_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Team
+        fields = [
+            'id', 'name', 'location', 'skill_level',
+            'futsal_name', 'preferred_futsal_ids',
+            'ranking', 'wins', 'matches_played', 'player_count'
+        ]
+        read_only_fields = fields
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return (
+            queryset.select_related('futsal')
+            .prefetch_related(Prefetch('preferred_futsals', queryset=Futsal.objects.only('id')))
+            .annotate(player_count=Count('players'))
+        )
+
 # ---- Team Match for friendly Serializer ----
 class TeamMatchSerializer(serializers.ModelSerializer):
     team_1_name = serializers.CharField(source='team_1.name', read_only=True)
@@ -195,3 +275,100 @@ class MatchRequestSerializer(serializers.ModelSerializer):
         fields = ['id', 'team_a', 'team_b', 'mode', 'status', 'created_at']
         read_only_fields = ['status', 'created_at']
 
+
+# ---- Matchmaking Queue Serializers ----
+class MatchmakingWindowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MatchmakingWindow
+        fields = ['start', 'end']
+
+    def validate(self, data):
+        if data['end'] <= data['start']:
+            raise serializers.ValidationError("Window must end after it starts.")
+        if data['end'] <= timezone.now():
+            raise serializers.ValidationError("Window is already over.")
+        if data['start'] > timezone.now() + timedelta(days=HORIZON_DAYS):
+            raise serializers.ValidationError(f"Windows must start within {HORIZON_DAYS} days.")
+        return data
+
+
+class MatchmakingTicketSerializer(serializers.ModelSerializer):
+    windows = MatchmakingWindowSerializer(many=True)
+    team_name = serializers.CharField(source='team.name', read_only=True)
+    futsal_name = serializers.CharField(source='time_slot.futsal.name', read_only=True, default=None)
+    start_time = serializers.DateTimeField(source='time_slot.start_time', read_only=True, default=None)
+
+    class Meta:
+        model = MatchmakingTicket
+        fields = ['id', 'team', 'team_name', 'status', 'windows', 'match', 'futsal_name', 'start_time', 'matched_at', 'created_at']
+        read_only_fields = ['team', 'status', 'match', 'matched_at', 'created_at']
+
+    def validate_windows(self, windows):
+        if not 1 <= len(windows) <= MAX_WINDOWS:
+            raise serializers.ValidationError(f"Give between 1 and {MAX_WINDOWS} availability windows.")
+        return windows
+
+
+# ---- Tournament Serializers ----
+class TournamentEntrySerializer(serializers.ModelSerializer):
+    # A plain id: the entries' teams are checked together in one query
+    team = serializers.IntegerField(source='team_id')
+
+    class Meta:
+        model = TournamentEntry
+        fields = ['team', 'seed', 'weekdays']
+
+    def validate_weekdays(self, value):
+        if not value or any(day not in '0123456' for day in value):
+            raise serializers.ValidationError("Weekdays are digits from 0 (Monday) to 6 (Sunday).")
+        return ''.join(sorted(set(value)))
+
+
+class TournamentSerializer(serializers.ModelSerializer):
+    entries = TournamentEntrySerializer(many=True)
+
+    class Meta:
+        model = Tournament
+        fields = ['id', 'name', 'format', 'organizer', 'futsals', 'entries', 'start_date', 'end_date', 'rest_days', 'created_at']
+        read_only_fields = ['organizer', 'created_at']
+
+    def validate_entries(self, entries):
+        if not 2 <= len(entries) <= MAX_TEAMS:
+            raise serializers.ValidationError(f"Enter between 2 and {MAX_TEAMS} teams.")
+        team_ids = {entry['team_id'] for entry in entries}
+        if len(team_ids) != len(entries):
+            raise serializers.ValidationError("Each team can only be entered once.")
+        if Team.objects.filter(id__in=team_ids).count() != len(team_ids):
+            raise serializers.ValidationError("Unknown team.")
+        return entries
+
+    def validate_futsals(self, futsals):
+        if not futsals:
+            raise serializers.ValidationError("Pick at least one futsal.")
+        if any(futsal.owner_id != self.context['request'].user.id for futsal in futsals):
+            raise serializers.ValidationError("Tournaments can only be hosted at your own futsals.")
+        return futsals
+
+    def validate(self, data):
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError("end_date must not be before start_date.")
+        return data
+
+    def create(self, validated_data):
+        entries = validated_data.pop('entries')
+        futsals = validated_data.pop('futsals')
+        tournament = Tournament.objects.create(**validated_data)
+        tournament.futsals.set(futsals)
+        TournamentEntry.objects.bulk_create([TournamentEntry(tournament=tournament, **entry) for entry in entries])
+        return tournament
+
+
+class FixtureSerializer(serializers.ModelSerializer):
+    team_1_name = serializers.CharField(source='team_1.name', read_only=True, default=None)
+    team_2_name = serializers.CharField(source='team_2.name', read_only=True, default=None)
+    futsal_name = serializers.CharField(source='time_slot.futsal.name', read_only=True, default=None)
+    start_time = serializers.DateTimeField(source='time_slot.start_time', read_only=True, default=None)
+
+    class Meta:
+        model = Fixture
+        fields = ['id', 'round', 'position', 'team_1', 'team_1_name', 'team_2', 'team_2_name', 'is_bye', 'futsal_name', 'start_time', 'match']
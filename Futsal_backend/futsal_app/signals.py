@@ -1,6 +1,21 @@
-from django.db.models.signals import post_save
+import threading
+import weakref
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
-from .models import TeamMatch
+from django.utils import timezone
+from .models import Futsal, Team, Player, TeamMatch, TeamRejection, TimeSlot, Payment, Match, PriceRule
+from .rejections import rejection_index
+from .analytics import refresh_daily_stats
+from .heatmap import invalidate_demand_heatmap
+from .pricing import reprice_future_slots
+from .realtime import publish_slot_event, slot_payload
+from .notifications import notify_match_invite
+from .geo import geo_cell
+from .search import index_object, unindex_object
+from .images import prepare_upload, register_upload
 from utils.email_service import send_match_invitation_email
 
 @receiver(post_save, sender=TeamMatch)
@@ -10,3 +25,259 @@ def send_invitation_on_match_create(sender, instance, created, **kwargs):
         to_emails = [instance.team_2.owner.email] if instance.team_2.owner.email else []
         if to_emails:
             send_match_invitation_email(to_emails, instance)
+        notify_match_invite(instance)
+
+
+@receiver(post_save, sender=TeamRejection)
+def sync_rejection_index_on_save(sender, instance, **kwargs):
+    if instance.cleared:
+        transaction.on_commit(
+            lambda: rejection_index.discard(instance.rejecting_team_id, instance.rejected_team_id)
+        )
+    else:
+        transaction.on_commit(
+            lambda: rejection_index.record(instance.rejecting_team_id, instance.rejected_team_id, instance.timestamp)
+        )
+
+
+@receiver(post_delete, sender=TeamRejection)
+def sync_rejection_index_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: rejection_index.discard(instance.rejecting_team_id, instance.rejected_team_id)
+    )
+
+
+# ----------------- Commit batching -----------------
+
+class OnCommitBatch:
+    """
+    Collects keys while a transaction runs and hands the distinct ones to
+    `flush` once it commits (straight away in autocommit), so a batch of
+    writes touching the same key costs one refresh. Pending keys are per
+    thread, like the connection whose transaction they belong to.
+    """
+
+    def __init__(self, flush):
+        self.flush = flush
+        self._local = threading.local()
+
+    def _pending(self):
+        if not hasattr(self._local, 'keys'):
+            self._local.keys = set()
+        return self._local.keys
+
+    def add(self, key):
+        self._pending().add(key)
+        # Only a weak reference to the queued callback: a rollback discards
+        # it along with its transaction, and then the next add queues anew
+        queued = getattr(self._local, 'queued', None)
+        if queued is None or queued() is None:
+            callback = BatchFlush(self)
+            self._local.queued = weakref.ref(callback)
+            transaction.on_commit(callback)
+
+    def run(self):
+        self._local.queued = None
+        pending = self._pending()
+        if pending:
+            keys = set(pending)
+            pending.clear()
+            self.flush(keys)
+
+
+class BatchFlush:
+    """
+    The on_commit callback of an OnCommitBatch.
+    """
+
+    def __init__(self, batch):
+        self.batch = batch
+
+    def __call__(self):
+        self.batch.run()
+
+
+# ----------------- Analytics rollups -----------------
+
+stats_refreshes = OnCommitBatch(refresh_daily_stats)
+heatmap_invalidations = OnCommitBatch(invalidate_demand_heatmap)
+
+
+def schedule_stats_refresh(futsal_id, day):
+    if futsal_id is not None and day is not None:
+        stats_refreshes.add((futsal_id, day))
+
+
+@receiver(pre_save, sender=TimeSlot)
+def remember_previous_slot(sender, instance, update_fields=None, **kwargs):
+    # One lookup for both the stats of a slot moved off its day (or futsal)
+    # and push_slot_change's booked/released transition
+    if instance.pk is None or (update_fields is not None and not {'start_time', 'futsal', 'is_booked'} & set(update_fields)):
+        return
+    previous = TimeSlot.objects.filter(pk=instance.pk).values_list('futsal_id', 'start_time', 'is_booked').first()
+    if previous is None:
+        return
+    futsal_id, start_time, instance._previous_is_booked = previous
+    if (futsal_id, timezone.localdate(start_time)) != (instance.futsal_id, timezone.localdate(instance.start_time)):
+        schedule_stats_refresh(futsal_id, timezone.localdate(start_time))
+        heatmap_invalidations.add(futsal_id)
+
+
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_delete, sender=TimeSlot)
+def refresh_stats_on_slot_change(sender, instance, **kwargs):
+    schedule_stats_refresh(instance.futsal_id, timezone.localdate(instance.start_time))
+    heatmap_invalidations.add(instance.futsal_id)
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def refresh_stats_on_payment_change(sender, instance, **kwargs):
+    if instance.created_at is None:
+        return
+    # Resolve the venue now; on cascade deletes the match is gone by commit time
+    futsal_id = TeamMatch.objects.filter(id=instance.match_id).values_list('time_slot__futsal_id', flat=True).first()
+    schedule_stats_refresh(futsal_id, timezone.localdate(instance.created_at))
+
+
+@receiver(post_save, sender=Match)
+@receiver(post_delete, sender=Match)
+def refresh_stats_on_match_change(sender, instance, **kwargs):
+    schedule_stats_refresh(instance.futsal_id, instance.scheduled_date)
+
+
+# ----------------- Slot pricing -----------------
+
+def _reprice(futsal_id):
+    futsal = Futsal.objects.filter(id=futsal_id).first()
+    if futsal:
+        reprice_future_slots(futsal)
+
+
+@receiver(post_save, sender=PriceRule)
+@receiver(post_delete, sender=PriceRule)
+def reprice_on_rule_change(sender, instance, **kwargs):
+    futsal_id = instance.futsal_id
+    transaction.on_commit(lambda: _reprice(futsal_id))
+
+
+# ----------------- Slot availability push -----------------
+
+def schedule_slot_event(event, slot):
+    futsal_id, day, payload = slot.futsal_id, timezone.localdate(slot.start_time), slot_payload(slot)
+    transaction.on_commit(lambda: publish_slot_event(event, futsal_id, day, payload))
+
+
+@receiver(post_save, sender=TimeSlot)
+def push_slot_change(sender, instance, created, **kwargs):
+    # Only real changes: a save that didn't flip is_booked (repricing, edits) sends nothing
+    was_booked = instance.__dict__.pop('_previous_is_booked', None)
+    if created:
+        schedule_slot_event("booked" if instance.is_booked else "created", instance)
+    elif was_booked is not None and was_booked != instance.is_booked:
+        schedule_slot_event("booked" if instance.is_booked else "released", instance)
+
+
+@receiver(post_delete, sender=TimeSlot)
+def push_slot_removal(sender, instance, **kwargs):
+    schedule_slot_event("removed", instance)
+
+
+def _slots_written(event, slots):
+    for slot in slots:
+        schedule_slot_event(event, slot)
+    for futsal_id, day in {(slot.futsal_id, timezone.localdate(slot.start_time)) for slot in slots}:
+        schedule_stats_refresh(futsal_id, day)
+        heatmap_invalidations.add(futsal_id)
+
+
+def slots_booked(slots):
+    """
+    The TimeSlot post_save hooks, for bookings written with a queryset update
+    (a compare-and-set or a batch), which sends no signals.
+    """
+    _slots_written("booked", slots)
+
+
+def slots_created(slots):
+    """
+    The TimeSlot post_save hooks, for slots inserted with bulk_create.
+    """
+    _slots_written("created", slots)
+
+
+# ----------------- Tournaments -----------------
+
+@receiver(post_save, sender=Match)
+def advance_knockout_winner(sender, instance, **kwargs):
+    if instance.is_completed and instance.winner_id:
+        # tournaments imports this module for slots_booked
+        from .tournaments import advance_winner
+        advance_winner(instance)
+
+
+# ----------------- Team version stamps -----------------
+# Team.updated_at drives the team profile's ETag, so changes to what the
+# profile nests must bump it too (queryset update: no signals, no save()).
+
+def touch_teams(teams):
+    teams.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+def touch_team_on_player_change(sender, instance, **kwargs):
+    touch_teams(Team.objects.filter(id=instance.team_id))
+
+
+@receiver(m2m_changed, sender=Team.preferred_futsals.through)
+def touch_team_on_preferred_futsals_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch_teams(Team.objects.filter(id=instance.id))
+    elif pk_set:
+        touch_teams(Team.objects.filter(id__in=pk_set))
+
+
+@receiver(pre_delete, sender=Futsal)
+def touch_teams_on_futsal_delete(sender, instance, **kwargs):
+    # The cascade removes the futsal from teams without any m2m signal
+    touch_teams(Team.objects.filter(Q(futsal=instance) | Q(preferred_futsals=instance)))
+
+
+# ----------------- Geo search -----------------
+
+@receiver(pre_save, sender=Futsal)
+def set_futsal_geo_cell(sender, instance, **kwargs):
+    instance.geo_cell = geo_cell(instance.latitude, instance.longitude)
+
+
+# ----------------- Search index -----------------
+
+@receiver(post_save, sender=Team)
+@receiver(post_save, sender=Futsal)
+def index_on_save(sender, instance, **kwargs):
+    kind = 'team' if sender is Team else 'futsal'
+    transaction.on_commit(lambda: index_object(kind, instance))
+
+
+@receiver(post_delete, sender=Team)
+@receiver(post_delete, sender=Futsal)
+def unindex_on_delete(sender, instance, **kwargs):
+    kind, object_id = ('team' if sender is Team else 'futsal'), instance.pk
+    transaction.on_commit(lambda: unindex_object(kind, object_id))
+
+
+# ----------------- Image variants -----------------
+
+@receiver(pre_save, sender=Futsal)
+@receiver(pre_save, sender=Player)
+def hash_uploaded_image(sender, instance, **kwargs):
+    prepare_upload(instance)
+
+
+@receiver(post_save, sender=Futsal)
+@receiver(post_save, sender=Player)
+def queue_image_variants(sender, instance, **kwargs):
+    register_upload(instance)
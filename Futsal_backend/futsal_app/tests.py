@@ -1,3 +1,1410 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import httpx
+import numpy as np
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from PIL import Image
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import Q
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APITestCase, force_authenticate
+
+from core.models import CustomUser
+from utils.database import database_config, postgres_config
+from utils.db_router import ReplicaRouter, pin_to_primary, replica_reads
+from .consumers import TokenAuthMiddleware
+from .current_team import with_team
+from .models import (
+    Futsal, Team, Player, TeamMatch, TimeSlot, Match, TeamRejection, Payment, Notification, ImageAsset,
+    MatchmakingTicket, Fixture, FutsalDailyStats, PriceRule,
+)
+from .matchmaking import INFEASIBLE, pair_indices, run_matchmaking_cycle
+from .tournaments import round_robin_specs
+from .rejections import VERSION_CACHE_KEY, VERSION_CHECK_SECONDS, rejection_index
+from .analytics import rollup_daily_stats
+from .pricing import price_slots, slot_price
+from .signals import heatmap_invalidations, stats_refreshes
+from .heatmap import HEATMAP_REFRESH_DELAY, get_demand_heatmap, heatmap_cache_key
+from .notifications import notification_stream
+from .search import rebuild_search_index
+from .images import process_asset
+from .serializers import FutsalSerializer
+from .routing import websocket_urlpatterns
+
+
+# ----------------- Fixtures -----------------
+
+def make_user(username, user_type='player'):
+    return CustomUser.objects.create_user(username, f'{username}@example.com', 'pass', user_type=user_type)
+
+
+def make_futsal(owner, name='Arena', **fields):
+    fields = {'location': 'Kathmandu', 'contact_number': '9800000000', 'price_per_hour': '1500.00', **fields}
+    return Futsal.objects.create(owner=owner, name=name, **fields)
+
+
+def make_teams(prefix, count=2):
+    """
+    Teams named '<prefix> 0', '<prefix> 1', ..., each owned by its own player.
+    """
+    slug = prefix.lower().replace(' ', '_')
+    users = CustomUser.objects.bulk_create([
+        CustomUser(username=f'{slug}{i}', email=f'{slug}{i}@example.com', user_type='player') for i in range(count)
+    ])
+    return Team.objects.bulk_create([Team(name=f'{prefix} {i}', owner=user) for i, user in enumerate(users)])
+
+
+class HotQueryIndexTests(TestCase):
+    """Each hot query shape is answered from its index, not a table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.futsal = make_futsal(make_user('venue_owner', 'owner'))
+        teams = make_teams('Team', 40)
+        cls.team_a, cls.team_b = teams[0], teams[1]
+
+        start = timezone.now().replace(minute=0, second=0, microsecond=0)
+        slots = TimeSlot.objects.bulk_create([
+            TimeSlot(
+                futsal=cls.futsal,
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i + 1),
+                is_booked=i % 3 == 0,
+            )
+            for i in range(300)
+        ])
+
+        matches = TeamMatch.objects.bulk_create([
+            TeamMatch(
+                team_1=teams[i % 40], team_2=teams[(i + 1) % 40],
+                match_type='friendly', scheduled_time=slots[i].start_time,
+                time_slot=slots[i], result_updated=i % 2 == 0,
+            )
+            for i in range(300)
+        ])
+        Payment.objects.bulk_create([
+            Payment(match=match, amount='1500.00', method='eSewa', transaction_id=f'{match.id}_{i}')
+            for i, match in enumerate(matches)
+        ])
+
+        Match.objects.bulk_create([
+            Match(team_1=teams[i % 40], team_2=teams[(i + 7) % 40], status=['pending', 'confirmed', 'completed'][i % 3])
+            for i in range(300)
+        ])
+        TeamRejection.objects.bulk_create([
+            TeamRejection(rejecting_team=teams[i], rejected_team=teams[j], cleared=(i + j) % 2 == 0)
+            for i in range(40) for j in range(i + 1, min(i + 6, 40))
+        ])
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be seq scanned
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"Expected {index_name} in plan:\n{plan}")
+
+    def test_pending_match_pair_lookup(self):
+        sender, receiver = self.team_a, self.team_b
+        qs = Match.objects.filter(
+            Q(team_1=sender, team_2=receiver, status='pending') |
+            Q(team_1=receiver, team_2=sender, status='pending')
+        )
+        self.assertUsesIndex(qs, 'match_pending_pair_idx')
+
+    def test_team_matches_by_status(self):
+        qs = Match.objects.filter(team_2=self.team_a, status='confirmed')
+        self.assertUsesIndex(qs, 'match_team2_status_idx')
+
+    def test_open_team_matches(self):
+        qs = TeamMatch.objects.filter(team_1=self.team_a, result_updated=False).order_by('-created_at')
+        self.assertUsesIndex(qs, 'teammatch_team1_open_idx')
+
+    def test_open_matches_for_slots(self):
+        qs = TeamMatch.objects.filter(time_slot__futsal=self.futsal, result_updated=False)
+        self.assertUsesIndex(qs, 'teammatch_slot_open_idx')
+
+    def test_free_slots_for_futsal(self):
+        qs = TimeSlot.objects.filter(futsal=self.futsal, is_booked=False).order_by('start_time')
+        self.assertUsesIndex(qs, 'timeslot_futsal_start_idx')
+
+    def test_free_slots_all_futsals(self):
+        qs = TimeSlot.objects.filter(is_booked=False).order_by('start_time')
+        self.assertUsesIndex(qs, 'timeslot_open_start_idx')
+
+    def test_active_rejections_of_team(self):
+        qs = TeamRejection.objects.filter(rejected_team=self.team_b, cleared=False)
+        self.assertUsesIndex(qs, 'rejection_active_idx')
+
+    def test_active_rejections_in_cooldown(self):
+        qs = TeamRejection.objects.filter(cleared=False, timestamp__gt=timezone.now() - timedelta(days=1))
+        self.assertUsesIndex(qs, 'rejection_active_ts_idx')
+
+    def test_payment_by_transaction_id(self):
+        qs = Payment.objects.filter(transaction_id='1_0')
+        self.assertUsesIndex(qs, 'payment_transaction_idx')
+
+
+class TimeSlotListQueryCountTests(APITestCase):
+    """The slot list loads futsal and booked_by_match.team_1.created_by up front."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('slot_owner', 'owner')
+        cls.futsal = make_futsal(cls.owner)
+        cls.teams = make_teams('Captain')
+        for team in cls.teams:
+            team.created_by = team.owner
+        Team.objects.bulk_update(cls.teams, ['created_by'])
+
+    def setUp(self):
+        self.client.force_authenticate(self.owner)
+
+    def create_booked_slots(self, count):
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        existing = TimeSlot.objects.count()
+        for i in range(existing, existing + count):
+            slot = TimeSlot.objects.create(
+                futsal=self.futsal,
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i + 1),
+            )
+            match = TeamMatch.objects.create(
+                team_1=self.teams[0], team_2=self.teams[1],
+                match_type='friendly', scheduled_time=slot.start_time, time_slot=slot
+            )
+            slot.is_booked = True
+            slot.booked_by_match = match
+            slot.save()
+
+    def list_slots(self):
+        response = self.client.get('/api/time-slots/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_query_count_independent_of_slot_count(self):
+        self.create_booked_slots(2)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(len(self.list_slots()), 2)
+
+        self.create_booked_slots(20)
+        with self.assertNumQueries(len(small)):
+            slots = self.list_slots()
+
+        self.assertEqual(len(slots), 22)
+        self.assertEqual(slots[0]['team_name'], 'Captain 0')
+        self.assertEqual(slots[0]['user_email'], 'captain0@example.com')
+        self.assertEqual(slots[0]['futsal_name'], 'Arena')
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class SlotAvailabilityPushTests(TransactionTestCase):
+    """A subscribed socket gets the day's snapshot, then committed booking changes."""
+
+    def setUp(self):
+        owner = make_user('push_owner', 'owner')
+        self.token = Token.objects.create(user=owner)
+        self.futsal = make_futsal(owner)
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        self.slot = TimeSlot.objects.create(futsal=self.futsal, start_time=start, end_time=start + timedelta(hours=1))
+        self.day = timezone.localdate(start)
+
+    def connect(self, token):
+        application = TokenAuthMiddleware(URLRouter(websocket_urlpatterns))
+        path = f"/ws/futsals/{self.futsal.id}/slots/{self.day.isoformat()}/?token={token}"
+        return WebsocketCommunicator(application, path)
+
+    async def test_booking_is_pushed_to_subscribers(self):
+        communicator = self.connect(self.token.key)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot["type"], "snapshot")
+        self.assertEqual([slot["id"] for slot in snapshot["slots"]], [self.slot.id])
+
+        def book():
+            self.slot.is_booked = True
+            self.slot.save()
+        await sync_to_async(book)()
+
+        message = await communicator.receive_json_from()
+        self.assertEqual(message["type"], "booked")
+        self.assertEqual(message["slot"]["id"], self.slot.id)
+        self.assertTrue(message["slot"]["is_booked"])
+        await communicator.disconnect()
+
+    def test_only_booking_transitions_are_pushed(self):
+        with mock.patch('futsal_app.signals.publish_slot_event') as publish:
+            self.slot.price = Decimal('1200.00')
+            self.slot.save()  # An edit of a free slot
+            self.slot.is_booked = True
+            self.slot.save()
+            self.slot.price = Decimal('1300.00')
+            self.slot.save()  # Repricing a booked slot
+            self.slot.is_booked = False
+            self.slot.save(update_fields=['is_booked'])
+        self.assertEqual([c.args[0] for c in publish.call_args_list], ['booked', 'released'])
+
+    async def test_unauthenticated_socket_is_rejected(self):
+        communicator = self.connect("invalid")
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
+
+
+class NotificationStreamTests(APITestCase):
+    """Notifications are listed and streamed after a cursor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sender_team, cls.receiver_team = make_teams('Notify')
+        cls.sender, cls.receiver = cls.sender_team.owner, cls.receiver_team.owner
+
+    def test_match_request_is_listed_after_cursor(self):
+        self.client.force_authenticate(self.sender)
+        response = self.client.post(f'/api/competitive/request/{self.receiver_team.id}/')
+        self.assertEqual(response.status_code, 201)
+
+        self.client.force_authenticate(self.receiver)
+        data = self.client.get('/api/notifications/').data
+        self.assertEqual([item['kind'] for item in data['results']], ['match_request'])
+        self.assertEqual(data['results'][0]['payload']['from_team'], 'Notify 0')
+
+        data = self.client.get('/api/notifications/', {'cursor': data['cursor']}).data
+        self.assertEqual(data['results'], [])
+
+    async def test_stream_resumes_after_cursor(self):
+        def seed():
+            return [
+                Notification.objects.create(recipient=self.receiver, kind='match_invite', payload={"n": n}).id
+                for n in range(3)
+            ]
+        ids = await sync_to_async(seed)()
+
+        stream = notification_stream(self.receiver.id, cursor=ids[0])
+        self.assertTrue((await anext(stream)).startswith("retry:"))
+        replayed = [await anext(stream), await anext(stream)]
+        await stream.aclose()
+
+        self.assertTrue(replayed[0].startswith(f"id: {ids[1]}\nevent: match_invite\n"))
+        self.assertTrue(replayed[1].startswith(f"id: {ids[2]}\n"))
+
+    async def test_stream_ends_after_max_seconds(self):
+        ids = await sync_to_async(lambda: [
+            Notification.objects.create(recipient=self.receiver, kind='match_invite', payload={}).id for _ in range(2)
+        ])()
+
+        events = [event async for event in notification_stream(self.receiver.id, cursor=0, max_seconds=0)]
+        self.assertEqual([event.split("\n")[0] for event in events[1:]], [f"id: {ids[0]}", f"id: {ids[1]}"])
+
+    def test_wsgi_request_gets_one_batch_and_ends(self):
+        token = Token.objects.create(user=self.receiver)
+        notification = Notification.objects.create(recipient=self.receiver, kind='match_invite', payload={})
+
+        response = self.client.get('/api/notifications/stream/', {'token': token.key})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = list(response.streaming_content)  # Finite under WSGI
+        self.assertEqual(events[0], b"retry: 5000\n\n")
+        self.assertEqual(len(events), 2)
+        self.assertTrue(events[1].startswith(f"id: {notification.id}\n".encode()))
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    """The environment-driven DATABASES profile."""
+
+    def test_sqlite_is_the_default(self):
+        config = database_config(Path('/srv/app'), env={})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['NAME'], Path('/srv/app/db.sqlite3'))
+
+    def test_sqlite_performance_mode_applies_pragmas(self):
+        config = database_config(Path('/srv/app'), env={'DB_SQLITE_PERFORMANCE': '1'})
+        self.assertIn('PRAGMA journal_mode=WAL', config['OPTIONS']['init_command'])
+        self.assertIn('PRAGMA busy_timeout=5000', config['OPTIONS']['init_command'])
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+    def test_postgres_sets_timeouts_and_persistent_connections(self):
+        config = database_config(Path('/srv/app'), env={'DB_ENGINE': 'postgres', 'DB_STATEMENT_TIMEOUT_MS': '3000'})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertIn('-c statement_timeout=3000', config['OPTIONS']['options'])
+        self.assertIn('-c lock_timeout=2000', config['OPTIONS']['options'])
+
+    def test_management_commands_drop_the_statement_timeout(self):
+        env = {'DB_ENGINE': 'postgres'}
+        migrate = database_config(Path('/srv/app'), env=env, argv=['manage.py', 'migrate'])
+        self.assertIn('-c statement_timeout=0', migrate['OPTIONS']['options'])
+        self.assertIn('-c lock_timeout=2000', migrate['OPTIONS']['options'])
+
+        backfill = database_config(Path('/srv/app'), env={**env, 'DB_COMMAND_STATEMENT_TIMEOUT_MS': '600000'},
+                                   argv=['/venv/bin/django-admin', 'process_images'])
+        self.assertIn('-c statement_timeout=600000', backfill['OPTIONS']['options'])
+
+    def test_request_serving_processes_keep_the_statement_timeout(self):
+        for argv in (['/venv/bin/gunicorn', 'backend.wsgi'], ['/venv/bin/daphne', 'backend.asgi:application'],
+                     ['manage.py', 'runserver'], ['manage.py', 'test']):
+            with self.subTest(argv=argv):
+                config = database_config(Path('/srv/app'), env={'DB_ENGINE': 'postgres'}, argv=argv)
+                self.assertIn('-c statement_timeout=5000', config['OPTIONS']['options'])
+
+    def test_psycopg_pool_replaces_persistent_connections(self):
+        config = database_config(Path('/srv/app'), env={'DB_ENGINE': 'postgres', 'DB_POOL': 'psycopg', 'DB_POOL_MAX_SIZE': '20'})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20, 'timeout': 10})
+
+    def test_pgbouncer_disables_server_side_cursors(self):
+        config = database_config(Path('/srv/app'), env={'DB_ENGINE': 'postgres', 'DB_POOL': 'pgbouncer'})
+        self.assertTrue(config['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertNotIn('options', config['OPTIONS'])
+
+
+@skipUnless(connection.vendor == 'postgresql', "Run with DB_ENGINE=postgres against a local PostgreSQL")
+class PostgresProfileTests(TestCase):
+    """The profile takes effect on a live PostgreSQL connection."""
+
+    def show(self, setting):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SHOW {setting}")
+            return cursor.fetchone()[0]
+
+    def test_session_timeouts_are_applied(self):
+        if connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+            self.skipTest("Behind PgBouncer the timeouts are set on the role")
+        self.assertNotEqual(self.show('statement_timeout'), '0')
+        self.assertNotEqual(self.show('lock_timeout'), '0')
+
+    def test_statement_timeout_cancels_slow_queries(self):
+        if connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+            self.skipTest("Behind PgBouncer the timeouts are set on the role")
+        # A second connection with the profile's options, at a timeout short enough to wait out
+        profile = postgres_config({'DB_STATEMENT_TIMEOUT_MS': '200'})
+        options = {**connection.settings_dict['OPTIONS'], 'options': profile['OPTIONS']['options']}
+        options.pop('pool', None)
+        short = connection.__class__({**connection.settings_dict, 'OPTIONS': options}, alias='statement_timeout')
+        self.addCleanup(short.close)
+        with short.cursor() as cursor:
+            cursor.execute("SELECT pg_sleep(0.05)")
+            with self.assertRaisesMessage(OperationalError, "statement timeout"):
+                cursor.execute("SELECT pg_sleep(2)")
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    """Opted-in views read from a replica until the user writes something."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('reader')
+        self.router = ReplicaRouter()
+
+    def read_alias(self):
+        @replica_reads
+        def view(request):
+            return self.router.db_for_read(Team)
+
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return view(request)
+
+    def test_reads_outside_opted_in_views_use_default(self):
+        self.assertIsNone(self.router.db_for_read(Team))
+        self.assertEqual(self.router.db_for_write(Team), 'default')
+
+    def test_opted_in_view_reads_from_replica(self):
+        self.assertEqual(self.read_alias(), 'replica')
+
+    def test_user_reads_own_writes_from_default(self):
+        pin_to_primary(self.user)
+        self.assertIsNone(self.read_alias())
+
+
+class ConditionalGetTests(APITestCase):
+    """Unchanged futsals and team profiles get a 304 from one version query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('etag_owner', 'owner')
+        cls.futsal = make_futsal(cls.owner)
+        [cls.team] = make_teams('Strikers', 1)
+        cls.captain = cls.team.owner
+        cls.team.preferred_futsals.set([cls.futsal])
+
+    def revalidate(self, url, etag):
+        with self.assertNumQueries(1):
+            return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_futsal_detail_not_modified_until_edited(self):
+        url = f'/api/futsals/{self.futsal.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+
+        self.futsal.description = 'Now with floodlights'
+        self.futsal.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_futsal_list_changes_when_a_futsal_is_deleted(self):
+        other = make_futsal(self.owner, 'Dome')
+        etag = self.client.get('/api/futsals/')['ETag']
+        self.assertEqual(self.revalidate('/api/futsals/', etag).status_code, 304)
+
+        other.delete()
+        self.assertEqual(self.client.get('/api/futsals/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_team_profile_changes_with_nested_players(self):
+        self.client.force_authenticate(self.captain)
+        url = f'/api/teams/{self.team.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+
+        Player.objects.create(team=self.team, name='Keeper', age=20, is_goalkeeper=True)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class NearbyFutsalTests(APITestCase):
+    """Nearest-first venues with an open future slot, within the radius."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user('geo_owner', 'owner')
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+        def venue(name, lat, lng, open_slot=True):
+            futsal = make_futsal(owner, name, latitude=lat, longitude=lng)
+            TimeSlot.objects.create(futsal=futsal, start_time=start, end_time=start + timedelta(hours=1), is_booked=not open_slot)
+            return futsal
+
+        venue('Thamel', 27.7154, 85.3123)
+        venue('Patan', 27.6726, 85.3250)
+        venue('Bhaktapur', 27.6710, 85.4298)
+        venue('Fully booked', 27.7172, 85.3240, open_slot=False)
+        venue('Pokhara', 28.2096, 83.9856)
+
+    def test_nearest_with_open_slots_first(self):
+        response = self.client.get('/api/futsals/nearby/', {'lat': 27.7172, 'lng': 85.3240, 'k': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([f['name'] for f in response.data], ['Thamel', 'Patan', 'Bhaktapur'])
+        self.assertLess(response.data[0]['distance_km'], response.data[1]['distance_km'])
+
+    def test_radius_limits_results(self):
+        response = self.client.get('/api/futsals/nearby/', {'lat': 27.7172, 'lng': 85.3240, 'radius_km': 8})
+        self.assertEqual([f['name'] for f in response.data], ['Thamel', 'Patan'])
+
+
+class SearchTests(APITestCase):
+    """Prefix and misspelled queries find teams and futsals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user('search_owner', 'owner')
+        cls.user = make_user('search_player')
+        make_futsal(owner, 'Dhuku Futsal', location='Jhamsikhel, Lalitpur', description='Rooftop arena')
+        Team.objects.create(name='Arsenal Kathmandu', location='Baneshwor', owner=cls.user)
+        Team.objects.create(name='Arsenio United', location='Lalitpur', owner=owner)
+        # on_commit never fires inside TestCase, so build the index directly
+        rebuild_search_index()
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(item['type'], item['name']) for item in response.data]
+
+    def test_prefix_matches_word_starts(self):
+        self.assertEqual(
+            set(self.search(q='arsen', type='team')[:2]),
+            {('team', 'Arsenal Kathmandu'), ('team', 'Arsenio United')}
+        )
+
+    def test_typo_tolerant(self):
+        self.assertEqual(self.search(q='arsnal')[0], ('team', 'Arsenal Kathmandu'))
+        self.assertEqual(self.search(q='dhukku')[0], ('futsal', 'Dhuku Futsal'))
+
+    def test_location_matches(self):
+        self.assertIn(('futsal', 'Dhuku Futsal'), self.search(q='lalitpur'))
+        self.assertIn(('team', 'Arsenio United'), self.search(q='lalitpur'))
+
+
+class ImagePipelineTests(TestCase):
+    """Uploads are stored once per content and get resized WebP/JPEG variants."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.owner = make_user('image_owner', 'owner')
+
+    def upload(self):
+        buffer = BytesIO()
+        Image.new('RGB', (2000, 1000), 'green').save(buffer, 'PNG')
+        return SimpleUploadedFile('pitch.png', buffer.getvalue(), content_type='image/png')
+
+    def create_futsal(self, name):
+        return make_futsal(self.owner, name, image=self.upload())
+
+    def test_variants_are_rendered_and_duplicates_reuse_the_original(self):
+        first = self.create_futsal('Arena')
+        process_asset(first.image_hash)
+        first.refresh_from_db()
+
+        self.assertEqual(set(first.image_variants), {'thumb', 'card', 'full'})
+        with default_storage.open(first.image_variants['thumb']['webp']) as thumb:
+            self.assertEqual(Image.open(thumb).size, (160, 80))
+
+        second = self.create_futsal('Dome')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(second.image_variants, first.image_variants)
+        self.assertEqual(ImageAsset.objects.count(), 1)
+
+        data = FutsalSerializer(second).data
+        self.assertTrue(data['image_variants']['card']['jpeg'].endswith('/card.jpeg'))
+
+    def test_saves_without_a_new_upload_skip_the_asset_lookup(self):
+        futsal = self.create_futsal('Arena')
+        futsal.name = 'Arena Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            futsal.save()
+        self.assertFalse([q for q in queries.captured_queries if 'imageasset' in q['sql']])
+
+        # A re-upload of known content only reads the asset
+        futsal.image = self.upload()
+        with CaptureQueriesContext(connection) as queries:
+            futsal.save()
+        asset_queries = [q['sql'] for q in queries.captured_queries if 'imageasset' in q['sql']]
+        self.assertEqual(len(asset_queries), 1)
+        self.assertTrue(asset_queries[0].startswith('SELECT'))
+
+    def test_backfill_hashes_images_uploaded_before_the_pipeline(self):
+        futsal = self.create_futsal('Arena')
+        name = futsal.image.name
+        # As the row looked before image hashes existed
+        ImageAsset.objects.all().delete()
+        Futsal.objects.filter(pk=futsal.pk).update(image_hash='')
+        missing = self.create_futsal('Dome')
+        Futsal.objects.filter(pk=missing.pk).update(image='futsal_images/gone.png', image_hash='')
+
+        out = StringIO()
+        with self.assertLogs('futsal_app.images', 'WARNING'):
+            call_command('process_images', '--backfill', stdout=out)
+
+        futsal.refresh_from_db()
+        self.assertEqual(futsal.image.name, name)
+        self.assertEqual(futsal.image_hash, ImageAsset.objects.get().content_hash)
+        self.assertEqual(set(futsal.image_variants), {'thumb', 'card', 'full'})
+        self.assertIn("Backfilled 1 images.", out.getvalue())
+        self.assertEqual(Futsal.objects.get(pk=missing.pk).image_hash, '')
+
+
+class CurrentTeamTests(APITestCase):
+    """request.team is loaded once per request; one team per owner."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user('team_owner', 'owner')
+        cls.futsals = [make_futsal(owner, f'Arena {i}') for i in range(2)]
+        cls.user = make_user('team_player')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def create_team(self, name):
+        return self.client.post('/api/teams/', {
+            'name': name, 'preferred_futsal_ids': [f.id for f in self.futsals]
+        }, format='json')
+
+    def test_request_team_is_memoized_with_futsals(self):
+        team = Team.objects.create(name='Strikers', owner=self.user, futsal=self.futsals[0])
+        team.preferred_futsals.set(self.futsals)
+
+        @api_view(['GET'])
+        @with_team
+        def view(request):
+            names = [f.name for f in request.team.preferred_futsals.all()]
+            names += [f.name for f in request.team.preferred_futsals.all()]
+            return Response({'id': request.team.id, 'home': request.team.futsal.name, 'preferred': names})
+
+        request = RequestFactory().get('/')
+        force_authenticate(request, self.user)
+        # Team joined with its home futsal, then the preferred futsals
+        with self.assertNumQueries(2):
+            response = view(request)
+        self.assertEqual(response.data['id'], team.id)
+        self.assertEqual(response.data['home'], 'Arena 0')
+
+    def test_second_team_is_rejected_by_constraint(self):
+        self.assertEqual(self.create_team('Strikers').status_code, 201)
+
+        response = self.create_team('Strikers B')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Team.objects.filter(owner=self.user).count(), 1)
+
+    def test_user_without_team(self):
+        response = self.client.get('/api/my-team/')
+        self.assertEqual(response.status_code, 404)
+
+
+class MatchmakingTests(APITestCase):
+    """Queued teams are paired in batches and booked into a slot both can play."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.futsal = make_futsal(make_user('mm_owner', 'owner'), 'Queue Arena')
+        cls.start = (timezone.now() + timedelta(days=1)).replace(hour=18, minute=0, second=0, microsecond=0)
+        cls.slots = [
+            TimeSlot.objects.create(
+                futsal=cls.futsal, start_time=cls.start + timedelta(hours=h), end_time=cls.start + timedelta(hours=h + 1)
+            )
+            for h in range(2)
+        ]
+        cls.teams = make_teams('Queue Team', 4)
+        for team, ranking in zip(cls.teams, [1000, 1010, 1300, 1320]):
+            team.ranking = ranking
+            team.preferred_futsals.set([cls.futsal])
+        Team.objects.bulk_update(cls.teams, ['ranking'])
+
+    def setUp(self):
+        # The index outlives each test's rollback
+        rejection_index.invalidate()
+        self.addCleanup(rejection_index.invalidate)
+
+    def enqueue(self, team):
+        self.client.force_authenticate(team.owner)
+        return self.client.post('/api/competitive/queue/', {
+            'windows': [{'start': self.start.isoformat(), 'end': (self.start + timedelta(hours=3)).isoformat()}]
+        }, format='json')
+
+    def test_queue_pairs_close_ratings_and_books_slots(self):
+        for team in self.teams:
+            self.assertEqual(self.enqueue(team).status_code, 201)
+        self.assertEqual(self.enqueue(self.teams[0]).status_code, 409)
+
+        result = run_matchmaking_cycle()
+
+        pairs = {frozenset((m.team_1_id, m.team_2_id)) for m in result['matches']}
+        self.assertEqual(pairs, {
+            frozenset((self.teams[0].id, self.teams[1].id)),
+            frozenset((self.teams[2].id, self.teams[3].id)),
+        })
+        self.assertEqual(TimeSlot.objects.filter(id__in=[s.id for s in self.slots], is_booked=True).count(), 2)
+        self.assertEqual(Notification.objects.filter(kind='match_found').count(), 4)
+
+        self.client.force_authenticate(self.teams[0].owner)
+        data = self.client.get('/api/competitive/queue/').data
+        self.assertEqual(data['status'], 'matched')
+        self.assertEqual(data['futsal_name'], 'Queue Arena')
+
+    def test_rejection_cooldown_blocks_pairing(self):
+        TeamRejection.objects.create(rejecting_team=self.teams[1], rejected_team=self.teams[0])
+        rejection_index.invalidate()
+        self.enqueue(self.teams[0])
+        self.enqueue(self.teams[1])
+
+        result = run_matchmaking_cycle()
+        self.assertEqual(result['matches'], [])
+        self.assertEqual(MatchmakingTicket.objects.filter(status='waiting').count(), 2)
+
+    def test_pairing_minimizes_total_cost(self):
+        # Greedy would take the cheapest edge (0, 1) and be left with (2, 3)
+        cost = np.array([
+            [INFEASIBLE, 1, 2, 100],
+            [1, INFEASIBLE, 100, 2],
+            [2, 100, INFEASIBLE, 10],
+            [100, 2, 10, INFEASIBLE],
+        ], dtype=float)
+        self.assertEqual({frozenset(pair) for pair in pair_indices(cost)}, {frozenset((0, 2)), frozenset((1, 3))})
+
+
+class ScheduleMatchTests(APITestCase):
+    """Scheduling books the best free slot at a shared futsal and ranks the rest."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user('sched_owner', 'owner')
+        cls.pricey = make_futsal(owner, 'Pricey Arena', price_per_hour='3000.00')
+        cls.cheap = make_futsal(owner, 'Cheap Arena', price_per_hour='1000.00')
+        cls.elsewhere = make_futsal(owner, 'Elsewhere', location='Pokhara', price_per_hour='500.00')
+        cls.day = timezone.localdate() + timedelta(days=2)
+        start = timezone.make_aware(datetime.combine(cls.day, datetime.min.time())) + timedelta(hours=18)
+        cls.slots = {
+            futsal.name: TimeSlot.objects.create(futsal=futsal, start_time=start, end_time=start + timedelta(hours=1))
+            for futsal in (cls.pricey, cls.cheap, cls.elsewhere)
+        }
+
+        teams = make_teams('Sched Team')
+        teams[0].preferred_futsals.set([cls.pricey, cls.cheap, cls.elsewhere])
+        teams[1].preferred_futsals.set([cls.pricey, cls.cheap])
+        cls.match = Match.objects.create(team_1=teams[0], team_2=teams[1], status='confirmed', accepted=True)
+        cls.user = teams[0].owner
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def schedule(self, **data):
+        return self.client.post(f'/api/competitive/schedule/{self.match.id}/', {
+            'scheduled_date': self.day.isoformat(), **data
+        }, format='json')
+
+    def test_books_cheapest_shared_slot_and_ranks_alternatives(self):
+        response = self.schedule()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['futsal'], 'Cheap Arena')
+        # Elsewhere is cheaper but only one team plays there
+        self.assertEqual([alt['futsal'] for alt in response.data['alternatives']], ['Pricey Arena'])
+
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.status, 'scheduled')
+        self.assertEqual(self.match.time_slot_id, self.slots['Cheap Arena'].id)
+        self.assertTrue(TimeSlot.objects.get(id=self.slots['Cheap Arena'].id).is_booked)
+
+    def test_requested_slot_taken_returns_alternatives(self):
+        TimeSlot.objects.filter(id=self.slots['Pricey Arena'].id).update(is_booked=True)
+
+        response = self.schedule(slot_id=self.slots['Pricey Arena'].id)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([alt['futsal'] for alt in response.data['alternatives']], ['Cheap Arena'])
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.status, 'confirmed')
+
+
+class TournamentTests(APITestCase):
+    """Fixtures pair every team within availability and rest days; winners advance."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('cup_owner', 'owner')
+        cls.futsals = [make_futsal(cls.owner, f'Cup Arena {i}') for i in range(2)]
+        cls.start = timezone.localdate() + timedelta(days=1)
+        for offset in range(14):
+            evening = timezone.make_aware(datetime.combine(cls.start + timedelta(days=offset), datetime.min.time())) + timedelta(hours=18)
+            for futsal in cls.futsals:
+                for hour in range(2):
+                    start = evening + timedelta(hours=hour)
+                    TimeSlot.objects.create(futsal=futsal, start_time=start, end_time=start + timedelta(hours=1))
+
+        cls.teams = make_teams('Cup Team', 4)
+
+    def setUp(self):
+        self.client.force_authenticate(self.owner)
+
+    def create(self, fmt, teams, **data):
+        return self.client.post('/api/tournaments/', {
+            'name': 'Cup', 'format': fmt, 'futsals': [futsal.id for futsal in self.futsals],
+            'entries': [{'team': team.id, 'seed': seed} for seed, team in enumerate(teams, start=1)],
+            'start_date': self.start.isoformat(), 'end_date': (self.start + timedelta(days=13)).isoformat(),
+            'rest_days': 1, **data,
+        }, format='json')
+
+    def test_round_robin_keeps_rest_days_and_availability(self):
+        data = {'entries': [{'team': team.id, 'weekdays': '024' if i == 0 else '0123456'} for i, team in enumerate(self.teams)]}
+        response = self.create('round_robin', self.teams, **data)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['fixtures'], response.data['unscheduled']), (6, 0))
+
+        fixtures = list(Fixture.objects.select_related('time_slot', 'match'))
+        self.assertEqual(len({frozenset((f.team_1_id, f.team_2_id)) for f in fixtures}), 6)
+        self.assertEqual(len({f.time_slot_id for f in fixtures}), 6)
+        self.assertTrue(all(f.match.status == 'scheduled' and f.match.time_slot_id == f.time_slot_id for f in fixtures))
+        self.assertEqual(TimeSlot.objects.filter(is_booked=True).count(), 6)
+
+        for team in self.teams:
+            days = sorted(timezone.localdate(f.time_slot.start_time) for f in fixtures if team.id in (f.team_1_id, f.team_2_id))
+            self.assertTrue(all((later - earlier).days > 1 for earlier, later in zip(days, days[1:])))
+            if team == self.teams[0]:
+                self.assertTrue(all(str(day.weekday()) in '024' for day in days))
+
+    def test_knockout_bye_and_winner_advances(self):
+        response = self.create('knockout', self.teams[:3])
+        self.assertEqual(response.status_code, 201)
+
+        bye, semi, final = Fixture.objects.select_related('time_slot', 'match')
+        self.assertTrue(bye.is_bye)
+        self.assertIsNone(bye.time_slot)
+        self.assertEqual(final.team_1_id, self.teams[0].id)  # Top seed through on the bye
+        self.assertGreater((final.time_slot.start_time - semi.time_slot.start_time).days, 1)
+        self.assertIsNone(final.match)
+
+        semi.match.winner = self.teams[2]
+        semi.match.is_completed = True
+        semi.match.save()
+
+        final.refresh_from_db()
+        self.assertEqual((final.team_1_id, final.team_2_id), (self.teams[0].id, self.teams[2].id))
+        self.assertEqual(final.match.time_slot_id, final.time_slot_id)
+
+    def test_only_own_futsals(self):
+        self.client.force_authenticate(make_user('cup_other', 'owner'))
+        self.assertEqual(self.create('knockout', self.teams).status_code, 400)
+
+    def test_round_robin_pairs_everyone_once(self):
+        specs = round_robin_specs(range(7))
+        self.assertEqual(len({spec[0] for spec in specs}), 7)
+        self.assertEqual(len({frozenset(spec[2:4]) for spec in specs}), 21)
+
+
+class RejectionIndexTests(TestCase):
+    """The index follows committed rejections and other workers' version bumps."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.rejecting, cls.rejected = make_teams('Reject Team')
+
+    def setUp(self):
+        rejection_index.invalidate()
+        self.addCleanup(rejection_index.invalidate)
+
+    def blocked(self):
+        return rejection_index.is_blocked(self.rejecting.id, self.rejected.id)
+
+    def test_record_and_discard_apply_on_commit(self):
+        self.assertFalse(self.blocked())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rejection = TeamRejection.objects.create(rejecting_team=self.rejecting, rejected_team=self.rejected)
+            self.assertFalse(self.blocked())
+        self.assertTrue(self.blocked())
+        self.assertEqual(rejection_index.rejectors_of(self.rejected.id), {self.rejecting.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rejection.cleared = True
+            rejection.save()
+            self.assertTrue(self.blocked())
+        self.assertFalse(self.blocked())
+
+    def test_expired_rejection_is_ignored_and_cleared_by_command(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            rejection = TeamRejection.objects.create(rejecting_team=self.rejecting, rejected_team=self.rejected)
+        self.assertTrue(self.blocked())
+
+        # A local entry past its expiry stops blocking without a reload
+        rejection_index.record(self.rejecting.id, self.rejected.id, timezone.now() - timedelta(days=2))
+        self.assertFalse(self.blocked())
+
+        TeamRejection.objects.filter(id=rejection.id).update(timestamp=timezone.now() - timedelta(days=2))
+        rejection_index.invalidate()
+        with self.assertNumQueries(1):  # The reload reads, never writes
+            self.assertFalse(self.blocked())
+        rejection.refresh_from_db()
+        self.assertFalse(rejection.cleared)
+
+        out = StringIO()
+        call_command('clear_expired_rejections', stdout=out)
+        rejection.refresh_from_db()
+        self.assertTrue(rejection.cleared)
+        self.assertIn("Cleared 1 expired rejections.", out.getvalue())
+
+    def test_reloads_when_version_bumps(self):
+        self.assertFalse(self.blocked())
+
+        # Another worker's write: no signal here, only the shared version moves
+        TeamRejection.objects.bulk_create([TeamRejection(rejecting_team=self.rejecting, rejected_team=self.rejected)])
+        self.assertFalse(self.blocked())
+        cache.incr(VERSION_CACHE_KEY)
+        self.assertFalse(self.blocked())  # Checked at most once per VERSION_CHECK_SECONDS
+
+        later = time.monotonic() + VERSION_CHECK_SECONDS
+        with mock.patch('futsal_app.rejections.time.monotonic', return_value=later):
+            self.assertTrue(self.blocked())
+
+
+class TeamListQueryCountTests(APITestCase):
+    """Team lists cost the same queries however many teams they return."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user('browse_owner', 'owner')
+        cls.futsals = [make_futsal(owner, f'Browse Arena {i}') for i in range(2)]
+        cls.user = make_user('browser')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def add_teams(self, count):
+        start = Team.objects.count()
+        for i in range(start, start + count):
+            team = Team.objects.create(name=f'Browse Team {i}', owner=make_user(f'browse{i}'), futsal=self.futsals[0])
+            team.preferred_futsals.set(self.futsals)
+            Player.objects.create(team=team, name=f'Player {i}', age=20)
+
+    def assertConstantQueries(self, url, queries):
+        for count in (2, 6):
+            self.add_teams(count)
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), Team.objects.count())
+
+    def test_full_team_rows(self):
+        # Teams, preferred futsals, players
+        self.assertConstantQueries('/api/other-teams/', 3)
+
+    def test_summary_rows(self):
+        # Teams with player counts, preferred futsal ids
+        self.assertConstantQueries('/api/other-teams/?view=summary', 2)
+
+
+class TeamMatchListTests(APITestCase):
+    """Friendly matches across the UNION ALL branches are listed once, in cursor order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('union_owner', 'owner')
+        futsal = make_futsal(cls.user, 'Union Arena')
+        b, c = make_teams('Union')
+        mine = Team.objects.create(name='Union Mine', owner=cls.user)
+        start = timezone.now() + timedelta(days=1)
+        slot = TimeSlot.objects.create(futsal=futsal, start_time=start, end_time=start + timedelta(hours=1))
+
+        def match(team_1, team_2, time_slot=None, **kwargs):
+            return TeamMatch(team_1=team_1, team_2=team_2, match_type='friendly', scheduled_time=start, time_slot=time_slot, **kwargs)
+
+        cls.sent_at_my_venue, cls.received, cls.hosted, cls.unrelated, cls.finished = TeamMatch.objects.bulk_create([
+            match(mine, b, slot),       # Sender and venue owner
+            match(b, mine),             # Receiver
+            match(b, c, slot),          # Venue owner only
+            match(b, c),
+            match(mine, c, result_updated=True),
+        ])
+        # Identical created_at everywhere: only the id orders them
+        TeamMatch.objects.update(created_at=start - timedelta(days=2))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_each_match_listed_once(self):
+        response = self.client.get('/api/team-matches/')
+        self.assertEqual(response.status_code, 200)
+        expected = [self.hosted.id, self.received.id, self.sent_at_my_venue.id]
+        self.assertEqual([row['id'] for row in response.data], expected)
+
+        response = self.client.get('/api/team-matches/?include_all=true')
+        self.assertEqual([row['id'] for row in response.data], [self.finished.id] + expected)
+
+    def test_cursor_pages_with_tied_created_at(self):
+        seen = []
+        url = '/api/team-matches/?include_all=true&page_size=1'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, [self.finished.id, self.hosted.id, self.received.id, self.sent_at_my_venue.id])
+
+    def test_query_count(self):
+        # One query: the UNION ALL runs as a subquery, teams are joined
+        with self.assertNumQueries(1):
+            self.client.get('/api/team-matches/?include_all=true')
+
+
+class CompetitiveHistoryTests(APITestCase):
+    """History endpoints keep their response shape and page with ?page_size=."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('history_owner', 'owner')
+        cls.futsal = make_futsal(cls.owner, 'History Arena')
+        cls.mine, cls.other = make_teams('History Team')
+        cls.day = timezone.localdate() + timedelta(days=3)
+        cls.matches = Match.objects.bulk_create([
+            Match(team_1=cls.mine, team_2=cls.other, status='completed', accepted=True, scheduled_date=cls.day,
+                  futsal=cls.futsal, winner=cls.other)
+            for _ in range(5)
+        ])
+        cls.latest = cls.matches[-1]
+
+    def test_team_history_shape(self):
+        self.client.force_authenticate(self.mine.owner)
+        response = self.client.get('/api/competitive/matches/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response.data[0], {
+            "id": self.latest.id,
+            "team_1": self.mine.id,
+            "team_1_name": self.mine.name,
+            "team_2": self.other.id,
+            "team_2_name": self.other.name,
+            "match_type": 'competitive',
+            "scheduled_time": self.day,
+            "status": 'completed',
+            "accepted": True,
+            "created_at": Match.objects.get(id=self.latest.id).created_at,
+            "futsal_name": self.futsal.name,
+        })
+
+    def test_owner_history_shape(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get('/api/owner/competitive-matches/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0], {
+            "id": self.latest.id,
+            "team_1": self.mine.name,
+            "team_1_id": self.mine.id,
+            "team_2": self.other.name,
+            "team_2_id": self.other.id,
+            "status": 'completed',
+            "scheduled_date": self.day,
+            "winner": self.other.name,
+            "futsal": self.futsal.name,
+        })
+
+    def test_pages_past_the_first(self):
+        expected = [match.id for match in reversed(self.matches)]
+        for user, url in ((self.mine.owner, '/api/competitive/matches/'), (self.owner, '/api/owner/competitive-matches/')):
+            self.client.force_authenticate(user)
+            first = self.client.get(f'{url}?page_size=2').data
+            second = self.client.get(first['next']).data
+            self.assertEqual([row['id'] for row in first['results'] + second['results']], expected[:4])
+            self.assertIsNotNone(second['next'])
+
+
+class OwnerExportTests(APITestCase):
+    """Exports stream only the owner's rows, headers first, as CSV, NDJSON or gzip."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, other_owner = [make_user(f'export_owner{i}', 'owner') for i in range(2)]
+        futsals = [make_futsal(owner, f'Export Arena {i}') for i, owner in enumerate((cls.owner, other_owner))]
+        teams = make_teams('Export Team')
+        cls.player = teams[0].owner
+        cls.mine, _ = Match.objects.bulk_create([
+            Match(team_1=teams[0], team_2=teams[1], status='confirmed', futsal=futsal) for futsal in futsals
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(self.owner)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv_has_headers_and_only_own_rows(self):
+        response = self.client.get('/api/owner/exports/matches/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="matches.csv"')
+
+        lines = self.body(response).decode().splitlines()
+        self.assertEqual(lines[0], 'id,created_at,scheduled_date,futsal,team_1,team_2,status,goals_team_1,goals_team_2,winner')
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], [str(self.mine.id)])
+        self.assertIn('Export Arena 0', lines[1])
+
+    def test_ndjson_gzip(self):
+        response = self.client.get('/api/owner/exports/matches/?output=ndjson&gzip=true')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="matches.ndjson.gz"')
+
+        rows = [json.loads(line) for line in zlib.decompress(self.body(response), 16 + zlib.MAX_WBITS).splitlines()]
+        self.assertEqual([(row['id'], row['futsal']) for row in rows], [(self.mine.id, 'Export Arena 0')])
+
+    def test_empty_export(self):
+        response = self.client.get('/api/owner/exports/payments/')
+        self.assertEqual(self.body(response).decode().splitlines(), [
+            'id,created_at,match_id,futsal,amount,method,status,transaction_id'
+        ])
+
+        response = self.client.get('/api/owner/exports/payments/?output=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(self.body(response), b'')
+
+    def test_owners_only(self):
+        self.client.force_authenticate(self.player)
+        self.assertEqual(self.client.get('/api/owner/exports/matches/').status_code, 403)
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.get('/api/owner/exports/unknown/').status_code, 404)
+
+
+class DailyStatsRollupTests(APITestCase):
+    """Per futsal-day rollups, refreshed once per touched day on commit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('rollup_owner', 'owner')
+        cls.futsal = make_futsal(cls.owner, 'Rollup Arena', price_per_hour='1000.00')
+        cls.day = timezone.localdate() + timedelta(days=1)
+        cls.midnight = timezone.make_aware(datetime.combine(cls.day, datetime.min.time()))
+
+    def setUp(self):
+        self.client.force_authenticate(self.owner)
+
+    def stats(self, day):
+        return FutsalDailyStats.objects.filter(futsal=self.futsal, day=day).first()
+
+    def add_slot(self, hour, **kwargs):
+        start = self.midnight + timedelta(hours=hour)
+        return TimeSlot.objects.create(futsal=self.futsal, start_time=start, end_time=start + timedelta(hours=1), **kwargs)
+
+    def test_rollup_aggregates(self):
+        today = timezone.localdate()
+        start = timezone.make_aware(datetime.combine(today, datetime.min.time())) + timedelta(hours=12)
+        slots = TimeSlot.objects.bulk_create([
+            TimeSlot(futsal=self.futsal, start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1), is_booked=i < 2)
+            for i in range(3)
+        ])
+        teams = make_teams('Rollup Team')
+        team_matches = TeamMatch.objects.bulk_create([
+            TeamMatch(team_1=teams[0], team_2=teams[1], match_type='friendly', scheduled_time=slot.start_time, time_slot=slot)
+            for slot in slots[:2]
+        ])
+        Payment.objects.bulk_create([
+            Payment(match=team_matches[0], amount='1000.00', method='Cash', status='paid', transaction_id='cash-1'),
+            Payment(match=team_matches[1], amount='1500.00', method='eSewa', status='paid', transaction_id='esewa-1'),
+        ])
+        Match.objects.bulk_create([Match(team_1=teams[0], team_2=teams[1], futsal=self.futsal, scheduled_date=today)])
+
+        self.assertEqual(rollup_daily_stats(today, today), 1)
+        stats = self.stats(today)
+        self.assertEqual((stats.slots_offered, stats.slots_booked, stats.competitive_matches), (3, 2, 1))
+        self.assertEqual((stats.paid_amount, stats.cash_amount, stats.esewa_amount), (2500, 1000, 1500))
+
+    def test_generated_slots_refresh_the_day_once(self):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post('/api/generate-time-slots/', {
+                'futsal_id': self.futsal.id,
+                'start_time': self.midnight.isoformat(),
+                'end_time': (self.midnight + timedelta(hours=24)).isoformat(),
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 24)
+
+        # One slot event each, one rollup and one heatmap invalidation for the whole batch
+        self.assertEqual(sum(getattr(callback, 'batch', None) is stats_refreshes for callback in callbacks), 1)
+        self.assertEqual(len(callbacks), 26)
+        self.assertEqual(self.stats(self.day).slots_offered, 24)
+        # Futsal, rules, heatmap, one insert, one rollup (plus savepoints)
+        self.assertLessEqual(len(queries), 15)
+
+    def test_created_slot_is_saved_once(self):
+        start = self.midnight + timedelta(hours=9)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post('/api/time-slots/', {
+                'futsal': self.futsal.id, 'start_time': start.isoformat(), 'end_time': (start + timedelta(hours=1)).isoformat(),
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNotNone(TimeSlot.objects.get(id=response.data['id']).price)
+        self.assertEqual(len(callbacks), 3)  # Slot event, rollup, heatmap
+        self.assertEqual(self.stats(self.day).slots_offered, 1)
+
+    def test_moved_slot_refreshes_old_and_new_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            slot = self.add_slot(10)
+        self.assertEqual(self.stats(self.day).slots_offered, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            slot.start_time += timedelta(days=1)
+            slot.end_time += timedelta(days=1)
+            slot.save()
+        self.assertIsNone(self.stats(self.day))
+        self.assertEqual(self.stats(self.day + timedelta(days=1)).slots_offered, 1)
+
+    def test_rollup_updates_existing_rows_in_place(self):
+        self.add_slot(10)
+        rollup_daily_stats(self.day, self.day)
+        row = self.stats(self.day)
+        # A stale row for a day that no longer has any activity
+        FutsalDailyStats.objects.create(futsal=self.futsal, day=self.day - timedelta(days=1), slots_offered=5)
+        self.add_slot(11)
+
+        # Three aggregates, then savepoint, read keys, delete stale, upsert, release
+        with self.assertNumQueries(8):
+            self.assertEqual(rollup_daily_stats(self.day - timedelta(days=1), self.day), 1)
+        self.assertEqual(self.stats(self.day).pk, row.pk)
+        self.assertEqual(self.stats(self.day).slots_offered, 2)
+        self.assertIsNone(self.stats(self.day - timedelta(days=1)))
+
+    def test_refresh_survives_rolled_back_write(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.add_slot(10)
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            self.add_slot(11)
+        self.assertEqual(self.stats(self.day).slots_offered, 1)
+
+
+class DemandHeatmapTests(TestCase):
+    """Weekday/hour bincounts, marked stale once per transaction and debounced."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.futsal = make_futsal(make_user('heat_owner', 'owner'), 'Heat Arena')
+        cls.start = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=2), datetime.min.time())) + timedelta(hours=18)
+        slots = TimeSlot.objects.bulk_create([
+            TimeSlot(futsal=cls.futsal, start_time=cls.start + timedelta(days=7 * week), end_time=cls.start + timedelta(days=7 * week, hours=1))
+            for week in range(4)
+        ])
+        teams = make_teams('Heat Team')
+        match = TeamMatch.objects.bulk_create([
+            TeamMatch(team_1=teams[0], team_2=teams[1], match_type='friendly', scheduled_time=cls.start, time_slot=slots[0])
+        ])[0]
+        TeamMatch.objects.filter(id=match.id).update(created_at=cls.start - timedelta(hours=10))
+        TimeSlot.objects.filter(id=slots[0].id).update(is_booked=True, booked_by_match=match)
+
+    def setUp(self):
+        cache.delete(heatmap_cache_key(self.futsal.id))
+
+    def test_bincounts_per_weekday_and_hour(self):
+        heatmap = get_demand_heatmap(self.futsal.id)
+        row, hour = timezone.localtime(self.start).weekday(), timezone.localtime(self.start).hour
+
+        self.assertEqual(heatmap["sample_size"], 4)
+        self.assertEqual(heatmap["slots_offered"][row][hour], 4)
+        self.assertEqual(sum(map(sum, heatmap["slots_offered"])), 4)
+        self.assertEqual(heatmap["occupancy"][row][hour], 0.25)
+        self.assertEqual(heatmap["avg_lead_hours"][row][hour], 10.0)
+
+    def test_slot_changes_mark_heatmap_stale_once(self):
+        self.assertEqual(get_demand_heatmap(self.futsal.id)["sample_size"], 4)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for hour in (8, 9):
+                start = self.start - timedelta(hours=hour)
+                TimeSlot.objects.create(futsal=self.futsal, start_time=start, end_time=start + timedelta(hours=1))
+        self.assertEqual(sum(getattr(callback, 'batch', None) is heatmap_invalidations for callback in callbacks), 1)
+
+        # Still inside the refresh delay: the cached copy is served
+        self.assertEqual(get_demand_heatmap(self.futsal.id)["sample_size"], 4)
+
+        key = heatmap_cache_key(self.futsal.id)
+        cached = cache.get(key)
+        cache.set(key, {**cached, "computed_at": cached["computed_at"] - HEATMAP_REFRESH_DELAY - 1})
+        self.assertEqual(get_demand_heatmap(self.futsal.id)["sample_size"], 6)
+
+
+class SlotPricingTests(APITestCase):
+    """Only the narrowest band rule applies; payments charge the slot price."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.futsal = make_futsal(make_user('price_owner', 'owner'), 'Price Arena', price_per_hour='1000.00')
+        cls.futsal.refresh_from_db()  # Decimal price_per_hour
+        today = timezone.localdate()
+        cls.friday = today + timedelta(days=(4 - today.weekday()) % 7 + 7)
+        PriceRule.objects.bulk_create([
+            PriceRule(futsal=cls.futsal, label='Weekend', weekdays='56', multiplier='1.50'),
+            PriceRule(futsal=cls.futsal, label='Evenings', start_hour=18, end_hour=22, multiplier='1.20'),
+        ])
+
+    def price(self, day, hour):
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=hour)
+        slot = TimeSlot(futsal=self.futsal, start_time=start, end_time=start + timedelta(hours=1))
+        return price_slots(self.futsal, [slot])[0].price
+
+    def test_weekday_and_hour_bands(self):
+        saturday = self.friday + timedelta(days=1)
+        self.assertEqual(self.price(self.friday, 10), 1000)
+        self.assertEqual(self.price(self.friday, 19), 1200)
+        self.assertEqual(self.price(saturday, 10), 1500)
+
+    def test_overlapping_bands_do_not_compound(self):
+        saturday = self.friday + timedelta(days=1)
+        # Evenings (28 weekday-hours) is narrower than Weekend (48)
+        self.assertEqual(self.price(saturday, 19), 1200)
+
+        PriceRule.objects.create(futsal=self.futsal, label='Saturday night', weekdays='5', start_hour=18, end_hour=22, multiplier='2.00')
+        self.assertEqual(self.price(saturday, 19), 2000)
+
+    def test_payment_charges_slot_price(self):
+        start = timezone.make_aware(datetime.combine(self.friday, datetime.min.time())) + timedelta(hours=19)
+        slot = price_slots(self.futsal, [TimeSlot(futsal=self.futsal, start_time=start, end_time=start + timedelta(hours=1))])[0]
+        slot.save()
+        teams = make_teams('Payer Team')
+        match = TeamMatch.objects.bulk_create([
+            TeamMatch(team_1=teams[0], team_2=teams[1], match_type='friendly', scheduled_time=start, time_slot=slot)
+        ])[0]
+
+        self.client.force_authenticate(teams[1].owner)
+        response = self.client.post(f'/api/payments/initiate/{match.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['payment_data']['amount'], '1200.00')
+        self.assertEqual(Payment.objects.get(match=match).amount, slot_price(slot))
+
+
+class AsyncEndpointTests(APITestCase):
+    """The async views, driven through the ASGI test client."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sender_team, cls.receiver_team = make_teams('Async Team')
+        cls.sender, cls.receiver = cls.sender_team.owner, cls.receiver_team.owner
+        cls.tokens = {user: Token.objects.create(user=user).key for user in (cls.sender, cls.receiver)}
+
+    def setUp(self):
+        rejection_index.invalidate()
+        self.addCleanup(rejection_index.invalidate)
+
+    def auth(self, user):
+        return {"Authorization": f"Token {self.tokens[user]}"}
+
+    async def test_recommend(self):
+        response = await self.async_client.get('/api/competitive/recommend/', headers=self.auth(self.sender))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["your_team_id"], self.sender_team.id)
+
+    async def test_send_and_reject_request(self):
+        response = await self.async_client.post(
+            f'/api/competitive/request/{self.receiver_team.id}/', headers=self.auth(self.sender)
+        )
+        self.assertEqual(response.status_code, 201)
+        match_id = response.json()["match_id"]
+
+        response = await self.async_client.post(
+            f'/api/competitive/respond/{match_id}/', {"decision": "reject"},
+            content_type='application/json', headers=self.auth(self.receiver)
+        )
+        self.assertEqual(response.status_code, 200)
+        match = await Match.objects.aget(id=match_id)
+        self.assertEqual((match.status, match.accepted), ('rejected', False))
+        self.assertTrue(await TeamRejection.objects.filter(rejecting_team=self.receiver_team, rejected_team=self.sender_team).aexists())
+
+    async def test_esewa_verify(self):
+        def seed():
+            start = timezone.now() + timedelta(days=1)
+            match = TeamMatch.objects.bulk_create([
+                TeamMatch(team_1=self.sender_team, team_2=self.receiver_team, match_type='friendly', scheduled_time=start)
+            ])[0]
+            return Payment.objects.create(match=match, amount='1000.00', method='eSewa', transaction_id='async-1')
+        payment = await sync_to_async(seed)()
+
+        requests = []
+
+        def esewa(request):
+            requests.append(request)
+            return httpx.Response(200, text='{"status": "SUCCESS"}')
+
+        with mock.patch('httpx.AsyncClient', partial(httpx.AsyncClient, transport=httpx.MockTransport(esewa))):
+            response = await self.async_client.post(
+                '/api/payments/verify/', {"transaction_uuid": "async-1"},
+                content_type='application/json', headers=self.auth(self.receiver)
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"pid=async-1", requests[0].content)
+        await payment.arefresh_from_db()
+        self.assertEqual(payment.status, 'paid')
@@ -0,0 +1,369 @@
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Fixture, Match, TeamMatch, TimeSlot
+from .signals import slots_booked
+
+
+MAX_TEAMS = 128
+MAX_REPAIR_TRIES = 50  # Displacements tried per fixture the greedy pass couldn't place
+
+
+# ----------------- Pairings -----------------
+# A fixture spec is (round, position, team_1, team_2, feeders): teams are ids
+# or None (not yet known, or a bye), feeders the indexes of the knockout
+# fixtures whose winners play in it.
+
+def round_robin_specs(team_ids):
+    """
+    Circle method: every team meets every other once over n - 1 rounds (n
+    rounded up to even; the odd team out each round has a bye).
+    """
+    teams = list(team_ids)
+    if len(teams) % 2:
+        teams.append(None)
+    n = len(teams)
+
+    specs = []
+    for round_number in range(1, n):
+        position = 0
+        for i in range(n // 2):
+            home, away = teams[i], teams[n - 1 - i]
+            if home is None or away is None:
+                continue
+            # The fixed first team would otherwise always be listed first
+            if i == 0 and round_number % 2 == 0:
+                home, away = away, home
+            specs.append((round_number, position, home, away, ()))
+            position += 1
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    return specs
+
+
+def bracket_order(size):
+    """
+    Seeds (1-based) in bracket order, e.g. 8 -> [1, 8, 4, 5, 2, 7, 3, 6],
+    so the top two seeds can only meet in the final.
+    """
+    order = [1]
+    while len(order) < size:
+        total = 2 * len(order) + 1
+        order = [seed for top in order for seed in (top, total - top)]
+    return order
+
+
+def knockout_specs(seeded_team_ids):
+    """
+    Single elimination over the next power of two; the missing seeds are
+    byes, which put the top seeds straight into round 2.
+    """
+    size = 1
+    while size < len(seeded_team_ids):
+        size *= 2
+    seeds = list(seeded_team_ids) + [None] * (size - len(seeded_team_ids))
+    order = bracket_order(size)
+
+    specs = [
+        (1, position, seeds[order[2 * position] - 1], seeds[order[2 * position + 1] - 1], ())
+        for position in range(size // 2)
+    ]
+    previous = list(range(len(specs)))
+    round_number = 2
+    while len(previous) > 1:
+        current = []
+        for position in range(len(previous) // 2):
+            feeders = (previous[2 * position], previous[2 * position + 1])
+            team_1, team_2 = (_bye_winner(specs[feeder]) for feeder in feeders)
+            specs.append((round_number, position, team_1, team_2, feeders))
+            current.append(len(specs) - 1)
+        previous = current
+        round_number += 1
+    return specs
+
+
+def _bye_winner(spec):
+    _, _, team_1, team_2, feeders = spec
+    if feeders or (team_1 is None) == (team_2 is None):
+        return None
+    return team_1 if team_1 is not None else team_2
+
+
+def is_bye(spec):
+    _, _, team_1, team_2, feeders = spec
+    return not feeders and (team_1 is None or team_2 is None)
+
+
+# ----------------- Slot assignment -----------------
+
+class FixtureScheduler:
+    """
+    Greedy with repair. Fixtures are placed in order, each on the earliest
+    day every constraint allows, at the least-used futsal with a free slot
+    that day (earliest slot first). A fixture left over then tries to take
+    an occupied slot whose fixture can move elsewhere.
+
+    Constraints: each slot hosts one fixture; a team plays only on its
+    weekdays, never on a day it is already busy, and with rest_days full
+    days between its matches; knockout fixtures come rest_days after the
+    fixtures feeding them.
+    """
+
+    def __init__(self, specs, slots, rest_days=1, weekdays=None, busy_days=None):
+        self.specs = specs
+        self.rest = rest_days
+        self.weekdays = weekdays or {}
+        self.busy_days = busy_days or {}
+
+        # slots: [(slot id, futsal id, start timestamp, day ordinal)]
+        self.slot_info = {slot[0]: slot for slot in slots}
+        self.free = defaultdict(lambda: defaultdict(list))  # day -> futsal -> [(start, slot id)]
+        self.day_slots = defaultdict(list)
+        for slot_id, futsal_id, start, day in slots:
+            insort(self.free[day][futsal_id], (start, slot_id))
+            self.day_slots[day].append(slot_id)
+        self.days = sorted(self.free)
+        self.weekday = {day: str(datetime.fromordinal(day).weekday()) for day in self.days}
+
+        self.venue_use = Counter()
+        self.team_days = defaultdict(list)  # team -> sorted day ordinals
+        self.placed = {}  # fixture index -> slot id
+        self.occupant = {}  # slot id -> fixture index
+
+        self.teams = [tuple(team for team in spec[2:4] if team is not None) for spec in specs]
+        self.dependents = defaultdict(list)
+        for index, spec in enumerate(specs):
+            for feeder in spec[4]:
+                self.dependents[feeder].append(index)
+
+    # ---------- Constraints ----------
+
+    def _day_of(self, index):
+        slot_id = self.placed.get(index)
+        return self.slot_info[slot_id][3] if slot_id is not None else None
+
+    def feasible(self, index, day):
+        weekday = self.weekday[day]
+        for team in self.teams[index]:
+            if weekday not in self.weekdays.get(team, '0123456') or day in self.busy_days.get(team, ()):
+                return False
+            days = self.team_days[team]
+            nearest = bisect_left(days, day - self.rest)
+            if nearest < len(days) and days[nearest] <= day + self.rest:
+                return False
+
+        for feeder in self.specs[index][4]:
+            feeder_day = self._day_of(feeder)
+            if feeder_day is not None and day <= feeder_day + self.rest:
+                return False
+        for dependent in self.dependents[index]:
+            dependent_day = self._day_of(dependent)
+            if dependent_day is not None and day >= dependent_day - self.rest:
+                return False
+        return True
+
+    # ---------- Placement ----------
+
+    def _take(self, index, slot_id):
+        _, futsal_id, start, day = self.slot_info[slot_id]
+        self.free[day][futsal_id].remove((start, slot_id))
+        self.placed[index] = slot_id
+        self.occupant[slot_id] = index
+        self.venue_use[futsal_id] += 1
+        for team in self.teams[index]:
+            insort(self.team_days[team], day)
+
+    def _release(self, index):
+        slot_id = self.placed.pop(index)
+        _, futsal_id, start, day = self.slot_info[slot_id]
+        del self.occupant[slot_id]
+        insort(self.free[day][futsal_id], (start, slot_id))
+        self.venue_use[futsal_id] -= 1
+        for team in self.teams[index]:
+            self.team_days[team].remove(day)
+
+    def _best_free_slot(self, day):
+        venues = [(self.venue_use[futsal_id], free[0]) for futsal_id, free in self.free[day].items() if free]
+        return min(venues)[1][1] if venues else None
+
+    def _place_greedy(self, index):
+        feeder_days = [self._day_of(feeder) for feeder in self.specs[index][4]]
+        earliest = max([day + self.rest + 1 for day in feeder_days if day is not None], default=0)
+        for day in self.days[bisect_left(self.days, earliest):]:
+            if not self.feasible(index, day):
+                continue
+            slot_id = self._best_free_slot(day)
+            if slot_id is not None:
+                self._take(index, slot_id)
+                return True
+        return False
+
+    def _repair(self, index):
+        # Any day the fixture could use but the greedy pass found full: move
+        # one of its fixtures elsewhere to free the slot
+        tries = 0
+        for day in self.days:
+            if not self.feasible(index, day):
+                continue
+            for slot_id in self.day_slots[day]:
+                other = self.occupant.get(slot_id)
+                if other is None:
+                    continue
+                if tries == MAX_REPAIR_TRIES:
+                    return False
+                tries += 1
+
+                self._release(other)
+                self._take(index, slot_id)
+                if self._place_greedy(other):
+                    return True
+                self._release(index)
+                self._take(other, slot_id)
+        return False
+
+    def solve(self):
+        """
+        {fixture index: slot id}; fixtures missing from it found no slot.
+        """
+        unplaced = []
+        for index, spec in enumerate(self.specs):
+            if not is_bye(spec) and not self._place_greedy(index):
+                unplaced.append(index)
+
+        for index in unplaced:
+            self._repair(index)
+        return dict(self.placed)
+
+
+# ----------------- Generation -----------------
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _busy_days(team_ids, date_from, date_to):
+    """
+    Days each team already plays, from scheduled competitive and friendly matches.
+    """
+    busy = defaultdict(set)
+    competitive = Match.objects.filter(
+        Q(team_1_id__in=team_ids) | Q(team_2_id__in=team_ids),
+        scheduled_date__gte=date_from, scheduled_date__lte=date_to,
+    ).exclude(status='rejected').values_list('team_1_id', 'team_2_id', 'scheduled_date')
+    friendly = TeamMatch.objects.filter(
+        Q(team_1_id__in=team_ids) | Q(team_2_id__in=team_ids),
+        scheduled_time__gte=_day_start(date_from), scheduled_time__lt=_day_start(date_to + timedelta(days=1)),
+    ).exclude(accepted=False).values_list('team_1_id', 'team_2_id', 'scheduled_time')
+
+    for team_1, team_2, when in competitive:
+        for team in (team_1, team_2):
+            busy[team].add(when.toordinal())
+    for team_1, team_2, when in friendly:
+        for team in (team_1, team_2):
+            busy[team].add(timezone.localdate(when).toordinal())
+    return busy
+
+
+def generate_fixtures(tournament):
+    """
+    Pairs the entered teams, assigns slots at the tournament's futsals and
+    writes everything with bulk inserts: one Fixture per pairing, a Match for
+    each fixture whose teams are known, and the used slots booked. Returns
+    the fixtures; those without a time_slot could not be placed.
+    """
+    entries = list(tournament.entries.order_by('seed', 'id'))
+    team_ids = [entry.team_id for entry in entries]
+    if tournament.format == 'knockout':
+        specs = knockout_specs(team_ids)
+    else:
+        specs = round_robin_specs(team_ids)
+
+    now = timezone.now()
+    with transaction.atomic():
+        slots = {
+            slot.id: slot for slot in TimeSlot.objects.select_for_update().filter(
+                futsal__in=tournament.futsals.all(),
+                is_booked=False,
+                start_time__gt=now,
+                start_time__gte=_day_start(tournament.start_date),
+                start_time__lt=_day_start(tournament.end_date + timedelta(days=1)),
+            )
+        }
+        scheduler = FixtureScheduler(
+            specs,
+            [
+                (slot.id, slot.futsal_id, slot.start_time.timestamp(), timezone.localdate(slot.start_time).toordinal())
+                for slot in slots.values()
+            ],
+            rest_days=tournament.rest_days,
+            weekdays={entry.team_id: entry.weekdays for entry in entries},
+            busy_days=_busy_days(team_ids, tournament.start_date, tournament.end_date),
+        )
+        placement = scheduler.solve()
+
+        fixtures = []
+        for index, (round_number, position, team_1, team_2, _) in enumerate(specs):
+            slot = slots.get(placement.get(index))
+            fixtures.append(Fixture(
+                tournament=tournament, round=round_number, position=position,
+                team_1_id=team_1, team_2_id=team_2, time_slot=slot,
+            ))
+
+        playable = [fixture for fixture in fixtures if fixture.team_1_id and fixture.team_2_id]
+        matches = Match.objects.bulk_create([_match_for(fixture) for fixture in playable], batch_size=500)
+        for fixture, match in zip(playable, matches):
+            fixture.match = match
+        Fixture.objects.bulk_create(fixtures, batch_size=500)
+
+        booked = [fixture.time_slot for fixture in fixtures if fixture.time_slot]
+        TimeSlot.objects.filter(id__in=[slot.id for slot in booked]).update(is_booked=True)
+        for slot in booked:
+            slot.is_booked = True
+        slots_booked(booked)
+    return fixtures
+
+
+def _match_for(fixture):
+    slot = fixture.time_slot
+    return Match(
+        team_1_id=fixture.team_1_id,
+        team_2_id=fixture.team_2_id,
+        match_type='competitive',
+        accepted=True,
+        # Fixtures that found no slot can still be scheduled later
+        status='scheduled' if slot else 'confirmed',
+        scheduled_date=timezone.localdate(slot.start_time) if slot else None,
+        futsal_id=slot.futsal_id if slot else None,
+        time_slot=slot,
+    )
+
+
+def advance_winner(match):
+    """
+    Puts a knockout winner into their next fixture, creating its match once
+    both sides are known.
+    """
+    fixture = Fixture.objects.filter(match=match, tournament__format='knockout').first()
+    if fixture is None:
+        return
+
+    next_fixture = (
+        Fixture.objects.select_related('time_slot')
+        .filter(tournament_id=fixture.tournament_id, round=fixture.round + 1, position=fixture.position // 2)
+        .first()
+    )
+    if next_fixture is None or next_fixture.match_id:
+        return  # The final, or already decided
+
+    if fixture.position % 2:
+        next_fixture.team_2_id = match.winner_id
+    else:
+        next_fixture.team_1_id = match.winner_id
+    if next_fixture.team_1_id and next_fixture.team_2_id:
+        next_fixture.match = _match_for(next_fixture)
+        next_fixture.match.save()
+    next_fixture.save()
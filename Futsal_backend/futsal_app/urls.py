@@ -22,6 +22,8 @@ from .views import (
     RejectMatchView,
     UpdateMatchResultView,
     GenerateTimeSlotsView,
+    PriceRuleListCreateView,
+    PriceRuleDetailView,
 
     # Payment
 
@@ -46,12 +48,17 @@ urlpatterns = [
     path('futsals/', FutsalListCreateView.as_view(), name='futsal-list-create'),
     path('my-futsals/', OwnerFutsalListView.as_view(), name='my-futsals'),
     path('futsals/<int:pk>/', FutsalDetailView.as_view(), name='futsal-detail'),
+    path('futsals/nearby/', views.nearby_futsals, name='futsal-nearby'),
 
     # ----- Time Slots -----
     path('time-slots/', TimeSlotListCreateView.as_view(), name='time-slot-list-create'),
     path('time-slots/<int:pk>/', TimeSlotDetailView.as_view(), name='time-slot-detail'),
     path('generate-time-slots/', GenerateTimeSlotsView.as_view(), name='generate-time-slots'),
 
+    # ----- Slot Pricing -----
+    path('futsals/<int:futsal_id>/price-rules/', PriceRuleListCreateView.as_view(), name='price-rule-list-create'),
+    path('price-rules/<int:pk>/', PriceRuleDetailView.as_view(), name='price-rule-detail'),
+
     # ----- Teams -----
     path('teams/', TeamListCreateView.as_view(), name='team-list-create'),
     path('my-team/', MyTeamView.as_view(), name='my-team'),
@@ -83,6 +90,21 @@ urlpatterns = [
     path('competitive/matches/', views.list_competitive_matches, name='competitive-matches'),
     path("owner/competitive-matches/", views.owner_competitive_matches),
     path('competitive/leaderboard/', views.competitive_leaderboard),
+    path('competitive/queue/', views.matchmaking_queue, name='matchmaking-queue'),
+    path('tournaments/', views.create_tournament, name='create-tournament'),
+    path('tournaments/<int:pk>/fixtures/', views.tournament_fixtures, name='tournament-fixtures'),
+
+    # ----- Owner Exports -----
+    path('owner/exports/<str:kind>/', views.owner_export, name='owner-export'),
+    path('owner/analytics/', views.owner_analytics_view, name='owner-analytics'),
+    path('owner/futsals/<int:pk>/heatmap/', views.futsal_demand_heatmap, name='futsal-demand-heatmap'),
+
+    # ----- Search -----
+    path('search/', views.search_view, name='search'),
+
+    # ----- Notifications -----
+    path('notifications/', views.notification_list, name='notification-list'),
+    path('notifications/stream/', views.notification_stream_view, name='notification-stream'),
 
 
     path('contact/', contact_message, name='contact-message'),
@@ -5,21 +5,29 @@ from rest_framework.views import APIView
 from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import PermissionDenied
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction, IntegrityError
+from django.db.models import Q, F
 from datetime import date
 from rest_framework.generics import ListAPIView
 from rest_framework.decorators import api_view,permission_classes
+from adrf.decorators import api_view as async_api_view
 from django.views.decorators.csrf import csrf_exempt
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse, JsonResponse
 from datetime import datetime, timedelta
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
+from asgiref.sync import sync_to_async
+from core.authentication import CachedTokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
 import uuid, hmac, hashlib, base64, time
+import httpx
 
 
 
+from utils.db_router import ReplicaReadMixin, replica_reads
+from .current_team import CurrentTeamMixin, with_team
 from utils.email_service import (
     notify_futsal_owner_on_booking,
     notify_sender_on_booking_confirmed,
@@ -36,30 +44,59 @@ from utils.email_service import (
 )
 
 
-from .models import Futsal, Team, Player, TeamMatch,TimeSlot,Payment,MatchRequest,Match, TeamRejection
+from .models import Futsal, Team, Player, TeamMatch,TimeSlot,Payment,MatchRequest,Match, TeamRejection, PriceRule, MatchmakingTicket, Tournament
 from .serializers import (
     FutsalSerializer,
     TeamSerializer,
+    TeamSummarySerializer,
     TeamMatchSerializer,
     PlayerSerializer,
     TimeSlotSerializer,
-    MatchRequestSerializer
+    MatchRequestSerializer,
+    PriceRuleSerializer,
+    MatchmakingTicketSerializer,
+    TournamentSerializer,
+    FixtureSerializer
 )
 
 from futsal_app.Algorithms.elo import update_elo
 from futsal_app.Algorithms.collabfiltering import recommend_by_collab
 from futsal_app.Algorithms.contentbasedfiltering import recommend_by_content
 from futsal_app.Algorithms.hybrid import merge_recommendations
+from .rejections import rejection_index
+from .pagination import OptionalPageNumberPagination, CreatedAtCursorPagination
+from .exports import EXPORTS, export_rows, csv_stream, ndjson_stream, gzip_stream
+from .analytics import owner_analytics
+from .heatmap import get_demand_heatmap
+from .pricing import price_slots, slot_price
+from .signals import slots_created
+from .geo import nearest_futsals, MAX_RADIUS_KM
+from .search import SEARCH_FIELDS, search
+from .matchmaking import enqueue_team
+from .scheduling import schedule_competitive_match, slot_summary
+from .tournaments import generate_fixtures
+from .conditional import ConditionalGetMixin, futsal_list_version, futsal_version, team_version
+from .notifications import (
+    notify_match_request,
+    notify_friendly_result,
+    notify_competitive_result,
+    notifications_after,
+    notification_stream,
+    notification_poll,
+)
 
 
 # -------------------------------
 # Futsal Views
 # -------------------------------
 
-class FutsalListCreateView(generics.ListCreateAPIView):
+class FutsalListCreateView(ReplicaReadMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Futsal.objects.all()
     serializer_class = FutsalSerializer
 
+    def get_version(self):
+        return futsal_list_version(self.filter_queryset(self.get_queryset()))
+
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
@@ -69,10 +106,13 @@ class FutsalListCreateView(generics.ListCreateAPIView):
         return []
 
 
-class FutsalDetailView(generics.RetrieveUpdateDestroyAPIView):
+class FutsalDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Futsal.objects.all()
     serializer_class = FutsalSerializer
 
+    def get_version(self):
+        return futsal_version(self.get_queryset(), self.kwargs['pk'])
+
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
             return [permissions.IsAuthenticated()]
@@ -86,7 +126,7 @@ class OwnerFutsalListView(generics.ListAPIView):
     def get_queryset(self):
         return Futsal.objects.filter(owner=self.request.user)
 
-class TimeSlotListCreateView(generics.ListCreateAPIView):
+class TimeSlotListCreateView(ReplicaReadMixin, generics.ListCreateAPIView):
     serializer_class = TimeSlotSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -95,28 +135,32 @@ class TimeSlotListCreateView(generics.ListCreateAPIView):
         futsal_id = self.request.query_params.get("futsal")
 
         if futsal_id:
-            return TimeSlot.objects.filter(futsal_id=futsal_id, is_booked=False).order_by("start_time")
-
-        if user.user_type == "owner":
-            return TimeSlot.objects.filter(futsal__owner=user).order_by("start_time")
+            slots = TimeSlot.objects.filter(futsal_id=futsal_id, is_booked=False)
+        elif user.user_type == "owner":
+            slots = TimeSlot.objects.filter(futsal__owner=user)
+        else:
+            slots = TimeSlot.objects.filter(is_booked=False)
 
-        return TimeSlot.objects.filter(is_booked=False).order_by("start_time")
+        return TimeSlotSerializer.setup_eager_loading(slots).order_by("start_time")
     
     def perform_create(self, serializer):
-        serializer.save()
+        # Priced before the insert, so the slot is saved (and signalled) once
+        slot = price_slots(serializer.validated_data['futsal'], [TimeSlot(**serializer.validated_data)])[0]
+        serializer.save(price=slot.price, last_minute_price=slot.last_minute_price, last_minute_from=slot.last_minute_from)
 
 
-class AvailableTimeSlotListView(generics.ListAPIView):
+class AvailableTimeSlotListView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = TimeSlotSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return TimeSlot.objects.filter(is_booked=False).order_by('start_time')
+        slots = TimeSlot.objects.filter(is_booked=False).order_by('start_time')
+        return TimeSlotSerializer.setup_eager_loading(slots)
 
 
 
 class TimeSlotDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = TimeSlot.objects.all()
+    queryset = TimeSlotSerializer.setup_eager_loading(TimeSlot.objects.all())
     serializer_class = TimeSlotSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -151,50 +195,99 @@ class GenerateTimeSlotsView(APIView):
             return Response({"detail": "Start time must be before end time."}, status=400)
 
         current = start_time
-        created_slots = []
+        new_slots = []
 
         while current + timedelta(hours=1) <= end_time:
-            slot = TimeSlot.objects.create(
+            new_slots.append(TimeSlot(
                 futsal=futsal,
                 start_time=current,
                 end_time=current + timedelta(hours=1),
-            )
-            created_slots.append(slot)
+            ))
             current += timedelta(hours=1)
 
+        # Fill the price table up front so booking-time lookups are O(1)
+        price_slots(futsal, new_slots)
+
+        # One insert; bulk_create sends no signals, so slots_created runs the hooks
+        with transaction.atomic():
+            created_slots = TimeSlot.objects.bulk_create(new_slots)
+            slots_created(created_slots)
+
         return Response(TimeSlotSerializer(created_slots, many=True).data, status=201)
     
+class PriceRuleListCreateView(generics.ListCreateAPIView):
+    serializer_class = PriceRuleSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_futsal(self):
+        return get_object_or_404(Futsal, id=self.kwargs['futsal_id'], owner=self.request.user)
+
+    def get_queryset(self):
+        return PriceRule.objects.filter(futsal=self.get_futsal()).order_by('id')
+
+    def perform_create(self, serializer):
+        serializer.save(futsal=self.get_futsal())
+
+
+class PriceRuleDetailView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = PriceRuleSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return PriceRule.objects.filter(futsal__owner=self.request.user)
+
 # -------------------------------
 # Team Views
 # -------------------------------
 
+class TeamBrowseMixin:
+    """
+    Shared setup for team list endpoints: eager loading declared by the
+    serializer, opt-in pagination and ?view=summary for the slim rows.
+    """
+    pagination_class = OptionalPageNumberPagination
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and self.request.query_params.get('view') == 'summary':
+            return TeamSummarySerializer
+        return TeamSerializer
+
+    def get_team_queryset(self):
+        return Team.objects.all()
+
+    def get_queryset(self):
+        queryset = self.get_team_queryset().order_by('id')
+        return self.get_serializer_class().setup_eager_loading(queryset)
+
+
 class TeamListCreateView(generics.ListCreateAPIView):
     serializer_class = TeamSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Team.objects.filter(owner=self.request.user)
+        return TeamSerializer.setup_eager_loading(Team.objects.filter(owner=self.request.user))
 
     def perform_create(self, serializer):
-        # Check if user already has a team
-        if Team.objects.filter(owner=self.request.user).exists():
-            raise ValidationError({"detail": "You already have a team."})
-
         # Validate minimum 5 futsals selected
         preferred_futsals = self.request.data.get('preferred_futsal_ids') or []
         if len(preferred_futsals) < 2:
             raise ValidationError({"detail": "You must select at least 2 preferred futsals."})
 
-        team = serializer.save(owner=self.request.user)
+        # One team per owner is enforced by the database
+        try:
+            with transaction.atomic():
+                team = serializer.save(owner=self.request.user)
+        except IntegrityError:
+            raise ValidationError({"detail": "You already have a team."})
 
         # Assign preferred futsals to M2M
         team.preferred_futsals.set(preferred_futsals)
 
-class MyTeamView(APIView):
+class MyTeamView(CurrentTeamMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        team = Team.objects.filter(owner=request.user).first()
+        team = request.team
         if team:
             return Response(TeamSerializer(team).data)
         return Response({"detail": "You have not created a team yet."}, status=404)
@@ -208,23 +301,28 @@ class TeamViewSet(viewsets.ModelViewSet):
         return Team.objects.filter(owner=self.request.user)
 
     def create(self, request, *args, **kwargs):
-        if Team.objects.filter(owner=request.user).exists():
+        try:
+            with transaction.atomic():
+                return super().create(request, *args, **kwargs)
+        except IntegrityError:
             return Response(
                 {"detail": "You already have a team."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        return super().create(request, *args, **kwargs)
 
     def partial_update(self, request, *args, **kwargs):
         return super().partial_update(request, *args, **kwargs)
 
-class TeamDetailView(generics.RetrieveUpdateAPIView):
+class TeamDetailView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = TeamSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         return Team.objects.filter(owner=self.request.user)
 
+    def get_version(self):
+        return team_version(self.get_queryset(), self.kwargs['pk'])
+
     def perform_update(self, serializer):
         # Optional: extra permission check if needed
         if serializer.instance.owner != self.request.user:
@@ -238,11 +336,10 @@ class TeamDetailView(generics.RetrieveUpdateAPIView):
         team.delete()
         return Response({"detail": "Team deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
     
-class OtherTeamsListView(ListAPIView):
-    serializer_class = TeamSerializer
+class OtherTeamsListView(TeamBrowseMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
+    def get_team_queryset(self):
         return Team.objects.exclude(owner=self.request.user)
     
 
@@ -256,22 +353,30 @@ class OtherTeamsListView(ListAPIView):
 class TeamMatchListCreateView(generics.ListCreateAPIView):
     serializer_class = TeamMatchSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         user = self.request.user
         include_all = self.request.query_params.get("include_all", "false").lower() == "true"
 
-        base_filter = models.Q(team_1__owner=user) | models.Q(team_2__owner=user)
-        futsal_filter = models.Q(time_slot__futsal__owner=user)
-
+        # One indexed branch per way a user takes part in a match: sender,
+        # receiver or venue owner. UNION ALL is fine inside IN, so no DISTINCT.
+        branches = [
+            TeamMatch.objects.filter(team_1__owner=user),
+            TeamMatch.objects.filter(team_2__owner=user),
+            TeamMatch.objects.filter(time_slot__futsal__owner=user),
+        ]
         if not include_all:
-            base_filter &= models.Q(result_updated=False)
-            futsal_filter &= models.Q(result_updated=False)
+            branches = [branch.filter(result_updated=False) for branch in branches]
 
-        team_matches = TeamMatch.objects.filter(base_filter)
-        futsal_matches = TeamMatch.objects.filter(futsal_filter)
+        first, *rest = [branch.values('id') for branch in branches]
+        match_ids = first.union(*rest, all=True)
 
-        return (team_matches | futsal_matches).distinct().order_by('-created_at')
+        return (
+            TeamMatch.objects.filter(id__in=match_ids)
+            .select_related('team_1', 'team_2')
+            .order_by('-created_at', '-id')
+        )
     
     def perform_create(self, serializer):
         team_1 = serializer.validated_data['team_1']
@@ -318,7 +423,7 @@ class InitiateEsewaPaymentView(APIView):
         if not futsal:
             return Response({"detail": "No futsal assigned to this match."}, status=400)
 
-        amount = "{:.2f}".format(futsal.price_per_hour)
+        amount = "{:.2f}".format(slot_price(match.time_slot))
         tax = 0
         total_amount = "{:.2f}".format(float(amount) + tax)
 
@@ -368,36 +473,43 @@ class InitiateEsewaPaymentView(APIView):
             "payment_data": payment_data
         })
 
-@api_view(['POST'])
-def esewa_verify(request):
+ESEWA_TIMEOUT_SECONDS = 10
+
+
+@async_api_view(['POST'])
+async def esewa_verify(request):
     transaction_uuid = request.data.get("transaction_uuid")
     
     if not transaction_uuid:
         return Response({"detail": "Missing transaction_uuid"}, status=400)
 
     # Retrieve the payment object using the transaction ID (UUID)
-    payment = Payment.objects.filter(transaction_id=transaction_uuid).first()
+    payment = await Payment.objects.select_related('match').filter(transaction_id=transaction_uuid).afirst()
 
     if not payment:
         return Response({"detail": "Invalid transaction UUID"}, status=400)
 
-    # Verify the payment via eSewa's API
+    # Verify the payment via eSewa's API; the worker keeps serving other requests while waiting
     payload = {
         "amt": str(payment.amount),
         "scd": "EPAYTEST",  
         "pid": payment.transaction_id,
     }
 
-    resp = requests.post("https://rc.esewa.com.np/api/epay/transaction/status/", data=payload)
+    try:
+        async with httpx.AsyncClient(timeout=ESEWA_TIMEOUT_SECONDS) as client:
+            resp = await client.post(ESEWA_VERIFY_URL, data=payload)
+    except httpx.HTTPError:
+        return Response({"detail": "Payment verification request failed."}, status=500)
 
     if resp.status_code == 200:
         if "SUCCESS" in resp.text:
             payment.status = "paid"
-            payment.save()
+            await payment.asave()
             # Update the match acceptance status here if needed
             match = payment.match
             match.accepted = True
-            match.save()
+            await match.asave()
             return Response({"detail": "Payment verified and match accepted."})
         else:
             return Response({"detail": "Payment verification failed."}, status=400)
@@ -482,6 +594,7 @@ class UpdateMatchResultView(APIView):
         match.save()
 
         notify_team_owners_match_result(match)
+        notify_friendly_result(match)
 
         return Response({"detail": "Result recorded successfully."})
 
@@ -506,7 +619,7 @@ class PlayerDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return Player.objects.filter(team__owner=self.request.user)
 
-class PlayerListCreateView(generics.ListCreateAPIView):
+class PlayerListCreateView(CurrentTeamMixin, generics.ListCreateAPIView):
     serializer_class = PlayerSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -514,7 +627,7 @@ class PlayerListCreateView(generics.ListCreateAPIView):
         return Player.objects.filter(team__owner=self.request.user)
 
     def perform_create(self, serializer):
-        team = Team.objects.filter(owner=self.request.user).first()
+        team = self.request.team
         if not team:
             raise ValidationError({"detail": "Create a team first."})
         if Player.objects.filter(team=team).count() >= 8:
@@ -529,23 +642,23 @@ class PlayerListCreateView(generics.ListCreateAPIView):
 # -------------------------------
 
 
-class RecommendedOpponentsView(APIView):
+class RecommendedOpponentsView(CurrentTeamMixin, TeamBrowseMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
-        my_team = Team.objects.filter(owner=request.user).first()
-        if not my_team:
+    def list(self, request, *args, **kwargs):
+        self.my_team = request.team
+        if not self.my_team:
             return Response({"detail": "You don\'t have a team."}, status=404)
+        return super().list(request, *args, **kwargs)
 
-        other_teams = Team.objects.exclude(id=my_team.id)
-        serializer = TeamSerializer(other_teams, many=True)
-        return Response(serializer.data)
+    def get_team_queryset(self):
+        return Team.objects.exclude(id=self.my_team.id)
 
-class SendMatchRequestView(APIView):
+class SendMatchRequestView(CurrentTeamMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, team_id):
-        my_team = Team.objects.filter(owner=request.user).first()
+        my_team = request.team
         opponent_team = Team.objects.filter(id=team_id).first()
 
         if not my_team or not opponent_team:
@@ -580,99 +693,51 @@ class RespondMatchRequestView(APIView):
         return Response({"detail": "Invalid action."}, status=400)
 
 
-# ----------------- Constants -----------------
-COOLDOWN_DAYS = 1  # Number of days a rejection blocks invites
-
-
 # ----------------- Recommendation View -----------------
-@api_view(['GET'])
+@async_api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def recommend_competitive_match(request):
-    user_team = Team.objects.filter(owner=request.user).first()
+@replica_reads
+@with_team
+async def recommend_competitive_match(request):
+    user_team = request.team
     if not user_team:
         return Response({"error": "No team found."}, status=400)
 
-    # Optional: clear expired rejections before recommending
-    now = timezone.now()
-    TeamRejection.objects.filter(
-        cleared=False,
-        timestamp__lte=now - timedelta(days=COOLDOWN_DAYS)
-    ).update(cleared=True)
-
-    cf = recommend_by_collab(user_team.id, top_n=10)
-    cb = recommend_by_content(user_team, top_n=10)
-    hybrid = merge_recommendations(cf, cb)
-
-    response = []
-    for team_id, score in hybrid:
-        if team_id == user_team.id:
-            continue
-        try:
-            t = Team.objects.get(id=team_id)
-
-            recently_rejected = TeamRejection.objects.filter(
-                rejecting_team=t,
-                rejected_team=user_team,
-                cleared=False
-            ).exists()  # Only consider uncleared rejections
-
-            response.append({
-                "team_id": t.id,
-                "team_name": t.name,
-                "elo_rating": t.ranking,
-                "win_rate": t.win_rate,
-                "weighted_score": t.weighted_score,
-                "preferred_futsals": [f.name for f in t.preferred_futsals.all()],
-                "similarity_score": round(score, 3),
-                "recently_rejected": recently_rejected
-            })
-        except Team.DoesNotExist:
-            continue
-
     return Response({
         "your_team_id": user_team.id,
-        "recommendations": response
+        "recommendations": await get_alternative_teams(user_team)
     })
 
 
 # ----------------- Send Match Request -----------------
-@api_view(['POST'])
+@async_api_view(['POST'])
 @permission_classes([IsAuthenticated])
-def send_match_request(request, team_id):
-    sender = Team.objects.filter(owner=request.user).first()
+@with_team
+async def send_match_request(request, team_id):
+    sender = request.team
     if not sender:
         return Response({"error": "You have no team."}, status=400)
 
     try:
-        receiver = Team.objects.get(id=team_id)
+        receiver = await Team.objects.select_related('owner').aget(id=team_id)
     except Team.DoesNotExist:
         return Response({"error": "Opponent not found."}, status=404)
 
-    # ✅ Clear old rejections that exceeded COOLDOWN_DAYS
-    TeamRejection.objects.filter(
-        cleared=False,
-        timestamp__lte=timezone.now() - timedelta(days=COOLDOWN_DAYS)
-    ).update(cleared=True)
-
     # Check if receiver has recently rejected sender
-    if TeamRejection.objects.filter(
-        rejecting_team=receiver,
-        rejected_team=sender,
-        cleared=False
-    ).exists():
+    if await sync_to_async(rejection_index.is_blocked)(receiver.id, sender.id):
         return Response(
             {"error": f"You cannot send a request to {receiver.name} yet."},
             status=400
         )
 
     # Check for existing pending match
-    if Match.objects.filter(
+    if await Match.objects.filter(
         Q(team_1=sender, team_2=receiver, status='pending') |
         Q(team_1=receiver, team_2=sender, status='pending')
-    ).exists():
+    ).aexists():
         return Response({"error": "Existing match found."}, status=409)
 
-    match = Match.objects.create(
+    match = await Match.objects.acreate(
         team_1=sender,
         team_2=receiver,
         match_type='competitive',
@@ -680,21 +745,22 @@ def send_match_request(request, team_id):
         accepted=None
     )
 
-    notify_receiver_of_match_request(match)
+    await sync_to_async(notify_receiver_of_match_request)(match)
+    await sync_to_async(notify_match_request)(match)
 
     return Response({"message": "Match request sent.", "match_id": match.id}, status=201)
 
 
 # ----------------- Respond to Match Request -----------------
-@api_view(['POST'])
+@async_api_view(['POST'])
 @permission_classes([IsAuthenticated])
-def respond_to_match_request(request, match_id):
+async def respond_to_match_request(request, match_id):
     decision = request.data.get("decision")
     if decision not in ['accept', 'reject']:
         return Response({"error": "Invalid decision."}, status=400)
 
     try:
-        match = Match.objects.get(id=match_id)
+        match = await Match.objects.select_related('team_1__owner', 'team_2__owner').aget(id=match_id)
     except Match.DoesNotExist:
         return Response({"error": "Match not found."}, status=404)
 
@@ -705,33 +771,26 @@ def respond_to_match_request(request, match_id):
     if decision == 'accept':
         match.status = 'confirmed'
         match.accepted = True
-        match.save()
+        await match.asave()
         
         return Response({"message": "Match accepted successfully."})
 
     # ❌ Handle rejection
     match.status = 'rejected'
     match.accepted = False
-    match.save()
+    await match.asave()
 
     # ✅ Record rejection
-    TeamRejection.objects.update_or_create(
+    await TeamRejection.objects.aupdate_or_create(
         rejecting_team=match.team_2,
         rejected_team=match.team_1,
         defaults={"cleared": False, "timestamp": timezone.now()}
     )
 
-    # ✅ Optional: Clear expired rejections for sender
-    TeamRejection.objects.filter(
-        rejected_team=match.team_1,
-        cleared=False,
-        timestamp__lte=timezone.now() - timedelta(days=COOLDOWN_DAYS)
-    ).update(cleared=True)
-
     # Get alternative recommended teams excluding rejected
-    alternatives = get_alternative_teams(match.team_1, exclude_team=match.team_2.id)
+    alternatives = await get_alternative_teams(match.team_1, exclude_team=match.team_2.id)
 
-    notify_sender_on_match_rejection(match, alternatives)
+    await sync_to_async(notify_sender_on_match_rejection)(match, alternatives)
 
     return Response({
         "message": "Match request rejected.",
@@ -740,37 +799,77 @@ def respond_to_match_request(request, match_id):
 
 
 
+# ---------- Competitive Match History Helpers ----------
+def filter_competitive_matches(matches, params):
+    """
+    Applies the optional ?status=, ?date_from= and ?date_to= (scheduled date)
+    filters. Returns None if a date is not YYYY-MM-DD.
+    """
+    status_filter = params.get("status")
+    if status_filter:
+        matches = matches.filter(status=status_filter)
+
+    try:
+        if params.get("date_from"):
+            matches = matches.filter(scheduled_date__gte=date.fromisoformat(params["date_from"]))
+        if params.get("date_to"):
+            matches = matches.filter(scheduled_date__lte=date.fromisoformat(params["date_to"]))
+    except ValueError:
+        return None
+
+    return matches
+
+
+def competitive_history_response(request, rows, to_item):
+    """
+    Keyset-paginates a values() queryset when ?page_size= is given,
+    otherwise returns the full list as before.
+    """
+    paginator = CreatedAtCursorPagination()
+    page = paginator.paginate_queryset(rows, request)
+    if page is None:
+        return Response([to_item(row) for row in rows])
+    return paginator.get_paginated_response([to_item(row) for row in page])
+
+
 # ---------- List Competitive Matches ----------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@with_team
 def list_competitive_matches(request):
-    user_team = Team.objects.filter(owner=request.user).first()
+    user_team = request.team
     if not user_team:
         return Response({"error": "You are not part of any team."}, status=400)
 
-    matches = Match.objects.filter(
-        match_type='competitive'
-    ).filter(
-        Q(team_1=user_team) | Q(team_2=user_team)
-    ).order_by('-created_at')
-
-    data = []
-    for match in matches:
-        data.append({
-            "id": match.id,
-            "team_1": match.team_1.id,
-            "team_1_name": match.team_1.name,
-            "team_2": match.team_2.id,
-            "team_2_name": match.team_2.name,
-            "match_type": match.match_type,
-            "scheduled_time": match.scheduled_date,
-            "status": match.status,
-            "accepted": match.accepted,
-            "created_at": match.created_at,
-            "futsal_name": match.futsal.name if match.futsal else None
-        })
+    matches = filter_competitive_matches(
+        Match.objects.filter(match_type='competitive').filter(Q(team_1=user_team) | Q(team_2=user_team)),
+        request.query_params
+    )
+    if matches is None:
+        return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
 
-    return Response(data)
+    # Only the columns the response needs; team and futsal names come from joins
+    rows = matches.values(
+        'id', 'team_1_id', 'team_2_id', 'match_type', 'scheduled_date',
+        'status', 'accepted', 'created_at',
+        team_1_name=F('team_1__name'),
+        team_2_name=F('team_2__name'),
+        futsal_name=F('futsal__name'),
+    ).order_by('-created_at', '-id')
+
+    return competitive_history_response(request, rows, lambda row: {
+        "id": row["id"],
+        "team_1": row["team_1_id"],
+        "team_1_name": row["team_1_name"],
+        "team_2": row["team_2_id"],
+        "team_2_name": row["team_2_name"],
+        "match_type": row["match_type"],
+        "scheduled_time": row["scheduled_date"],
+        "status": row["status"],
+        "accepted": row["accepted"],
+        "created_at": row["created_at"],
+        "futsal_name": row["futsal_name"]
+    })
 
 
 # ----------------- Complete Match -----------------
@@ -794,50 +893,55 @@ def clear_rejections_after_match(match: Match):
         cleared=False
     ).update(cleared=True)
 
+    # Bulk update skips the model signals
+    rejection_index.invalidate()
+
 
 
 # ----------------- Alternative Teams -----------------
-def get_alternative_teams(team, exclude_team=None):
-    cf = recommend_by_collab(team.id, top_n=10)
-    cb = recommend_by_content(team, top_n=10)
+async def get_alternative_teams(team, exclude_team=None):
+    """
+    Hybrid recommendations for `team` as response rows. The scorers and the
+    rejection index are sync, so they run in the worker thread; the
+    recommended teams are then loaded in one query instead of one per id.
+    """
+    cf = await sync_to_async(recommend_by_collab)(team.id, top_n=10)
+    cb = await sync_to_async(recommend_by_content)(team, top_n=10)
     hybrid = merge_recommendations(cf, cb)
 
+    # Teams still in cooldown after rejecting us (expired ones drop out by TTL)
+    rejected_by = await sync_to_async(rejection_index.rejectors_of)(team.id)
+
+    team_ids = [team_id for team_id, _ in hybrid if team_id not in (team.id, exclude_team)]
+    teams = {
+        t.id: t async for t in Team.objects.filter(id__in=team_ids).prefetch_related('preferred_futsals')
+    }
+
     response = []
     for team_id, score in hybrid:
-        if team_id == team.id:
-            continue
-        if exclude_team and team_id == exclude_team:
-            continue
-        try:
-            t = Team.objects.get(id=team_id)
-
-            recently_rejected = TeamRejection.objects.filter(
-                rejecting_team=t,
-                rejected_team=team,
-                cleared=False,
-                timestamp__gte=timezone.now() - timedelta(days=COOLDOWN_DAYS)
-            ).exists()
-
-            response.append({
-                "team_id": t.id,
-                "team_name": t.name,
-                "elo_rating": t.ranking,
-                "win_rate": t.win_rate,
-                "weighted_score": t.weighted_score,
-                "preferred_futsals": [f.name for f in t.preferred_futsals.all()],
-                "similarity_score": round(score, 3),
-                "recently_rejected": recently_rejected
-            })
-        except Team.DoesNotExist:
+        t = teams.get(team_id)
+        if t is None:
             continue
 
+        response.append({
+            "team_id": t.id,
+            "team_name": t.name,
+            "elo_rating": t.ranking,
+            "win_rate": t.win_rate,
+            "weighted_score": t.weighted_score,
+            "preferred_futsals": [f.name for f in t.preferred_futsals.all()],
+            "similarity_score": round(score, 3),
+            "recently_rejected": t.id in rejected_by
+        })
+
     return response
 
 # ---------- Invitation Status ----------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@with_team
 def invitation_status(request, team_id):
-    user_team = Team.objects.filter(owner=request.user).first()
+    user_team = request.team
     opponent_team = Team.objects.get(id=team_id)
     match_request = MatchRequest.objects.filter(
         team_1=user_team, team_2=opponent_team
@@ -848,52 +952,58 @@ def invitation_status(request, team_id):
 
 
 # ---------- Schedule Match ----------
+SCHEDULE_MAX_ALTERNATIVES = 5
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@with_team
 def schedule_match(request, match_id):
     date_str = request.data.get("scheduled_date")
 
     try:
         date_obj = date.fromisoformat(date_str)
-    except ValueError:
+    except (TypeError, ValueError):
         return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
 
     if date_obj < date.today():
         return Response({"error": "Cannot schedule match in the past."}, status=400)
 
     try:
-        match = Match.objects.get(id=match_id)
+        # Both owners are emailed below
+        match = Match.objects.select_related('team_1__owner', 'team_2__owner').get(id=match_id)
     except Match.DoesNotExist:
         return Response({"error": "Match not found."}, status=404)
 
     if match.status != 'confirmed':
         return Response({"error": "Only confirmed matches can be scheduled."}, status=400)
 
-    team = Team.objects.filter(owner=request.user).first()
+    team = request.team
     if not team:
         return Response({"error": "Your user is not linked to any team."}, status=400)
 
-    if team not in [match.team_1, match.team_2]:
+    if team.id not in (match.team_1_id, match.team_2_id):
         return Response({"error": "You are not a participant in this match."}, status=403)
 
-    opponent_team = match.team_2 if team == match.team_1 else match.team_1
+    opponent_team = match.team_2 if team.id == match.team_1_id else match.team_1
 
-    preferred_futsals = list(team.preferred_futsals.all())
-    opponent_futsals = set(opponent_team.preferred_futsals.values_list('id', flat=True))
+    slot_id = request.data.get("slot_id")
+    if slot_id is not None:
+        try:
+            slot_id = int(slot_id)
+        except (TypeError, ValueError):
+            return Response({"error": "slot_id must be a number."}, status=400)
 
-    common_futsal = next((f for f in preferred_futsals if f.id in opponent_futsals), None)
+    # Our preferred futsals come prefetched with request.team
+    booked, alternatives = schedule_competitive_match(match, team, opponent_team, date_obj, slot_id=slot_id)
+    alternatives = [slot_summary(candidate) for candidate in alternatives[:SCHEDULE_MAX_ALTERNATIVES]]
 
-    if common_futsal:
-        futsal = common_futsal
-    else:
-        futsal = team.futsal
-        if not futsal:
-            return Response({"error": "Your team has no assigned futsal."}, status=400)
+    if booked is None:
+        return Response({
+            "error": "The requested slot is not available." if slot_id else "No free slot at your futsals on that date.",
+            "alternatives": alternatives,
+        }, status=409)
 
-    match.scheduled_date = date_obj
-    match.futsal = futsal
-    match.status = 'scheduled'
-    match.save()
     notify_sender_on_match_acceptance(match)
     notify_futsal_owner_on_competitive_booking(match)
 
@@ -901,34 +1011,41 @@ def schedule_match(request, match_id):
         "message": "Match scheduled successfully.",
         "match_id": match.id,
         "date": date_str,
-        "futsal": futsal.name
+        "futsal": match.futsal.name,
+        "slot": slot_summary(booked),
+        "alternatives": alternatives,
     }, status=200)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def owner_competitive_matches(request):
-    futsals = Futsal.objects.filter(owner=request.user)
-    matches = Match.objects.filter(
-        match_type='competitive',
-        futsal__in=futsals
-    ).order_by('-created_at')
-
-    data = []
-    for match in matches:
-        data.append({
-            "id": match.id,
-            "team_1": match.team_1.name,
-            "team_1_id": match.team_1.id,  # ✅ Include this
-            "team_2": match.team_2.name,
-            "team_2_id": match.team_2.id,  # ✅ Include this
-            "status": match.status,
-            "scheduled_date": match.scheduled_date,
-            "winner": match.winner.name if match.winner else None,
-            "futsal": match.futsal.name if match.futsal else None
-        })
+    matches = filter_competitive_matches(
+        Match.objects.filter(match_type='competitive', futsal__owner=request.user),
+        request.query_params
+    )
+    if matches is None:
+        return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
 
-    return Response(data)
+    rows = matches.values(
+        'id', 'team_1_id', 'team_2_id', 'status', 'scheduled_date', 'created_at',
+        team_1_name=F('team_1__name'),
+        team_2_name=F('team_2__name'),
+        winner_name=F('winner__name'),
+        futsal_name=F('futsal__name'),
+    ).order_by('-created_at', '-id')
+
+    return competitive_history_response(request, rows, lambda row: {
+        "id": row["id"],
+        "team_1": row["team_1_name"],
+        "team_1_id": row["team_1_id"],
+        "team_2": row["team_2_name"],
+        "team_2_id": row["team_2_id"],
+        "status": row["status"],
+        "scheduled_date": row["scheduled_date"],
+        "winner": row["winner_name"],
+        "futsal": row["futsal_name"]
+    })
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -986,6 +1103,7 @@ def finalize_match(request):
     )
 
     notify_teams_on_game_completion(match)
+    notify_competitive_result(match)
 
     return Response({
         'message': 'Match finalized, goals saved, ELO updated, and previous rejections cleared.',
@@ -995,6 +1113,7 @@ def finalize_match(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def competitive_leaderboard(request):
     teams = Team.objects.all().order_by('-ranking')
 
@@ -1009,6 +1128,312 @@ def competitive_leaderboard(request):
     ]
     return Response(data)
 
+# ---------- Owner Exports ----------
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def owner_export(request, kind):
+    """
+    Streams an owner's team matches, competitive matches or payments.
+    ?output=csv|ndjson, ?date_from= / ?date_to= on created date, ?gzip=true.
+    """
+    if kind not in EXPORTS:
+        return Response({"error": "Unknown export."}, status=404)
+
+    if request.user.user_type != "owner":
+        return Response({"error": "Only futsal owners can export bookings."}, status=403)
+
+    output = request.query_params.get("output", "csv").lower()
+    if output not in ("csv", "ndjson"):
+        return Response({"error": "Output must be csv or ndjson."}, status=400)
+
+    try:
+        date_from = date.fromisoformat(request.query_params["date_from"]) if request.query_params.get("date_from") else None
+        date_to = date.fromisoformat(request.query_params["date_to"]) if request.query_params.get("date_to") else None
+    except ValueError:
+        return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
+
+    headers, rows = export_rows(kind, request.user, date_from, date_to)
+
+    if output == "csv":
+        stream, content_type = csv_stream(headers, rows), "text/csv"
+    else:
+        stream, content_type = ndjson_stream(headers, rows), "application/x-ndjson"
+
+    filename = f"{kind}.{output}"
+    if request.query_params.get("gzip", "false").lower() == "true":
+        stream, content_type = gzip_stream(stream), "application/gzip"
+        filename += ".gz"
+
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+# ---------- Owner Analytics ----------
+ANALYTICS_DEFAULT_DAYS = 30
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def owner_analytics_view(request):
+    """
+    Revenue and utilization for the owner's futsals, read from the daily
+    rollups. ?date_from= / ?date_to= (default: last 30 days), ?futsal=<id>.
+    """
+    if request.user.user_type != "owner":
+        return Response({"error": "Only futsal owners can view analytics."}, status=403)
+
+    today = timezone.localdate()
+    try:
+        date_to = date.fromisoformat(request.query_params["date_to"]) if request.query_params.get("date_to") else today
+        date_from = (
+            date.fromisoformat(request.query_params["date_from"]) if request.query_params.get("date_from")
+            else date_to - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+        )
+    except ValueError:
+        return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
+
+    if date_from > date_to:
+        return Response({"error": "date_from must not be after date_to."}, status=400)
+
+    data = owner_analytics(request.user, date_from, date_to, futsal_id=request.query_params.get("futsal"))
+    return Response({"date_from": date_from, "date_to": date_to, **data})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def futsal_demand_heatmap(request, pk):
+    """
+    Weekday x hour occupancy and booking lead time for one of the owner's futsals.
+    """
+    if not Futsal.objects.filter(id=pk, owner=request.user).exists():
+        return Response({"error": "Futsal not found or permission denied."}, status=404)
+
+    return Response(get_demand_heatmap(pk))
+
+# ---------- Nearby Futsals ----------
+NEARBY_DEFAULT_K = 10
+NEARBY_MAX_K = 50
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def nearby_futsals(request):
+    """
+    Nearest futsals with open slots: ?lat=&lng= (required), ?k= (default 10),
+    ?radius_km= (default and cap 100), ?date=YYYY-MM-DD to require a slot that day.
+    """
+    params = request.query_params
+    try:
+        lat = float(params["lat"])
+        lng = float(params["lng"])
+        k = min(int(params.get("k", NEARBY_DEFAULT_K)), NEARBY_MAX_K)
+        radius_km = min(float(params.get("radius_km", MAX_RADIUS_KM)), MAX_RADIUS_KM)
+    except (KeyError, ValueError):
+        return Response({"error": "lat and lng are required numbers; k and radius_km must be numbers."}, status=400)
+
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or k < 1 or radius_km <= 0:
+        return Response({"error": "Coordinates, k or radius_km out of range."}, status=400)
+
+    day = None
+    if params.get("date"):
+        try:
+            day = date.fromisoformat(params["date"])
+        except ValueError:
+            return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
+
+    nearest = nearest_futsals(lat, lng, k=k, max_radius_km=radius_km, day=day)
+    futsals = Futsal.objects.in_bulk([futsal_id for futsal_id, _, _ in nearest])
+
+    results = []
+    for futsal_id, distance_km, open_slots in nearest:
+        if futsal_id not in futsals:
+            continue  # Deleted since the search
+        data = FutsalSerializer(futsals[futsal_id], context={"request": request}).data
+        data["distance_km"] = distance_km
+        data["open_slots"] = open_slots
+        results.append(data)
+
+    return Response(results)
+
+# ---------- Search ----------
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_view(request):
+    """
+    Typo-tolerant autocomplete over team and futsal names, locations and
+    futsal descriptions: ?q= (required), ?type=team|futsal, ?limit= (default 10).
+    """
+    query = request.query_params.get("q", "").strip()
+    if not query:
+        return Response({"error": "q is required."}, status=400)
+
+    kind = request.query_params.get("type")
+    if kind and kind not in SEARCH_FIELDS:
+        return Response({"error": "type must be team or futsal."}, status=400)
+
+    try:
+        limit = min(int(request.query_params.get("limit", SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return Response({"error": "limit must be a number."}, status=400)
+
+    results = search(query, kinds=[kind] if kind else None, limit=max(limit, 1))
+    return Response([
+        {
+            "type": kind,
+            "id": obj.id,
+            "name": obj.name,
+            "location": obj.location,
+            "score": score,
+        }
+        for kind, obj, score in results
+    ])
+
+# ---------- Matchmaking Queue ----------
+@api_view(['GET', 'POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+@with_team
+def matchmaking_queue(request):
+    """
+    POST {"windows": [{"start", "end"}, ...]} queues the user's team for the
+    next matchmaking cycle; GET shows its latest ticket; DELETE leaves the queue.
+    """
+    team = request.team
+    if not team:
+        return Response({"error": "You have no team."}, status=400)
+
+    if request.method == 'POST':
+        serializer = MatchmakingTicketSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        windows = [(window['start'], window['end']) for window in serializer.validated_data['windows']]
+        try:
+            ticket = enqueue_team(team, windows)
+        except IntegrityError:
+            return Response({"error": "Your team is already in the queue."}, status=409)
+        return Response(MatchmakingTicketSerializer(ticket).data, status=201)
+
+    if request.method == 'DELETE':
+        cancelled = MatchmakingTicket.objects.filter(team=team, status='waiting').update(status='cancelled')
+        if not cancelled:
+            return Response({"error": "Your team is not in the queue."}, status=404)
+        return Response(status=204)
+
+    ticket = (
+        MatchmakingTicket.objects.filter(team=team)
+        .select_related('team', 'time_slot__futsal')
+        .prefetch_related('windows')
+        .order_by('-created_at', '-id')
+        .first()
+    )
+    if not ticket:
+        return Response({"error": "Your team has not joined the queue."}, status=404)
+    return Response(MatchmakingTicketSerializer(ticket).data)
+
+# ---------- Tournaments ----------
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_tournament(request):
+    """
+    POST {"name", "format", "futsals": [ids], "entries": [{"team", "seed",
+    "weekdays"}], "start_date", "end_date", "rest_days"} creates a tournament
+    at the owner's futsals and generates its fixtures. Fixtures that found no
+    slot still get their match, which the teams can schedule themselves.
+    """
+    if request.user.user_type != "owner":
+        return Response({"error": "Only futsal owners can organize tournaments."}, status=403)
+
+    serializer = TournamentSerializer(data=request.data, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    with transaction.atomic():
+        tournament = serializer.save(organizer=request.user)
+        fixtures = generate_fixtures(tournament)
+
+    unscheduled = [fixture for fixture in fixtures if not fixture.time_slot_id and not fixture.is_bye]
+    return Response({
+        "tournament": serializer.data,
+        "fixtures": len(fixtures),
+        "scheduled": sum(1 for fixture in fixtures if fixture.time_slot_id),
+        "unscheduled": len(unscheduled),
+    }, status=201)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def tournament_fixtures(request, pk):
+    """
+    The tournament's fixtures in round order; ?round= for one round.
+    """
+    tournament = get_object_or_404(Tournament, id=pk)
+    fixtures = tournament.fixtures.select_related('team_1', 'team_2', 'time_slot__futsal')
+    if request.query_params.get("round"):
+        try:
+            fixtures = fixtures.filter(round=int(request.query_params["round"]))
+        except ValueError:
+            return Response({"error": "round must be a number."}, status=400)
+    return Response({"tournament": tournament.name, "fixtures": FixtureSerializer(fixtures, many=True).data})
+
+# ---------- Notifications ----------
+
+def parse_cursor(value):
+    try:
+        return max(int(value or 0), 0)
+    except ValueError:
+        return None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def notification_list(request):
+    """
+    Notifications after ?cursor= (oldest first), for clients that poll or
+    catch up instead of holding a stream open.
+    """
+    cursor = parse_cursor(request.query_params.get("cursor"))
+    if cursor is None:
+        return Response({"error": "Invalid cursor."}, status=400)
+
+    results = notifications_after(request.user.id, cursor)
+    return Response({
+        "results": results,
+        "cursor": results[-1]["id"] if results else cursor,
+    })
+
+
+async def notification_stream_view(request):
+    """
+    text/event-stream of the user's notifications. EventSource can't send an
+    Authorization header, so ?token= is accepted too; reconnects resume after
+    Last-Event-ID (or ?cursor=). Live streaming needs the ASGI application
+    (see routing.py); under WSGI each request returns one batch and ends,
+    and EventSource's retry turns that into polling.
+    """
+    auth = request.headers.get("Authorization", "")
+    key = auth[len("Token "):] if auth.startswith("Token ") else request.GET.get("token")
+    if not key:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    try:
+        user, _ = await sync_to_async(CachedTokenAuthentication().authenticate_credentials)(key)
+    except AuthenticationFailed as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=401)
+
+    cursor = parse_cursor(request.headers.get("Last-Event-ID") or request.GET.get("cursor"))
+    if cursor is None:
+        return JsonResponse({"detail": "Invalid cursor."}, status=400)
+
+    if isinstance(request, ASGIRequest):
+        events = notification_stream(user.id, cursor)
+    else:
+        events = notification_poll(user.id, cursor)
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Don't let nginx buffer the stream
+    return response
+
+
 # ---------- Contact Us ----------
 
 
@@ -0,0 +1,155 @@
+import os
+import sys
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+# ----------------- Database profile -----------------
+# backend/settings.py builds its default database from the environment:
+#
+#     from utils.database import database_config
+#     DATABASES = {'default': database_config(BASE_DIR)}
+#
+# DB_ENGINE        sqlite (default, the bundled db.sqlite3) or postgres
+# DB_SQLITE_PERFORMANCE=1           WAL + pragmas below for SQLite deployments
+# DB_SQLITE_BUSY_TIMEOUT_MS / DB_SQLITE_MMAP_SIZE / DB_SQLITE_CACHE_KB   (5000 / 128 MiB / 20000)
+# DB_NAME / DB_USER / DB_PASSWORD / DB_HOST / DB_PORT
+# DB_POOL          persistent (default): one kept-alive connection per worker thread
+#                  psycopg: psycopg's built-in pool inside each worker process
+#                  pgbouncer: an external transaction-mode pooler in front of Postgres
+# DB_CONN_MAX_AGE                   seconds a persistent connection is reused (60)
+# DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE / DB_POOL_TIMEOUT   psycopg pool sizing (2 / 10 / 10s)
+# DB_STATEMENT_TIMEOUT_MS           cancel any request's statement running longer (5000)
+# DB_COMMAND_STATEMENT_TIMEOUT_MS   the same for management commands (0 = off), so
+#                                   migrate and backfills aren't cut off mid-way
+# DB_LOCK_TIMEOUT_MS                give up waiting on a row/table lock (2000)
+# DB_IDLE_IN_TRANSACTION_TIMEOUT_MS kill sessions idling inside a transaction (60000)
+# DB_CONNECT_TIMEOUT / DB_SSLMODE   (5s / prefer)
+
+POOL_MODES = ('persistent', 'psycopg', 'pgbouncer')
+
+# Commands whose connections serve requests, or stand in for them, keep the
+# request statement timeout
+REQUEST_COMMANDS = ('runserver', 'test')
+
+
+def _env_int(env, name, default):
+    value = env.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ImproperlyConfigured(f"{name} must be an integer, got {value!r}.")
+
+
+def management_command(argv):
+    """
+    The management command this process runs (manage.py, django-admin or
+    python -m django), or None under a WSGI/ASGI server.
+    """
+    if len(argv) > 1 and Path(argv[0]).name in ('manage.py', 'django-admin', '__main__.py'):
+        return argv[1]
+    return None
+
+
+def sqlite_pragmas(env):
+    """
+    Run on every new connection. WAL lets readers proceed during a write,
+    synchronous=NORMAL is durable across app crashes under WAL (only an OS
+    crash can lose the last commits), and busy_timeout makes a writer wait
+    for the lock instead of failing with "database is locked".
+    """
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={_env_int(env, 'DB_SQLITE_BUSY_TIMEOUT_MS', 5000)}",
+        f"PRAGMA mmap_size={_env_int(env, 'DB_SQLITE_MMAP_SIZE', 128 * 1024 * 1024)}",
+        f"PRAGMA cache_size=-{_env_int(env, 'DB_SQLITE_CACHE_KB', 20000)}",  # Negative = KiB
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def sqlite_config(env, base_dir):
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': env.get('DB_NAME') or base_dir / 'db.sqlite3',
+    }
+
+    if env.get('DB_SQLITE_PERFORMANCE', '').lower() in ('1', 'true', 'yes'):
+        config['OPTIONS'] = {
+            'init_command': ';'.join(sqlite_pragmas(env)),
+            # Take the write lock at BEGIN: a deferred transaction that reads
+            # and then writes can't wait on busy_timeout and fails at once
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': _env_int(env, 'DB_SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000,
+        }
+
+    return config
+
+
+def postgres_config(env, command=None):
+    pool_mode = env.get('DB_POOL', 'persistent')
+    if pool_mode not in POOL_MODES:
+        raise ImproperlyConfigured(f"DB_POOL must be one of {', '.join(POOL_MODES)}, got {pool_mode!r}.")
+
+    if command is None or command in REQUEST_COMMANDS:
+        statement_timeout = _env_int(env, 'DB_STATEMENT_TIMEOUT_MS', 5000)
+    else:
+        statement_timeout = _env_int(env, 'DB_COMMAND_STATEMENT_TIMEOUT_MS', 0)
+
+    timeouts = {
+        'statement_timeout': statement_timeout,
+        'lock_timeout': _env_int(env, 'DB_LOCK_TIMEOUT_MS', 2000),
+        'idle_in_transaction_session_timeout': _env_int(env, 'DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', 60000),
+    }
+
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env.get('DB_NAME', 'futsal'),
+        'USER': env.get('DB_USER', 'futsal'),
+        'PASSWORD': env.get('DB_PASSWORD', ''),
+        'HOST': env.get('DB_HOST', 'localhost'),
+        'PORT': env.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': _env_int(env, 'DB_CONN_MAX_AGE', 60),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': _env_int(env, 'DB_CONNECT_TIMEOUT', 5),
+            'sslmode': env.get('DB_SSLMODE', 'prefer'),
+        },
+    }
+
+    if pool_mode == 'pgbouncer':
+        # Transaction pooling hands each transaction a different server
+        # session: named cursors (QuerySet.iterator) can't survive that, and
+        # PgBouncer rejects the `options` startup parameter, so the timeouts
+        # belong on the role instead (ALTER ROLE ... SET statement_timeout = ...),
+        # and migrate should connect to Postgres directly to escape them.
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+        return config
+
+    config['OPTIONS']['options'] = ' '.join(f"-c {name}={value}" for name, value in timeouts.items())
+
+    if pool_mode == 'psycopg':
+        # The pool owns connection reuse; Django refuses CONN_MAX_AGE alongside it
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': _env_int(env, 'DB_POOL_MIN_SIZE', 2),
+            'max_size': _env_int(env, 'DB_POOL_MAX_SIZE', 10),
+            'timeout': _env_int(env, 'DB_POOL_TIMEOUT', 10),
+        }
+
+    return config
+
+
+def database_config(base_dir, env=None, argv=None):
+    env = os.environ if env is None else env
+    argv = sys.argv if argv is None else argv
+    engine = env.get('DB_ENGINE', 'sqlite')
+
+    if engine == 'sqlite':
+        return sqlite_config(env, base_dir)
+    if engine == 'postgres':
+        return postgres_config(env, management_command(argv))
+    raise ImproperlyConfigured(f"DB_ENGINE must be sqlite or postgres, got {engine!r}.")
@@ -0,0 +1,111 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+
+# ----------------- Read replicas -----------------
+# Reads go to a replica only inside views that opt in with @replica_reads
+# (or ReplicaReadMixin). Everything else, and every write, uses `default`.
+#
+#     DATABASES = {
+#         'default': {...},
+#         'replica': {..., 'TEST': {'MIRROR': 'default'}},
+#     }
+#     DATABASE_REPLICAS = ['replica']
+#     DATABASE_ROUTERS = ['utils.db_router.ReplicaRouter']
+#     MIDDLEWARE += ['utils.db_router.ReplicaStickinessMiddleware']
+#
+# After a user sends a write, their replica reads fall back to `default`
+# for REPLICA_STICKY_SECONDS so they always see their own changes.
+
+DEFAULT_STICKY_SECONDS = 10
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def sticky_cache_key(user_id):
+    return f"db:sticky:{user_id}"
+
+
+def pin_to_primary(user):
+    seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+    cache.set(sticky_cache_key(user.id), True, seconds)
+
+
+def is_pinned_to_primary(user):
+    return bool(user and user.is_authenticated and cache.get(sticky_cache_key(user.id)))
+
+
+@contextmanager
+def reading_from_replica(enabled=True):
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def replica_reads(view_func):
+    """
+    Wraps a view body (inside @api_view, so request.user is authenticated)
+    so its reads may be served by a replica. Works on sync and async views.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            pinned = await sync_to_async(is_pinned_to_primary)(request.user)
+            with reading_from_replica(not pinned):
+                return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        with reading_from_replica(not is_pinned_to_primary(request.user)):
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """
+    Serves a generic view's GET from a replica. Other methods are untouched.
+    """
+    def get(self, request, *args, **kwargs):
+        with reading_from_replica(not is_pinned_to_primary(request.user)):
+            return super().get(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if replicas and _use_replica.get():
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror default, so objects from either side may be related
+        return True
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Pins a user to the primary after any unsafe request. Reads request.user
+    after the view ran, so DRF token authentication has already set it.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and user is not None and user.is_authenticated:
+            pin_to_primary(user)
+        return response